@@ -141,7 +141,7 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "doccoon.api.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
     # Performance optimizations
     "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",)
@@ -218,8 +218,31 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    # Content-addressed images extracted from page content
+    "blobs": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.path.join(MEDIA_ROOT, "blobs")},
+    },
+    # Book export files built in the background. Written by the Celery
+    # worker and read by the web process, so both must see it.
+    "exports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.path.join(MEDIA_ROOT, "exports")},
+    },
+    # Uploads waiting to be imported as pages, deleted once read. Saved by
+    # the web process and read by the Celery worker, so both must see it.
+    "imports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": os.path.join(MEDIA_ROOT, "imports")},
+    },
 }
 
+# Where page content links to stored blobs, served by the blob endpoint
+BLOB_BASE_URL = config(
+    "BLOB_BASE_URL",
+    default=f"{'http' if DEBUG else 'https'}://{config('SERVER_DOMAIN_NAME')}/api/blobs/",
+)
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -322,6 +345,20 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_BEAT_SCHEDULE = {
+    "collect-orphaned-blobs": {
+        "task": "doccoon.tasks.blobs.collect_orphaned_blobs_task",
+        "schedule": timedelta(days=1),
+    },
+    "collect-orphaned-content": {
+        "task": "doccoon.tasks.sharing.collect_orphaned_content_task",
+        "schedule": timedelta(days=1),
+    },
+    "collect-expired-exports": {
+        "task": "doccoon.tasks.export.collect_expired_exports_task",
+        "schedule": timedelta(hours=1),
+    },
+}
 
 
 # import dj_database_url
@@ -334,6 +371,28 @@ APPEND_SLASH = True
 # AI Provider (Gemini)
 GEMINI_API_KEY = config("GEMINI_API_KEY", default="")
 
+# HTML sanitizer engine for user content, see doccoon.utils.sanitize
+SANITIZER_BACKEND = config(
+    "SANITIZER_BACKEND", default="doccoon.utils.sanitize.BleachSanitizer"
+)
+
+# Compression of page content and share snapshots at rest, see
+# doccoon.utils.compression. "auto" picks zstd when Python provides it
+CONTENT_COMPRESSION = config("CONTENT_COMPRESSION", default="auto")
+CONTENT_COMPRESSION_THRESHOLD = config(
+    "CONTENT_COMPRESSION_THRESHOLD", default=512, cast=int
+)
+
+# Pages of at least PAGE_BLOCK_THRESHOLD bytes store their content in blocks
+# of about PAGE_BLOCK_SIZE characters, so edits only rewrite changed blocks.
+# A threshold of 0 keeps every page in a single row
+PAGE_BLOCK_THRESHOLD = config("PAGE_BLOCK_THRESHOLD", default=1048576, cast=int)
+PAGE_BLOCK_SIZE = config("PAGE_BLOCK_SIZE", default=65536, cast=int)
+
+# Render shared content to HTML in the background, see doccoon.utils.render.
+# Needs the optional render packages
+SHARE_RENDER_HTML = config("SHARE_RENDER_HTML", default=False, cast=bool)
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
 # Security headers
@@ -7,7 +7,7 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "doccoon.api.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
     # No throttle classes
 }
@@ -22,3 +22,14 @@ DATABASES = {
 
 # Disable debug mode to skip debug_toolbar URL imports
 DEBUG = False
+
+# Run Celery tasks inline, without a broker
+CELERY_TASK_ALWAYS_EAGER = True
+
+# Keep blobs, exports and imports written by tests out of the media directory
+STORAGES = {
+    **STORAGES,  # noqa: F405
+    "blobs": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "exports": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "imports": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
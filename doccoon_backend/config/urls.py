@@ -26,6 +26,8 @@ urlpatterns = [
                 path("notifications/", include("doccoon.routes.notification")),
                 path("shared/", include("doccoon.routes.sharing")),
                 path("ai/", include("doccoon.routes.ai")),
+                path("blobs/", include("doccoon.routes.blob")),
+                path("search/", include("doccoon.routes.search")),
                 path("auth/social/", include("doccoon.routes.social_auth")),
             ]
         ),
@@ -0,0 +1,168 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row instead of offsetting.
+
+    Rows are ordered by ``keyset_ordering`` on the view (``-created_at, -id``
+    by default), which must end with a unique field. Cursors are opaque and
+    hold the ordering values of the row the next window starts after, so
+    every window costs one indexed query and no count.
+
+    Querysets of ``values()`` rows are paginated too, as long as they select
+    the ordering fields.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view=None
+    ) -> list:
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = getattr(view, "keyset_ordering", self.ordering)
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-")) for name in self.ordering
+        ]
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor["r"])
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._flip(name) for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self._seek(cursor["v"], reverse))
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            # Position of the first row, as far as the cursor tracks it
+            self.offset = max(cursor["o"] - len(rows), 0)
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.offset = cursor["o"] + 1 if cursor else 0
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.rows:
+            return None
+        last = len(self.rows) - 1
+        return self.encode_cursor(self.rows[last], self.offset + last, False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.rows[0], self.offset, True)
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def encode_cursor(self, row: Any, offset: int, reverse: bool) -> str:
+        if isinstance(row, dict):
+            values = [row[field.name] for field in self.fields]
+        else:
+            values = [getattr(row, field.attname) for field in self.fields]
+        # Keep the microseconds DjangoJSONEncoder would round off
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ]
+        payload = json.dumps(
+            {"v": values, "o": offset, "r": int(reverse)}, separators=(",", ":")
+        )
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request) -> Optional[dict]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            cursor = json.loads(payload)
+            values = cursor["v"]
+            if len(values) != len(self.fields):
+                raise ValueError
+            cursor["v"] = [
+                field.to_python(value) for field, value in zip(self.fields, values)
+            ]
+            cursor["o"] = max(int(cursor["o"]), 0)
+            cursor["r"] = bool(cursor["r"])
+        except (
+            binascii.Error,
+            KeyError,
+            TypeError,
+            ValueError,
+            ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _seek(self, values: list, reverse: bool) -> Q:
+        """Match the rows that come after ``values`` in the (flipped) ordering."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.ordering, values):
+            descending = name.startswith("-") != reverse
+            field = name.lstrip("-")
+            lookup = f"{field}__lt" if descending else f"{field}__gt"
+            condition |= Q(**equal, **{lookup: value})
+            equal[field] = value
+        return condition
+
+    @staticmethod
+    def _flip(name: str) -> str:
+        return name[1:] if name.startswith("-") else f"-{name}"
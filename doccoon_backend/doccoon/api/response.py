@@ -1,10 +1,13 @@
-from typing import Any, List, Optional, Union
+from typing import Any, Iterable, Iterator, List, Optional, Union
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
     HTTP_401_UNAUTHORIZED,
+    HTTP_409_CONFLICT,
 )
 
 
@@ -33,6 +36,47 @@ class CustomResponse:
             status=status_code,
         )
 
+    @staticmethod
+    def render_success(
+        data: Union[List[Any], None] = None, message: Optional[str] = None
+    ) -> bytes:
+        """encode a success response body once, to be cached"""
+        if not message:
+            message = "Success"
+
+        return JSONRenderer().render({"message": message, "results": data})
+
+    @staticmethod
+    def rendered(body: bytes, status_code: int = HTTP_200_OK) -> HttpResponse:
+        """response method for a body encoded by render_success"""
+        return HttpResponse(body, status=status_code, content_type="application/json")
+
+    @staticmethod
+    def stream_success(
+        data: dict,
+        items_key: str,
+        items: Iterable[Any],
+        message: Optional[str] = None,
+    ) -> StreamingHttpResponse:
+        """success response method sending the items of a list one at a time"""
+        """ the list goes last in the results, under items_key """
+        if not message:
+            message = "Success"
+
+        renderer = JSONRenderer()
+        # Rendered with the list empty, the body ends with its closing ]}}
+        envelope = renderer.render(
+            {"message": message, "results": {**data, items_key: []}}
+        )
+
+        def body() -> Iterator[bytes]:
+            yield envelope[:-3]
+            for index, item in enumerate(items):
+                yield (b"," if index else b"") + renderer.render(item)
+            yield envelope[-3:]
+
+        return StreamingHttpResponse(body(), content_type="application/json")
+
     @staticmethod
     def not_found(
         message: Optional[str] = None, status_code: int = HTTP_404_NOT_FOUND
@@ -71,4 +115,16 @@ class CustomResponse:
         if not message:
             message = "You are not authorized to access this resource."
 
-        return Response({"message": message}, status=status_code)
\ No newline at end of file
+        return Response({"message": message}, status=status_code)
+
+    @staticmethod
+    def conflict(
+        message: Optional[str] = None,
+        data: Union[List[Any], None] = None,
+        status_code: int = HTTP_409_CONFLICT,
+    ) -> Response:
+        """conflict response method"""
+        if not message:
+            message = "The resource has been modified by another request."
+
+        return Response({"message": message, "results": data}, status=status_code)
@@ -44,6 +44,12 @@ class BookOperationThrottle(UserRateThrottle):
     rate = "30/minute"
 
 
+class SearchThrottle(UserRateThrottle):
+    """Rate limit for full-text search."""
+
+    rate = "60/minute"
+
+
 class SettingsThrottle(UserRateThrottle):
     """Rate limit for settings updates."""
 
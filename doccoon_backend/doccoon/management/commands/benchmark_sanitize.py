@@ -0,0 +1,132 @@
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils.module_loading import import_string
+
+from doccoon.utils import sanitize
+
+PARAGRAPHS = [
+    "Some **bold** text with a [link](https://example.com) and `code`.",
+    "A <b>bold</b> word, an <em>emphasized</em> one and a "
+    '<a href="https://example.com" onclick="alert(1)">link</a>.',
+    "- first item\n- second item with <script>alert(1)</script>\n- third item",
+    "```python\nprint('a < b and c > d')\n```",
+    '<blockquote>\nA quote with <img src="cat.png" alt="cat"> inside\n</blockquote>',
+    "| a | b |\n|---|---|\n| 1 & 2 | 3 |",
+]
+
+ENGINES = [
+    "doccoon.utils.sanitize.BleachSanitizer",
+    "doccoon.utils.sanitize.Nh3Sanitizer",
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the sanitizer engines and block-level memoization."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[100_000, 1_000_000, 5_000_000],
+            help="Page sizes to benchmark, in bytes.",
+        )
+        parser.add_argument(
+            "--edits",
+            type=int,
+            default=5,
+            help="Single-paragraph edits timed per page size.",
+        )
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            default=ENGINES,
+            help="Dotted paths of the sanitizer engines to compare.",
+        )
+
+    def handle(self, *args, **options):
+        engines = {}
+        for path in options["engines"]:
+            try:
+                engines[path] = import_string(path)()
+            except Exception as error:
+                self.stderr.write(f"Skipping {path}: {error}")
+
+        self.stdout.write("Throughput in MB/s, markdown with HTML and plain text:")
+        self.stdout.write(f"{'engine':>16} {'size':>10} {'html':>8} {'text':>8}")
+        for path, engine in engines.items():
+            for size in options["sizes"]:
+                content = "\n\n".join(self.make_paragraphs(size))
+                text = content.replace("<", "")
+                self.stdout.write(
+                    f"{type(engine).__name__:>16} {size:>10} "
+                    f"{self.throughput(engine, content):>8.2f} "
+                    f"{self.throughput(engine, text):>8.2f}"
+                )
+
+        for path, engine in engines.items():
+            if engine.cache_blocks:
+                with override_settings(SANITIZER_BACKEND=path):
+                    self.benchmark_blocks(engine, options)
+
+    def benchmark_blocks(self, engine, options):
+        self.stdout.write(f"\nBlock memoization with {type(engine).__name__}:")
+        self.stdout.write(
+            f"{'size':>10} {'full':>10} {'cold':>10} {'edit':>10} {'speedup':>8}"
+        )
+        for size in options["sizes"]:
+            paragraphs = self.make_paragraphs(size)
+            content = "\n\n".join(paragraphs)
+
+            started = time.perf_counter()
+            expected = sanitize._clean_markdown(content)
+            full = time.perf_counter() - started
+
+            sanitize.block_cache.clear()
+            started = time.perf_counter()
+            result = sanitize.sanitize_markdown(content)
+            cold = time.perf_counter() - started
+            if result != expected:
+                self.stderr.write(f"Block output differs from full output at {size}")
+
+            edit = 0.0
+            for _ in range(options["edits"]):
+                index = random.randrange(len(paragraphs))
+                paragraphs[index] = f"{paragraphs[index]} edited {uuid.uuid4().hex}"
+                content = "\n\n".join(paragraphs)
+                started = time.perf_counter()
+                sanitize.sanitize_markdown(content)
+                edit += time.perf_counter() - started
+            edit /= max(options["edits"], 1)
+
+            self.stdout.write(
+                f"{size:>10} {full * 1000:>8.1f}ms {cold * 1000:>8.1f}ms "
+                f"{edit * 1000:>8.1f}ms {full / edit if edit else 0:>7.1f}x"
+            )
+
+    @staticmethod
+    def throughput(engine, content: str) -> float:
+        started = time.perf_counter()
+        engine.clean(
+            content,
+            sanitize.ALLOWED_TAGS,
+            sanitize.ALLOWED_ATTRIBUTES,
+            sanitize.ALLOWED_PROTOCOLS,
+        )
+        return len(content) / (time.perf_counter() - started) / 1_000_000
+
+    @staticmethod
+    def make_paragraphs(size: int) -> list[str]:
+        # A fresh salt per run keeps the shared cache from warming the cold pass
+        salt = uuid.uuid4().hex
+        paragraphs = []
+        total = 0
+        while total < size:
+            paragraph = f"{random.choice(PARAGRAPHS)} {salt}-{len(paragraphs)}"
+            paragraphs.append(paragraph)
+            total += len(paragraph) + 2
+        return paragraphs
@@ -0,0 +1,147 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.notification import Notification
+from doccoon.models.user import User
+from doccoon.serializers.book import (
+    BookListSerializer,
+    GetBookWithPagesSerializer,
+    book_list_values,
+    serialize_book,
+)
+from doccoon.serializers.notification import (
+    NotificationSerializer,
+    notification_values,
+)
+from doccoon.serializers.page import (
+    PageDetailSerializer,
+    page_detail_values,
+    serialize_page_rows,
+)
+from doccoon.services.book import get_book_by_id
+from doccoon.services.notification import get_user_notifications
+from doccoon.services.page import get_pages_by_book, number_pages
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the values() fast paths of the hot read endpoints against "
+        "their ModelSerializers. Data is created in a transaction rolled back "
+        "at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=100,
+            help="Books, pages and notifications listed per request.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=2000,
+            help="Size of each page's content, in characters.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Times each endpoint is serialized.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.benchmark(options)
+            transaction.set_rollback(True)
+
+    def benchmark(self, options):
+        rows = options["rows"]
+        user = User.objects.create_user(
+            email=f"benchmark-{uuid.uuid4().hex}@example.com",
+            password=uuid.uuid4().hex,
+        )
+        books = [
+            doccoon.objects.create(
+                author=user, title=f"Book {number}", description="A book", year=2020
+            )
+            for number in range(rows)
+        ]
+        book = books[0]
+        line = "Some **bold** text and a [link](https://example.com).\n"
+        content = (line * (options["page_size"] // len(line) + 1))[
+            : options["page_size"]
+        ]
+        DoccoonPage.objects.bulk_create(
+            DoccoonPage(book=book, page_number=number, position=number, content=content)
+            for number in range(1, rows + 1)
+        )
+        Notification.objects.bulk_create(
+            Notification(
+                user=user,
+                title=f"Notification {number}",
+                message="Something happened",
+                related_book=book,
+            )
+            for number in range(rows)
+        )
+
+        book_list = doccoon.objects.filter(author=user).order_by("-created_at", "-id")
+        pages = get_pages_by_book(book.id)
+        notifications = get_user_notifications(user).order_by("-created_at", "-id")
+        endpoints = [
+            (
+                "book list",
+                lambda: BookListSerializer(book_list, many=True).data,
+                lambda: book_list_values.many(
+                    book_list.values(*book_list_values.columns)
+                ),
+            ),
+            (
+                "book detail",
+                lambda: GetBookWithPagesSerializer(get_book_by_id(book.id)).data,
+                lambda: serialize_book(get_book_by_id(book.id, include_pages=False)),
+            ),
+            (
+                "page list",
+                lambda: PageDetailSerializer(number_pages(pages), many=True).data,
+                lambda: list(
+                    serialize_page_rows(
+                        pages.values(*page_detail_values.columns, "chunked"),
+                        page_detail_values,
+                    )
+                ),
+            ),
+            (
+                "notifications",
+                lambda: NotificationSerializer(notifications, many=True).data,
+                lambda: notification_values.many(
+                    notifications.values(*notification_values.columns)
+                ),
+            ),
+        ]
+
+        self.stdout.write(f"Requests per second, {rows} rows per request:")
+        self.stdout.write(
+            f"{'endpoint':>14} {'model':>10} {'values':>10} {'speedup':>8}"
+        )
+        for name, model, values in endpoints:
+            if model() != values():
+                self.stderr.write(f"The {name} output differs from its serializer")
+            model_rate = self.throughput(model, options["repeat"])
+            values_rate = self.throughput(values, options["repeat"])
+            self.stdout.write(
+                f"{name:>14} {model_rate:>10.1f} {values_rate:>10.1f} "
+                f"{values_rate / model_rate:>7.1f}x"
+            )
+
+    @staticmethod
+    def throughput(serialize, repeat: int) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            serialize()
+        return repeat / (time.perf_counter() - started)
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from doccoon.services.blob import BLOB_GC_MIN_AGE, collect_orphaned_blobs
+
+
+class Command(BaseCommand):
+    help = "Delete stored image blobs that no content links to anymore."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=int(BLOB_GC_MIN_AGE.total_seconds()),
+            help="Keep blobs younger than this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = collect_orphaned_blobs(timedelta(seconds=options["min_age"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} orphaned blobs."))
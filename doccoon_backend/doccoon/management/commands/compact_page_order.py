@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from doccoon.models.book import doccoon
+from doccoon.services.page import compact_page_order
+
+
+class Command(BaseCommand):
+    help = "Renumber pages from their order and optionally re-space positions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--book", type=int, help="Only compact this book.")
+        parser.add_argument(
+            "--regap",
+            action="store_true",
+            help="Re-space page positions evenly.",
+        )
+
+    def handle(self, *args, **options):
+        books = doccoon.objects.filter(is_deleted=False)
+        if options["book"]:
+            books = books.filter(id=options["book"])
+
+        total = 0
+        for book_id in books.values_list("id", flat=True).iterator():
+            total += compact_page_order(book_id, regap=options["regap"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Compacted page order: {total} pages written.")
+        )
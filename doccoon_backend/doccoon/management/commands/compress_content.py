@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from doccoon.services.compression import COMPRESSED_FIELDS, recompress_field
+
+
+class Command(BaseCommand):
+    help = (
+        "Compress stored page content and share snapshots in batches, "
+        "following the CONTENT_COMPRESSION settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows read and written per transaction.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches to spare the database.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_name, version_field in COMPRESSED_FIELDS:
+            rewritten = recompress_field(
+                model,
+                field_name,
+                version_field,
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+            )
+            self.stdout.write(f"{model.__name__}.{field_name}: {rewritten} rows")
+            total += rewritten
+
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {total} rows."))
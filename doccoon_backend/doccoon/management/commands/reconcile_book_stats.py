@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from doccoon.services.book import reconcile_book_stats, recount_page_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored page count, image count and size of books."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--book", type=int, help="Only reconcile this book.")
+        parser.add_argument(
+            "--recount-pages",
+            action="store_true",
+            help="Also recompute each page's stats from its content.",
+        )
+
+    def handle(self, *args, **options):
+        if options["recount_pages"]:
+            pages = recount_page_stats(options["book"])
+            self.stdout.write(f"Recounted {pages} pages with stale stats.")
+
+        books = reconcile_book_stats(options["book"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {books} books with drifted stats.")
+        )
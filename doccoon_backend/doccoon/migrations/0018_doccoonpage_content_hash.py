@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def populate_content_hash(apps, schema_editor):
+    """Compute the content digest of existing pages."""
+    from doccoon.utils.hashing import content_hash
+
+    DoccoonPage = apps.get_model("doccoon", "DoccoonPage")
+    pages = DoccoonPage.objects.only("id", "content").iterator(chunk_size=500)
+    batch = []
+    for page in pages:
+        page.content_hash = content_hash(page.content)
+        batch.append(page)
+        if len(batch) >= 500:
+            DoccoonPage.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    if batch:
+        DoccoonPage.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0017_add_auth_provider"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.RunPython(populate_content_hash, migrations.RunPython.noop),
+    ]
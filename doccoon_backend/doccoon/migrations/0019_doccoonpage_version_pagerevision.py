@@ -0,0 +1,48 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0018_doccoonpage_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name="PageRevision",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                ("is_deleted", models.BooleanField(db_index=True, default=False)),
+                ("version", models.PositiveIntegerField()),
+                ("content", models.TextField(blank=True, default="")),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="revisions",
+                        to="doccoon.doccoonpage",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-version"],
+                "unique_together": {("page", "version")},
+            },
+        ),
+    ]
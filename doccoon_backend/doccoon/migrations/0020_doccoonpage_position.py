@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+def populate_position(apps, schema_editor):
+    """Order existing pages by their page number, spaced by the position gap."""
+    DoccoonPage = apps.get_model("doccoon", "DoccoonPage")
+    DoccoonPage.objects.update(position=models.F("page_number") * 1024)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0019_doccoonpage_version_pagerevision"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="doccoonpage",
+            options={"ordering": ["position"]},
+        ),
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="position",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_position, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="doccoonpage",
+            index=models.Index(
+                fields=["book", "is_deleted", "position"],
+                name="doccoon_doc_book_id_c7df29_idx",
+            ),
+        ),
+    ]
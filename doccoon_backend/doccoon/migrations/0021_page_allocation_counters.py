@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Re-space each book's pages so no two share a position, then seed the
+    book's counters from its last page."""
+    doccoon = apps.get_model("doccoon", "doccoon")
+    DoccoonPage = apps.get_model("doccoon", "DoccoonPage")
+    for book_id in doccoon.objects.values_list("id", flat=True).iterator():
+        pages = list(
+            DoccoonPage.objects.filter(book_id=book_id, is_deleted=False)
+            .only("id", "page_number", "position")
+            .order_by("position", "id")
+        )
+        for number, page in enumerate(pages, start=1):
+            page.page_number = number
+            page.position = number * 1024
+        DoccoonPage.objects.bulk_update(
+            pages, ["page_number", "position"], batch_size=500
+        )
+        doccoon.objects.filter(id=book_id).update(
+            last_page_number=len(pages), last_page_position=len(pages) * 1024
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0020_doccoonpage_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="doccoon",
+            name="last_page_number",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="doccoon",
+            name="last_page_position",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="doccoonpage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_deleted", False)),
+                fields=("book", "position"),
+                name="unique_active_page_position",
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_stats(apps, schema_editor):
+    """Compute the content stats of existing pages and sum them per book."""
+    from doccoon.utils.stats import content_size, count_images
+
+    doccoon = apps.get_model("doccoon", "doccoon")
+    DoccoonPage = apps.get_model("doccoon", "DoccoonPage")
+    pages = DoccoonPage.objects.only("id", "content").iterator(chunk_size=500)
+    batch = []
+    for page in pages:
+        page.image_count = count_images(page.content)
+        page.content_size = content_size(page.content)
+        batch.append(page)
+        if len(batch) >= 500:
+            DoccoonPage.objects.bulk_update(batch, ["image_count", "content_size"])
+            batch = []
+    if batch:
+        DoccoonPage.objects.bulk_update(batch, ["image_count", "content_size"])
+
+    totals = (
+        DoccoonPage.objects.filter(is_deleted=False)
+        .values("book_id")
+        .annotate(
+            pages=Count("id"), images=Sum("image_count"), size=Sum("content_size")
+        )
+    )
+    for row in totals.iterator():
+        doccoon.objects.filter(id=row["book_id"]).update(
+            page_count=row["pages"],
+            image_count=row["images"],
+            book_size=row["size"],
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0021_page_allocation_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="doccoon",
+            name="page_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="doccoon",
+            name="image_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="doccoon",
+            name="book_size",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="image_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="content_size",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
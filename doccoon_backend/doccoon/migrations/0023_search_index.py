@@ -0,0 +1,177 @@
+from django.db import migrations
+
+# PostgreSQL: tsvector columns kept current by triggers, with GIN indexes
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE doccoon_doccoonpage ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION doccoon_page_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector(
+            'pg_catalog.english', coalesce(NEW.content, '')
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_update
+    BEFORE INSERT OR UPDATE OF content ON doccoon_doccoonpage
+    FOR EACH ROW EXECUTE FUNCTION doccoon_page_search_update()
+    """,
+    """
+    UPDATE doccoon_doccoonpage
+    SET search_vector = to_tsvector('pg_catalog.english', content)
+    """,
+    """
+    CREATE INDEX doccoon_page_search_idx
+    ON doccoon_doccoonpage USING gin (search_vector)
+    """,
+    "ALTER TABLE doccoon_doccoon ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION doccoon_book_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector(
+                'pg_catalog.english', coalesce(NEW.title, '')
+            ), 'A')
+            || setweight(to_tsvector(
+                'pg_catalog.english', coalesce(NEW.description, '')
+            ), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER doccoon_book_search_update
+    BEFORE INSERT OR UPDATE OF title, description ON doccoon_doccoon
+    FOR EACH ROW EXECUTE FUNCTION doccoon_book_search_update()
+    """,
+    """
+    UPDATE doccoon_doccoon
+    SET search_vector =
+        setweight(to_tsvector('pg_catalog.english', title), 'A')
+        || setweight(to_tsvector('pg_catalog.english', description), 'B')
+    """,
+    """
+    CREATE INDEX doccoon_book_search_idx
+    ON doccoon_doccoon USING gin (search_vector)
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TRIGGER doccoon_book_search_update ON doccoon_doccoon",
+    "DROP FUNCTION doccoon_book_search_update()",
+    "ALTER TABLE doccoon_doccoon DROP COLUMN search_vector",
+    "DROP TRIGGER doccoon_page_search_update ON doccoon_doccoonpage",
+    "DROP FUNCTION doccoon_page_search_update()",
+    "ALTER TABLE doccoon_doccoonpage DROP COLUMN search_vector",
+]
+
+# SQLite: external content FTS5 tables kept current by triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE doccoon_page_search USING fts5(
+        content,
+        content='doccoon_doccoonpage',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_insert AFTER INSERT ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_update
+    AFTER UPDATE OF content ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(doccoon_page_search, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO doccoon_page_search(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_delete AFTER DELETE ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(doccoon_page_search, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    "INSERT INTO doccoon_page_search(doccoon_page_search) VALUES ('rebuild')",
+    """
+    CREATE VIRTUAL TABLE doccoon_book_search USING fts5(
+        title,
+        description,
+        content='doccoon_doccoon',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER doccoon_book_search_insert AFTER INSERT ON doccoon_doccoon
+    BEGIN
+        INSERT INTO doccoon_book_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_book_search_update
+    AFTER UPDATE OF title, description ON doccoon_doccoon
+    BEGIN
+        INSERT INTO doccoon_book_search(doccoon_book_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO doccoon_book_search(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_book_search_delete AFTER DELETE ON doccoon_doccoon
+    BEGIN
+        INSERT INTO doccoon_book_search(doccoon_book_search, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    "INSERT INTO doccoon_book_search(doccoon_book_search) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE doccoon_book_search",
+    "DROP TRIGGER doccoon_book_search_insert",
+    "DROP TRIGGER doccoon_book_search_update",
+    "DROP TRIGGER doccoon_book_search_delete",
+    "DROP TABLE doccoon_page_search",
+    "DROP TRIGGER doccoon_page_search_insert",
+    "DROP TRIGGER doccoon_page_search_update",
+    "DROP TRIGGER doccoon_page_search_delete",
+]
+
+STATEMENTS = {
+    "postgresql": (POSTGRESQL_FORWARD, POSTGRESQL_REVERSE),
+    "sqlite": (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def create_search_index(apps, schema_editor):
+    forward, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    _, reverse = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in reverse:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0022_book_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,215 @@
+from django.db import migrations
+
+import doccoon.models.fields
+
+COLUMNS = [
+    ("doccoon_doccoonpage", "content"),
+    ("doccoon_pagerevision", "content"),
+    ("doccoon_sharedpage", "content_snapshot"),
+    ("doccoon_sharedbook", "pages_snapshot"),
+]
+
+# The columns become binary, holding UTF-8 text until compress_content or a
+# later save compresses them. The page search index moves out of triggers,
+# which cannot read compressed content. Each ALTER COLUMN rewrites its table
+# under an ACCESS EXCLUSIVE lock, see "Upgrading past migration 0025" in the
+# README for the maintenance window this needs
+POSTGRESQL_FORWARD = [
+    "DROP TRIGGER doccoon_page_search_update ON doccoon_doccoonpage",
+    "DROP FUNCTION doccoon_page_search_update()",
+    """
+    ALTER TABLE doccoon_doccoonpage
+    ALTER COLUMN content TYPE bytea USING convert_to(content, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_pagerevision
+    ALTER COLUMN content TYPE bytea USING convert_to(content, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_sharedpage
+    ALTER COLUMN content_snapshot TYPE bytea
+    USING convert_to(content_snapshot, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_sharedbook
+    ALTER COLUMN pages_snapshot TYPE bytea
+    USING convert_to(pages_snapshot::text, 'UTF8')
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    """
+    ALTER TABLE doccoon_doccoonpage
+    ALTER COLUMN content TYPE text USING convert_from(content, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_pagerevision
+    ALTER COLUMN content TYPE text USING convert_from(content, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_sharedpage
+    ALTER COLUMN content_snapshot TYPE text
+    USING convert_from(content_snapshot, 'UTF8')
+    """,
+    """
+    ALTER TABLE doccoon_sharedbook
+    ALTER COLUMN pages_snapshot TYPE jsonb
+    USING convert_from(pages_snapshot, 'UTF8')::jsonb
+    """,
+    """
+    CREATE FUNCTION doccoon_page_search_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector(
+            'pg_catalog.english', coalesce(NEW.content, '')
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_update
+    BEFORE INSERT OR UPDATE OF content ON doccoon_doccoonpage
+    FOR EACH ROW EXECUTE FUNCTION doccoon_page_search_update()
+    """,
+]
+
+# SQLite columns accept bytes as they are, only the page search table needs
+# to keep its own copy of the text instead of reading it from the pages
+SQLITE_FORWARD = [
+    "DROP TRIGGER doccoon_page_search_insert",
+    "DROP TRIGGER doccoon_page_search_update",
+    "DROP TRIGGER doccoon_page_search_delete",
+    "DROP TABLE doccoon_page_search",
+    """
+    CREATE VIRTUAL TABLE doccoon_page_search USING fts5(
+        content,
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO doccoon_page_search(rowid, content)
+    SELECT id, content FROM doccoon_doccoonpage
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE doccoon_page_search",
+    """
+    CREATE VIRTUAL TABLE doccoon_page_search USING fts5(
+        content,
+        content='doccoon_doccoonpage',
+        content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_insert AFTER INSERT ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_update
+    AFTER UPDATE OF content ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(doccoon_page_search, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO doccoon_page_search(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER doccoon_page_search_delete AFTER DELETE ON doccoon_doccoonpage
+    BEGIN
+        INSERT INTO doccoon_page_search(doccoon_page_search, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    "INSERT INTO doccoon_page_search(doccoon_page_search) VALUES ('rebuild')",
+]
+
+STATEMENTS = {
+    "postgresql": (POSTGRESQL_FORWARD, POSTGRESQL_REVERSE),
+    "sqlite": (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def convert_columns(apps, schema_editor):
+    forward, _ = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in forward:
+        schema_editor.execute(statement)
+
+
+def decompress_columns(schema_editor):
+    """Write compressed values back as plain UTF-8 text."""
+    from doccoon.utils.compression import decompress_text, is_compressed
+
+    connection = schema_editor.connection
+    text = connection.vendor == "sqlite"
+    with connection.cursor() as cursor:
+        for table, column in COLUMNS:
+            cursor.execute(f"SELECT id, {column} FROM {table}")
+            rows = [
+                (decompress_text(value), row_id)
+                for row_id, value in cursor.fetchall()
+                if is_compressed(value)
+            ]
+            cursor.executemany(
+                f"UPDATE {table} SET {column} = %s WHERE id = %s",
+                [
+                    (value if text else value.encode("utf-8"), row_id)
+                    for value, row_id in rows
+                ],
+            )
+
+
+def restore_columns(apps, schema_editor):
+    decompress_columns(schema_editor)
+    _, reverse = STATEMENTS.get(schema_editor.connection.vendor, ([], []))
+    for statement in reverse:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0024_title_trigram_index"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="doccoonpage",
+                    name="content",
+                    field=doccoon.models.fields.CompressedTextField(
+                        blank=True, default=""
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="pagerevision",
+                    name="content",
+                    field=doccoon.models.fields.CompressedTextField(
+                        blank=True, default=""
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="sharedpage",
+                    name="content_snapshot",
+                    field=doccoon.models.fields.CompressedTextField(
+                        blank=True, default=""
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="sharedbook",
+                    name="pages_snapshot",
+                    field=doccoon.models.fields.CompressedJSONField(
+                        blank=True, default=list
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(convert_columns, restore_columns),
+            ],
+        ),
+    ]
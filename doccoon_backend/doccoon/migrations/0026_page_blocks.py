@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import doccoon.models.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0025_compressed_content"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="doccoonpage",
+            name="chunked",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name="PageBlock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.IntegerField()),
+                (
+                    "content",
+                    doccoon.models.fields.CompressedTextField(blank=True, default=""),
+                ),
+                ("content_hash", models.CharField(max_length=64)),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="blocks",
+                        to="doccoon.doccoonpage",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["page", "index"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("page", "index"), name="unique_page_block_index"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+import doccoon.models.fields
+
+
+def mark_checkpoints(apps, schema_editor):
+    """Existing revisions hold full copies of the content."""
+    PageRevision = apps.get_model("doccoon", "PageRevision")
+    PageRevision.objects.update(is_checkpoint=True)
+
+
+def expand_deltas(apps, schema_editor):
+    """Store the full content of every revision again."""
+    from doccoon.utils.delta import apply_delta
+
+    DoccoonPage = apps.get_model("doccoon", "DoccoonPage")
+    PageBlock = apps.get_model("doccoon", "PageBlock")
+    PageRevision = apps.get_model("doccoon", "PageRevision")
+    page_ids = (
+        PageRevision.objects.filter(is_checkpoint=False)
+        .values_list("page_id", flat=True)
+        .distinct()
+    )
+    for page_id in list(page_ids):
+        page = DoccoonPage.objects.get(id=page_id)
+        if page.chunked:
+            blocks = PageBlock.objects.filter(page_id=page_id).order_by("index")
+            content = "".join(block.content for block in blocks)
+        else:
+            content = page.content
+        revisions = PageRevision.objects.filter(page_id=page_id).order_by("-version")
+        for revision in revisions:
+            if revision.is_checkpoint:
+                content = revision.content
+                continue
+            content = apply_delta(content, revision.delta)
+            revision.content = content
+            revision.save(update_fields=["content"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0026_page_blocks"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pagerevision",
+            name="is_checkpoint",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="pagerevision",
+            name="delta",
+            field=doccoon.models.fields.CompressedJSONField(
+                blank=True, default=None, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="pagerevision",
+            name="chain_length",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_checkpoints, expand_deltas),
+    ]
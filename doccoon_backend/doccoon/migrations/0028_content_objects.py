@@ -0,0 +1,121 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import doccoon.models.fields
+
+
+def store_snapshots(apps, schema_editor):
+    """Move share snapshots into content objects."""
+    from doccoon.utils.hashing import content_hash
+    from doccoon.utils.stats import content_size
+
+    ContentObject = apps.get_model("doccoon", "ContentObject")
+    SharedBook = apps.get_model("doccoon", "SharedBook")
+    SharedPage = apps.get_model("doccoon", "SharedPage")
+
+    def store(content):
+        digest = content_hash(content)
+        ContentObject.objects.get_or_create(
+            digest=digest,
+            defaults={"content": content, "size": content_size(content)},
+        )
+        return digest
+
+    for share in SharedBook.objects.iterator(chunk_size=100):
+        share.manifest = [
+            {
+                "page_number": page["page_number"],
+                "digest": store(page["content"]),
+                "size": content_size(page["content"]),
+            }
+            for page in share.pages_snapshot
+        ]
+        share.save(update_fields=["manifest"])
+    for share in SharedPage.objects.iterator(chunk_size=100):
+        share.content_object_id = store(share.content_snapshot)
+        share.save(update_fields=["content_object"])
+
+
+def restore_snapshots(apps, schema_editor):
+    """Copy content objects back into the share snapshots."""
+    ContentObject = apps.get_model("doccoon", "ContentObject")
+    SharedBook = apps.get_model("doccoon", "SharedBook")
+    SharedPage = apps.get_model("doccoon", "SharedPage")
+
+    for share in SharedBook.objects.iterator(chunk_size=100):
+        contents = dict(
+            ContentObject.objects.filter(
+                digest__in=[page["digest"] for page in share.manifest]
+            ).values_list("digest", "content")
+        )
+        field = ContentObject._meta.get_field("content")
+        share.pages_snapshot = [
+            {
+                "page_number": page["page_number"],
+                "content": field.from_stored(contents[page["digest"]]),
+            }
+            for page in share.manifest
+        ]
+        share.save(update_fields=["pages_snapshot"])
+    for share in SharedPage.objects.select_related("content_object").iterator(
+        chunk_size=100
+    ):
+        share.content_snapshot = share.content_object.content
+        share.save(update_fields=["content_snapshot"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0027_revision_deltas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentObject",
+            fields=[
+                (
+                    "digest",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                (
+                    "content",
+                    doccoon.models.fields.CompressedTextField(blank=True, default=""),
+                ),
+                ("size", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="sharedbook",
+            name="manifest",
+            field=doccoon.models.fields.CompressedJSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="sharedpage",
+            name="content_object",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="page_shares",
+                to="doccoon.contentobject",
+            ),
+        ),
+        migrations.RunPython(store_snapshots, restore_snapshots),
+        migrations.AlterField(
+            model_name="sharedpage",
+            name="content_object",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="page_shares",
+                to="doccoon.contentobject",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="sharedbook",
+            name="pages_snapshot",
+        ),
+        migrations.RemoveField(
+            model_name="sharedpage",
+            name="content_snapshot",
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def store_headings(apps, schema_editor):
+    from doccoon.utils.stats import page_headings
+
+    ContentObject = apps.get_model("doccoon", "ContentObject")
+    SharedBook = apps.get_model("doccoon", "SharedBook")
+
+    objects = ContentObject.objects.only("digest", "content")
+    for obj in objects.iterator(chunk_size=100):
+        obj.headings = page_headings(obj.content)
+        obj.save(update_fields=["headings"])
+
+    for share in SharedBook.objects.only("manifest").iterator(chunk_size=100):
+        headings = dict(
+            ContentObject.objects.filter(
+                digest__in=[page["digest"] for page in share.manifest]
+            ).values_list("digest", "headings")
+        )
+        for page in share.manifest:
+            page["headings"] = headings.get(page["digest"], [])
+        share.save(update_fields=["manifest"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0028_content_objects"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentobject",
+            name="headings",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(store_headings, migrations.RunPython.noop),
+    ]
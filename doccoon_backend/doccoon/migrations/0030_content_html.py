@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+import doccoon.models.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0029_content_headings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentobject",
+            name="html",
+            field=doccoon.models.fields.CompressedTextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="contentobject",
+            name="html_version",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
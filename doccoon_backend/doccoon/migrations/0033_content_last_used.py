@@ -0,0 +1,18 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("doccoon", "0032_book_imports"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentobject",
+            name="last_used_at",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
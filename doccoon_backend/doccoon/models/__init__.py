@@ -1,7 +1,11 @@
 from .abstracts import DoccoonBaseModel
 from .ai_provider_key import AIProviderKey
-from .book import BOOK_STATUS, DoccoonPage, doccoon
+from .book import BOOK_STATUS, PAGE_POSITION_GAP, DoccoonPage, PageBlock, doccoon
+from .book_import import IMPORT_STATUS, BookImport
+from .content import ContentObject
+from .export import EXPORT_FORMAT, EXPORT_STATUS, BookExport
 from .notification import NOTIFICATION_TYPE, Notification
+from .revision import PageRevision
 from .settings import UserSettings
 from .sharing import SharedBook, SharedPage
 from .user import DoccoonBaseUserManger, User
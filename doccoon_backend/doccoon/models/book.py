@@ -1,7 +1,18 @@
+from contextlib import contextmanager
+from itertools import groupby
+from typing import Iterable
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
 
 from doccoon.models.abstracts import DoccoonBaseModel
+from doccoon.models.fields import CompressedTextField
 from doccoon.models.user import User
+from doccoon.utils import hashing, stats
+from doccoon.utils.blocks import split_blocks
+from doccoon.utils.search_index import index_page_content
 
 
 class BOOK_STATUS(models.TextChoices):
@@ -23,6 +34,13 @@ class doccoon(DoccoonBaseModel):
         default=BOOK_STATUS.Draft,
         db_index=True,
     )
+    # Highest page number and position handed out, new pages go past them
+    last_page_number = models.IntegerField(default=0)
+    last_page_position = models.BigIntegerField(default=0)
+    # Totals over the active pages, kept up to date as pages change
+    page_count = models.IntegerField(default=0)
+    image_count = models.IntegerField(default=0)
+    book_size = models.BigIntegerField(default=0)
 
     class Meta:
         indexes = [
@@ -33,17 +51,286 @@ class doccoon(DoccoonBaseModel):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def add_page_stats(
+        cls, book_id: int, pages: int = 0, images: int = 0, size: int = 0
+    ) -> None:
+        """Apply a change in active pages to a book's stored totals."""
+        if pages or images or size:
+            cls.objects.filter(id=book_id).update(
+                page_count=F("page_count") + pages,
+                image_count=F("image_count") + images,
+                book_size=F("book_size") + size,
+            )
+
+
+# Distance between the positions of consecutive pages after compaction
+PAGE_POSITION_GAP = 1024
+
 
 class DoccoonPage(DoccoonBaseModel):
     book = models.ForeignKey(doccoon, on_delete=models.CASCADE, db_index=True)
-    content = models.TextField(blank=True, default="")
+    content = CompressedTextField(blank=True, default="")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    version = models.PositiveIntegerField(default=1)
     page_number = models.IntegerField()
+    # Sparse order key, pages sort by position and are numbered from it
+    position = models.BigIntegerField(default=0)
+    # Content stats, summed into the book's totals
+    image_count = models.IntegerField(default=0)
+    content_size = models.IntegerField(default=0)
+    # Whether the content is stored in PageBlock rows instead of this one
+    chunked = models.BooleanField(default=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["book", "is_deleted", "page_number"]),
+            models.Index(fields=["book", "is_deleted", "position"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "position"],
+                condition=Q(is_deleted=False),
+                name="unique_active_page_position",
+            ),
         ]
-        ordering = ["page_number"]
+        ordering = ["position"]
 
     def __str__(self):
         return f"Page {self.page_number} of {self.book.title}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        page = super().from_db(db, field_names, values)
+        if "is_deleted" in field_names:
+            # Whether the stored row is counted in the book's totals
+            page._counted = not page.is_deleted
+        if "chunked" in field_names:
+            page._stored_chunked = page.chunked
+            if page.chunked and "content" in field_names:
+                # Read from the blocks when first accessed, see refresh_from_db
+                del page.__dict__["content"]
+        return page
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        if fields is not None and "content" in fields and self.chunked:
+            self.content = PageBlock.read(self.pk)
+            fields = [field for field in fields if field != "content"]
+            if not fields:
+                return
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None and self.chunked:
+            # The reloaded row holds no content, reassemble it on next access
+            self.__dict__.pop("content", None)
+
+    def split_content(self) -> list[str]:
+        """Decide whether the content is stored in blocks, returning them if so.
+
+        Relies on ``content_size`` being current, see update_content_stats.
+        """
+        threshold = settings.PAGE_BLOCK_THRESHOLD
+        self.chunked = bool(threshold) and self.content_size >= threshold
+        if not self.chunked:
+            return []
+        return split_blocks(self.content, settings.PAGE_BLOCK_SIZE)
+
+    @classmethod
+    @contextmanager
+    def storing_content(cls, pages: list["DoccoonPage"]):
+        """Write the content of large pages to blocks while their rows are saved.
+
+        Chunked pages have their content column left blank by the saves made
+        inside the block. Once the rows exist, only the blocks that changed
+        are written, and blocks of pages no longer chunked are dropped.
+        """
+        stored = [
+            # Pages loaded without the flag may have blocks, new ones do not
+            (
+                page,
+                page.split_content(),
+                getattr(page, "_stored_chunked", not page._state.adding),
+            )
+            for page in pages
+        ]
+        contents = [(page, page.content) for page in pages if page.chunked]
+        for page, _ in contents:
+            page.content = ""
+        try:
+            yield
+        finally:
+            for page, content in contents:
+                page.content = content
+
+        unchunked = []
+        for page, blocks, was_chunked in stored:
+            if page.chunked:
+                PageBlock.write(page.pk, blocks)
+            elif was_chunked:
+                unchunked.append(page.pk)
+            page._stored_chunked = page.chunked
+        if unchunked:
+            PageBlock.objects.filter(page_id__in=unchunked).delete()
+
+    def update_content_stats(self) -> tuple[int, int]:
+        """Recompute the content stats, returning how much they changed."""
+        image_count = stats.count_images(self.content)
+        content_size = stats.content_size(self.content)
+        delta = (image_count - self.image_count, content_size - self.content_size)
+        self.image_count, self.content_size = image_count, content_size
+        return delta
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.position:
+            self.position = self.page_number * PAGE_POSITION_GAP
+        adding = self._state.adding
+        counted = not adding and getattr(self, "_counted", not self.is_deleted)
+        self._counted = counted
+        old_stats = (self.image_count, self.content_size) if counted else (0, 0)
+        # Keep the digest and stats in sync with the content they describe
+        update_fields = kwargs.get("update_fields")
+        content_saved = update_fields is None or "content" in update_fields
+        if content_saved:
+            self.content_hash = hashing.content_hash(self.content)
+            self.update_content_stats()
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "content_hash",
+                    "image_count",
+                    "content_size",
+                    "chunked",
+                }
+        if update_fields is None or "is_deleted" in update_fields:
+            self._counted = not self.is_deleted
+        new_stats = (self.image_count, self.content_size) if self._counted else (0, 0)
+        with self.storing_content([self] if content_saved else []):
+            super().save(*args, **kwargs)
+        if content_saved:
+            index_page_content([(self.pk, self.content)])
+        doccoon.add_page_stats(
+            self.book_id,
+            pages=self._counted - counted,
+            images=new_stats[0] - old_stats[0],
+            size=new_stats[1] - old_stats[1],
+        )
+        if adding:
+            # Keep the book's counters past pages not created through them
+            doccoon.objects.filter(id=self.book_id).update(
+                last_page_number=Greatest(
+                    F("last_page_number"), Value(self.page_number)
+                ),
+                last_page_position=Greatest(
+                    F("last_page_position"), Value(self.position)
+                ),
+            )
+
+
+class PageBlock(models.Model):
+    """An ordered slice of the content of a chunked page.
+
+    Large pages are split into blocks so an edit rewrites the few blocks it
+    touches instead of the whole content.
+    """
+
+    page = models.ForeignKey(
+        DoccoonPage, on_delete=models.CASCADE, related_name="blocks"
+    )
+    index = models.IntegerField()
+    content = CompressedTextField(blank=True, default="")
+    content_hash = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["page", "index"], name="unique_page_block_index"
+            ),
+        ]
+        ordering = ["page", "index"]
+
+    def __str__(self):
+        return f"Block {self.index} of page {self.page_id}"
+
+    @classmethod
+    def read(cls, page_id: int) -> str:
+        """Reassemble a chunked page's content from its blocks."""
+        return cls.read_many([page_id]).get(page_id, "")
+
+    @classmethod
+    def read_many(cls, page_ids: Iterable[int]) -> dict[int, str]:
+        """Reassemble the content of chunked pages, keyed by page id.
+
+        Blocks are streamed in order and decompressed one at a time.
+        """
+        field = cls._meta.get_field("content")
+        rows = (
+            cls.objects.filter(page_id__in=list(page_ids))
+            .order_by("page_id", "index")
+            .values_list("page_id", "content")
+            .iterator(chunk_size=100)
+        )
+        return {
+            page_id: "".join(field.from_stored(data) for _, data in blocks)
+            for page_id, blocks in groupby(rows, key=lambda row: row[0])
+        }
+
+    @classmethod
+    def write(cls, page_id: int, blocks: list[str]) -> int:
+        """Store a page's blocks, writing only those that changed.
+
+        Blocks matching the stored ones at the start and end of the page are
+        kept. Those after the edit only have their index shifted when the
+        number of blocks changes.
+
+        Returns:
+            The number of blocks whose content was written.
+        """
+        hashes = [hashing.content_hash(block) for block in blocks]
+        old = list(
+            cls.objects.filter(page_id=page_id)
+            .order_by("index")
+            .values_list("id", "content_hash")
+        )
+        common = min(len(old), len(blocks))
+        prefix = 0
+        while prefix < common and old[prefix][1] == hashes[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < common - prefix and old[-1 - suffix][1] == hashes[-1 - suffix]:
+            suffix += 1
+
+        old_changed = old[prefix : len(old) - suffix]
+        new_changed = list(range(prefix, len(blocks) - suffix))
+        shift = len(blocks) - len(old)
+        if len(old_changed) > len(new_changed):
+            surplus = old_changed[len(new_changed) :]
+            cls.objects.filter(id__in=[row_id for row_id, _ in surplus]).delete()
+        if shift and suffix:
+            # Park the kept tail on unique negative indexes first, so the
+            # unique constraint holds after every row of the update
+            cls.objects.filter(page_id=page_id, index__gte=len(old) - suffix).update(
+                index=-F("index") - shift - 1
+            )
+            cls.objects.filter(page_id=page_id, index__lt=0).update(
+                index=-F("index") - 1
+            )
+
+        rewritten = [
+            cls(
+                id=row_id,
+                index=index,
+                content=blocks[index],
+                content_hash=hashes[index],
+            )
+            for (row_id, _), index in zip(old_changed, new_changed)
+        ]
+        cls.objects.bulk_update(rewritten, ["content", "content_hash"])
+        cls.objects.bulk_create(
+            cls(
+                page_id=page_id,
+                index=index,
+                content=blocks[index],
+                content_hash=hashes[index],
+            )
+            for index in new_changed[len(old_changed) :]
+        )
+        return len(new_changed)
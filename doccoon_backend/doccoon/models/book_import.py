@@ -0,0 +1,46 @@
+from django.db import models
+
+from doccoon.models.abstracts import DoccoonBaseModel
+from doccoon.models.book import doccoon
+from doccoon.models.user import User
+
+
+class IMPORT_STATUS(models.TextChoices):
+    Pending = "Pending"
+    Running = "Running"
+    Done = "Done"
+    Failed = "Failed"
+
+
+class BookImport(DoccoonBaseModel):
+    """An upload of Markdown files imported as pages in the background."""
+
+    requested_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="book_imports"
+    )
+    # The book the pages go to, created by the import when not given
+    book = models.ForeignKey(
+        doccoon,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="imports",
+    )
+    status = models.CharField(
+        max_length=10, choices=IMPORT_STATUS.choices, default=IMPORT_STATUS.Pending
+    )
+    # The uploaded file's own name, and its name in the imports storage
+    file_name = models.CharField(max_length=255)
+    upload_name = models.CharField(max_length=255, blank=True, default="")
+    # Details of a new book, the front matter of the upload fills in the rest
+    title = models.CharField(max_length=255, blank=True, default="")
+    description = models.TextField(blank=True, default="")
+    year = models.IntegerField(null=True, blank=True)
+    # Progress, in Markdown files read out of the upload and pages created
+    file_count = models.IntegerField(default=0)
+    files_done = models.IntegerField(default=0)
+    page_count = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"Import of {self.file_name}"
@@ -0,0 +1,30 @@
+from django.db import models
+from django.utils import timezone
+
+from doccoon.models.fields import CompressedTextField
+
+
+class ContentObject(models.Model):
+    """Immutable text stored once, under the SHA-256 digest of its content.
+
+    The digest is the one pages keep in ``content_hash``, so share snapshots
+    of unchanged pages point to the objects stored for earlier snapshots.
+    """
+
+    digest = models.CharField(max_length=64, primary_key=True)
+    content = CompressedTextField(blank=True, default="")
+    # Size of the content in UTF-8 bytes
+    size = models.IntegerField(default=0)
+    # Markdown headings of the content, see doccoon.utils.stats.page_headings
+    headings = models.JSONField(default=list, blank=True)
+    # Sanitized HTML rendering, when SHARE_RENDER_HTML is on, and the
+    # doccoon.utils.render.RENDER_VERSION it was rendered by
+    html = CompressedTextField(null=True, blank=True)
+    html_version = models.CharField(max_length=16, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Last time a share was taken of the content, objects are only collected
+    # once unused for a while
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Content {self.digest[:12]}"
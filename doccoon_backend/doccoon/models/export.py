@@ -0,0 +1,40 @@
+from django.db import models
+
+from doccoon.models.abstracts import DoccoonBaseModel
+from doccoon.models.book import doccoon
+from doccoon.models.user import User
+
+
+class EXPORT_FORMAT(models.TextChoices):
+    Markdown = "markdown"
+    Html = "html"
+    Epub = "epub"
+
+
+class EXPORT_STATUS(models.TextChoices):
+    Pending = "Pending"
+    Running = "Running"
+    Done = "Done"
+    Failed = "Failed"
+
+
+class BookExport(DoccoonBaseModel):
+    """An export of a book built to a file in the background."""
+
+    book = models.ForeignKey(
+        doccoon, on_delete=models.CASCADE, related_name="exports", db_index=True
+    )
+    requested_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="book_exports"
+    )
+    format = models.CharField(max_length=10, choices=EXPORT_FORMAT.choices)
+    status = models.CharField(
+        max_length=10, choices=EXPORT_STATUS.choices, default=EXPORT_STATUS.Pending
+    )
+    # Name of the built file in the exports storage, and its size in bytes
+    file_name = models.CharField(max_length=255, blank=True, default="")
+    size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"{self.format} export of {self.book}"
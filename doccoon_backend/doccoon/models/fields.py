@@ -0,0 +1,84 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+from doccoon.utils.compression import compress_text, decompress_text
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """Decompress a loaded value the first time it is read."""
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if instance is not None and isinstance(value, (bytes, memoryview)):
+            value = self.field.from_stored(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # A data descriptor, so reads go through __get__ once a value is set
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.TextField):
+    """Text stored in a binary column, compressed once it passes a size
+    threshold (see doccoon.utils.compression).
+
+    Loaded values stay compressed until the attribute is read, and are saved
+    back as they are if it never was. ``values()`` and ``values_list()``
+    return the stored bytes, decode them with ``from_stored()``. Database
+    lookups and functions cannot see into compressed values.
+    """
+
+    descriptor_class = CompressedTextDescriptor
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def from_db_value(self, value, expression, connection):
+        # Rows written before the column held bytes come back as text
+        if isinstance(value, str):
+            return value.encode("utf-8")
+        return value
+
+    def from_stored(self, data):
+        return decompress_text(data)
+
+    def to_stored(self, value) -> bytes:
+        return compress_text(self.to_python(value))
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if isinstance(value, memoryview):
+            value = bytes(value)
+        if not isinstance(value, bytes):
+            value = self.to_stored(value)
+        return connection.Database.Binary(value)
+
+    def pre_save(self, model_instance, add):
+        # Save an unread value as stored instead of recompressing it
+        if self.attname in model_instance.__dict__:
+            return model_instance.__dict__[self.attname]
+        return super().pre_save(model_instance, add)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+
+class CompressedJSONField(CompressedTextField):
+    """A JSON document stored like CompressedTextField."""
+
+    def from_stored(self, data):
+        return json.loads(decompress_text(data))
+
+    def to_python(self, value):
+        return value
+
+    def to_stored(self, value) -> bytes:
+        return compress_text(json.dumps(value, cls=DjangoJSONEncoder))
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj), cls=DjangoJSONEncoder)
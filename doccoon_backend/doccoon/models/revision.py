@@ -0,0 +1,31 @@
+from django.db import models
+
+from doccoon.models.abstracts import DoccoonBaseModel
+from doccoon.models.book import DoccoonPage
+from doccoon.models.fields import CompressedJSONField, CompressedTextField
+
+
+class PageRevision(DoccoonBaseModel):
+    """Content of a page as it was at a superseded version.
+
+    Checkpoints hold the full content. Other revisions hold a reverse delta
+    from the content of the next newer revision, or of the page itself for
+    the newest one (see doccoon.utils.delta).
+    """
+
+    page = models.ForeignKey(
+        DoccoonPage, on_delete=models.CASCADE, related_name="revisions"
+    )
+    version = models.PositiveIntegerField()
+    content = CompressedTextField(blank=True, default="")
+    is_checkpoint = models.BooleanField(default=False)
+    delta = CompressedJSONField(null=True, blank=True, default=None)
+    # Delta revisions since the last checkpoint below, this one included
+    chain_length = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = ["page", "version"]
+        ordering = ["-version"]
+
+    def __str__(self):
+        return f"Revision {self.version} of page {self.page_id}"
@@ -4,6 +4,8 @@ from django.db import models
 
 from doccoon.models.abstracts import DoccoonBaseModel
 from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.content import ContentObject
+from doccoon.models.fields import CompressedJSONField
 from doccoon.models.user import User
 
 
@@ -18,7 +20,8 @@ class SharedBook(DoccoonBaseModel):
         default=uuid.uuid4, unique=True, editable=False, db_index=True
     )
     is_active = models.BooleanField(default=True, db_index=True)
-    pages_snapshot = models.JSONField(default=list, blank=True)
+    # Pages as shared, in order: page number, content digest and size
+    manifest = CompressedJSONField(default=list, blank=True)
 
     class Meta:
         unique_together = ["book", "shared_by"]
@@ -44,7 +47,9 @@ class SharedPage(DoccoonBaseModel):
         default=uuid.uuid4, unique=True, editable=False, db_index=True
     )
     is_active = models.BooleanField(default=True, db_index=True)
-    content_snapshot = models.TextField(blank=True, default="")
+    content_object = models.ForeignKey(
+        ContentObject, on_delete=models.PROTECT, related_name="page_shares"
+    )
 
     class Meta:
         unique_together = ["page", "shared_by"]
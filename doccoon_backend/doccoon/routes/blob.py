@@ -0,0 +1,7 @@
+from django.urls import path
+
+from doccoon.views.blob import BlobApiView
+
+urlpatterns = [
+    path("<str:digest>.<str:ext>", BlobApiView.as_view()),
+]
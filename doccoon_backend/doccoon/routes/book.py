@@ -1,16 +1,41 @@
 from django.urls import include, path
 
 from doccoon.views.book import (
+    BookCloneApiView,
     BookDetailApiView,
     BookListCreateApiView,
     BookPublishApiView,
 )
+from doccoon.views.book_import import (
+    BookImportCreateApiView,
+    BookImportDetailApiView,
+    BookPagesImportApiView,
+)
+from doccoon.views.export import (
+    BookExportApiView,
+    BookExportCreateApiView,
+    BookExportDetailApiView,
+    BookExportDownloadApiView,
+)
+from doccoon.views.search import BookAutocompleteApiView
 from doccoon.views.sharing import BookShareApiView, PageShareApiView
 
 urlpatterns = [
     path("", BookListCreateApiView.as_view()),
+    path("autocomplete/", BookAutocompleteApiView.as_view()),
+    path("imports/", BookImportCreateApiView.as_view()),
+    path("imports/<int:import_id>/", BookImportDetailApiView.as_view()),
     path("<int:book_id>/", BookDetailApiView.as_view()),
     path("<int:book_id>/publish/", BookPublishApiView.as_view()),
+    path("<int:book_id>/clone/", BookCloneApiView.as_view()),
+    path("<int:book_id>/export/", BookExportApiView.as_view()),
+    path("<int:book_id>/exports/", BookExportCreateApiView.as_view()),
+    path("<int:book_id>/exports/<int:export_id>/", BookExportDetailApiView.as_view()),
+    path(
+        "<int:book_id>/exports/<int:export_id>/download/",
+        BookExportDownloadApiView.as_view(),
+    ),
+    path("<int:book_id>/imports/", BookPagesImportApiView.as_view()),
     path("<int:book_id>/pages/", include("doccoon.routes.page")),
     path("<int:book_id>/share/", BookShareApiView.as_view()),
     path("<int:book_id>/pages/<int:page_id>/share/", PageShareApiView.as_view()),
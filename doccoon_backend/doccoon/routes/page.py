@@ -1,11 +1,29 @@
 from django.urls import path
 
 from doccoon.views.page import (
+    PageBulkApiView,
     PageDetailApiView,
     PageListCreateApiView,
+    PageMoveApiView,
+)
+from doccoon.views.revision import (
+    PageRevisionDetailApiView,
+    PageRevisionListApiView,
+    PageRevisionRestoreApiView,
 )
 
 urlpatterns = [
     path("", PageListCreateApiView.as_view()),
+    path("bulk/", PageBulkApiView.as_view()),
+    path("move/", PageMoveApiView.as_view()),
     path("<int:page_id>/", PageDetailApiView.as_view()),
+    path("<int:page_id>/revisions/", PageRevisionListApiView.as_view()),
+    path(
+        "<int:page_id>/revisions/<int:version>/",
+        PageRevisionDetailApiView.as_view(),
+    ),
+    path(
+        "<int:page_id>/revisions/<int:version>/restore/",
+        PageRevisionRestoreApiView.as_view(),
+    ),
 ]
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from doccoon.views.search import SearchApiView
+
+urlpatterns = [
+    path("", SearchApiView.as_view()),
+]
@@ -2,10 +2,12 @@ from django.urls import path
 
 from doccoon.views.sharing import (
     PublicSharedBookApiView,
+    PublicSharedBookPagesApiView,
     PublicSharedPageApiView,
 )
 
 urlpatterns = [
     path("book/<str:share_token>/", PublicSharedBookApiView.as_view()),
+    path("book/<str:share_token>/pages/", PublicSharedBookPagesApiView.as_view()),
     path("page/<str:share_token>/", PublicSharedPageApiView.as_view()),
 ]
@@ -1,14 +1,16 @@
-import re
 from datetime import datetime
+from typing import Iterator
 
+from django.db.models import QuerySet
 from rest_framework import serializers
 
 from doccoon.models.book import DoccoonPage, doccoon
-from doccoon.services.book import get_book_pages
+from doccoon.serializers.page import serialize_page_rows
+from doccoon.serializers.values import ValuesSerializer
+from doccoon.services.book import BOOK_STREAM_BATCH_SIZE, get_book_pages
+from doccoon.services.page import number_pages
 from doccoon.utils.sanitize import sanitize_plain_text
 
-IMAGE_PATTERN = re.compile(r"!\[.*?\]\(.*?\)|<img\s[^>]*>")
-
 
 class PageSerializer(serializers.ModelSerializer):
     """serializer for page with content"""
@@ -18,6 +20,7 @@ class PageSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "content",
+            "version",
             "page_number",
         ]
         read_only_fields = [
@@ -72,15 +75,12 @@ class BookSerializer(serializers.ModelSerializer):
 
 
 class BookListSerializer(BookSerializer):
-    """Serializer for listing books with computed stats.
+    """Serializer for listing books with their stored stats.
 
-    IMPORTANT: The queryset must use prefetch_related('doccoonpage_set') for optimal performance.
-    This serializer uses the prefetched pages to compute stats without additional queries.
+    The stats are kept up to date as pages change, so listing books never
+    loads page content.
     """
 
-    page_count = serializers.SerializerMethodField()
-    image_count = serializers.SerializerMethodField()
-    book_size = serializers.SerializerMethodField()
     created_at = serializers.DateTimeField(read_only=True)
     modified_at = serializers.DateTimeField(read_only=True)
 
@@ -101,30 +101,6 @@ class BookListSerializer(BookSerializer):
             "modified_at",
         ]
 
-    def _get_active_pages(self, obj) -> list:
-        """Get active pages from prefetched data to avoid N+1 queries."""
-        # Use prefetched data if available (from prefetch_related)
-        if (
-            hasattr(obj, "_prefetched_objects_cache")
-            and "doccoonpage_set" in obj._prefetched_objects_cache
-        ):
-            return [p for p in obj.doccoonpage_set.all() if not p.is_deleted]
-        # Fallback: filter in DB (slower, but works without prefetch)
-        return list(obj.doccoonpage_set.filter(is_deleted=False))
-
-    def get_page_count(self, obj) -> int:
-        if hasattr(obj, "_page_count"):
-            return obj._page_count
-        return len(self._get_active_pages(obj))
-
-    def get_image_count(self, obj) -> int:
-        pages = self._get_active_pages(obj)
-        return sum(len(IMAGE_PATTERN.findall(page.content or "")) for page in pages)
-
-    def get_book_size(self, obj) -> int:
-        pages = self._get_active_pages(obj)
-        return sum(len((page.content or "").encode("utf-8")) for page in pages)
-
 
 class GetBookWithPagesSerializer(BookSerializer):
     """Serializer for book detail with pages.
@@ -146,7 +122,40 @@ class GetBookWithPagesSerializer(BookSerializer):
             and "doccoonpage_set" in obj._prefetched_objects_cache
         ):
             pages = [p for p in obj.doccoonpage_set.all() if not p.is_deleted]
-            pages.sort(key=lambda p: p.page_number)
-            return PageSerializer(pages, many=True).data
+            pages.sort(key=lambda p: (p.position, p.id))
+            return PageSerializer(number_pages(pages), many=True).data
         # Fallback to service function
-        return PageSerializer(get_book_pages(obj.id), many=True).data
+        return PageSerializer(number_pages(get_book_pages(obj.id)), many=True).data
+
+
+# Fast paths of the hot read endpoints, see doccoon.serializers.values
+book_list_values = ValuesSerializer(BookListSerializer)
+page_values = ValuesSerializer(PageSerializer, computed=["page_number"])
+
+
+def _book_page_rows(book: doccoon) -> QuerySet:
+    return get_book_pages(book.id).values(*page_values.columns, "chunked")
+
+
+def serialize_book(book: doccoon) -> dict:
+    """Serialize a book with its pages like GetBookWithPagesSerializer,
+    reading the pages as values() rows."""
+    pages = serialize_page_rows(_book_page_rows(book), page_values)
+    return {**BookSerializer(book).data, "pages": list(pages)}
+
+
+def stream_book_pages(book: doccoon) -> Iterator[dict]:
+    """Serialize a book's pages one at a time, as they come off a
+    server-side cursor, in the shape of GetBookWithPagesSerializer."""
+    rows = _book_page_rows(book).iterator(chunk_size=BOOK_STREAM_BATCH_SIZE)
+    return serialize_page_rows(rows, page_values)
+
+
+class BookCloneSerializer(serializers.Serializer):
+    """Options for copying a book."""
+
+    title = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+    def validate_title(self, value: str) -> str:
+        """Sanitize title to prevent XSS attacks."""
+        return sanitize_plain_text(value)
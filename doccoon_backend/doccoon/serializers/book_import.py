@@ -0,0 +1,63 @@
+from rest_framework import serializers
+
+from doccoon.models.book_import import IMPORT_STATUS, BookImport
+from doccoon.serializers.book import BookSerializer
+from doccoon.services.book_import import IMPORT_MAX_SIZE
+from doccoon.utils.sanitize import sanitize_plain_text
+
+
+class BookImportCreateSerializer(serializers.Serializer):
+    """An upload to import, with the details of the book it creates."""
+
+    file = serializers.FileField()
+    title = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True)
+    year = serializers.IntegerField(required=False)
+
+    def validate_file(self, value):
+        if value.size > IMPORT_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Uploads are limited to {IMPORT_MAX_SIZE // (1024 * 1024)} MB."
+            )
+        return value
+
+    def validate_title(self, value: str) -> str:
+        """Sanitize title to prevent XSS attacks."""
+        return sanitize_plain_text(value)
+
+    def validate_description(self, value: str) -> str:
+        """Sanitize description to prevent XSS attacks."""
+        if value:
+            return sanitize_plain_text(value)
+        return value
+
+    def validate_year(self, value):
+        return BookSerializer().validate_year(value)
+
+
+class BookImportSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookImport
+        fields = [
+            "id",
+            "book",
+            "status",
+            "file_name",
+            "file_count",
+            "files_done",
+            "page_count",
+            "progress",
+            "error",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj: BookImport) -> int:
+        """Percentage of the upload's Markdown files imported."""
+        if obj.status == IMPORT_STATUS.Done:
+            return 100
+        if not obj.file_count:
+            return 0
+        return obj.files_done * 100 // obj.file_count
@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from doccoon.models.export import EXPORT_FORMAT, BookExport
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """Query parameters of a streamed export. The format is passed as
+    ``type``, DRF keeps ``format`` for picking a renderer."""
+
+    type = serializers.ChoiceField(
+        choices=EXPORT_FORMAT.choices, default=EXPORT_FORMAT.Markdown
+    )
+
+
+class BookExportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookExport
+        fields = ["id", "format", "status", "size", "error", "created_at"]
+        read_only_fields = ["id", "status", "size", "error", "created_at"]
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from doccoon.models.notification import Notification
+from doccoon.serializers.values import ValuesSerializer
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -17,3 +18,6 @@ class NotificationSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = fields
+
+
+notification_values = ValuesSerializer(NotificationSerializer)
@@ -1,33 +1,90 @@
+from itertools import batched
+from typing import Iterable, Iterator
+
 from rest_framework import serializers
 
-from doccoon.models.book import DoccoonPage
+from doccoon.models.book import DoccoonPage, PageBlock
+from doccoon.services.blob import extract_data_images
+from doccoon.serializers.values import ValuesSerializer
+from doccoon.services.page import update_page
 from doccoon.utils.sanitize import sanitize_markdown
 
+# Chunked pages whose blocks are read together
+PAGE_BLOCK_BATCH_SIZE = 100
+
 
 class CreatePageSerializer(serializers.ModelSerializer):
     content = serializers.CharField(required=False, allow_blank=True, default="")
+    after = serializers.IntegerField(required=False, allow_null=True, write_only=True)
 
     class Meta:
         model = DoccoonPage
-        fields = ["id", "content", "page_number"]
+        fields = ["id", "content", "page_number", "after"]
         read_only_fields = ["id", "page_number"]
 
     def validate_content(self, value: str) -> str:
         """Sanitize content to prevent XSS attacks."""
-        return sanitize_markdown(value)
+        return sanitize_markdown(extract_data_images(value))
 
 
 class UpdatePageSerializer(serializers.ModelSerializer):
-    content = serializers.CharField(required=False, allow_blank=True)
+    """Validate a page update.
+
+    Content is sanitized by update_page, which can skip unchanged content
+    and merge edits made from an older version.
+    """
+
+    content = serializers.CharField(
+        required=False, allow_blank=True, trim_whitespace=False
+    )
+    base_version = serializers.IntegerField(
+        required=False, min_value=1, write_only=True
+    )
 
     class Meta:
         model = DoccoonPage
-        fields = ["id", "content", "page_number"]
+        fields = ["id", "content", "page_number", "base_version"]
         read_only_fields = ["id"]
 
-    def validate_content(self, value: str) -> str:
-        """Sanitize content to prevent XSS attacks."""
-        return sanitize_markdown(value)
+    def update(self, instance: DoccoonPage, validated_data: dict) -> DoccoonPage:
+        """Only write the fields that actually changed.
+
+        Sets ``self.written`` to tell callers whether the page was saved.
+        Raises PageConflictError if concurrent edits cannot be merged.
+        """
+        base_version = validated_data.pop("base_version", None)
+        self.written = update_page(instance, validated_data, base_version)
+        return instance
+
+
+class PageOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["insert", "delete"])
+    offset = serializers.IntegerField(min_value=0)
+    text = serializers.CharField(
+        required=False, allow_blank=True, trim_whitespace=False
+    )
+    length = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs: dict) -> dict:
+        if attrs["op"] == "insert" and "text" not in attrs:
+            raise serializers.ValidationError("Insert operations require text.")
+        if attrs["op"] == "delete" and "length" not in attrs:
+            raise serializers.ValidationError("Delete operations require a length.")
+        return attrs
+
+
+class PatchPageSerializer(serializers.Serializer):
+    """Text operations to apply against a known version of the page content."""
+
+    base_hash = serializers.CharField(max_length=64)
+    operations = PageOperationSerializer(many=True, allow_empty=False)
+
+
+class PagePatchResultSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DoccoonPage
+        fields = ["id", "page_number", "content_hash", "version", "modified_at"]
+        read_only_fields = fields
 
 
 class PageDetailSerializer(serializers.ModelSerializer):
@@ -36,8 +93,89 @@ class PageDetailSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "content",
+            "content_hash",
+            "version",
             "page_number",
             "created_at",
             "modified_at",
         ]
         read_only_fields = fields
+
+
+page_detail_values = ValuesSerializer(PageDetailSerializer, computed=["page_number"])
+
+
+def serialize_page_rows(
+    rows: Iterable[dict], values: ValuesSerializer, start: int = 1
+) -> Iterator[dict]:
+    """
+    Serialize ``values()`` rows of pages sorted by position, numbering them
+    from ``start`` as number_pages does.
+
+    Rows must also select ``chunked``. The content of chunked pages is read
+    from their blocks a batch at a time.
+    """
+    number = start
+    for batch in batched(rows, PAGE_BLOCK_BATCH_SIZE):
+        chunked = [row["id"] for row in batch if row["chunked"]]
+        blocks = PageBlock.read_many(chunked) if chunked else {}
+        for row, data in zip(batch, values.many(batch)):
+            if row["chunked"]:
+                data["content"] = blocks.get(row["id"], "")
+            data["page_number"] = number
+            number += 1
+            yield data
+
+
+class BulkCreatePageSerializer(serializers.Serializer):
+    content = serializers.CharField(required=False, allow_blank=True, default="")
+    page_number = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_content(self, value: str) -> str:
+        """Sanitize content to prevent XSS attacks."""
+        return sanitize_markdown(extract_data_images(value))
+
+
+class BulkUpdatePageSerializer(serializers.Serializer):
+    """Page update within a bulk save.
+
+    Content is sanitized by bulk_save_pages, which can skip unchanged pages.
+    """
+
+    id = serializers.IntegerField()
+    content = serializers.CharField(
+        required=False, allow_blank=True, trim_whitespace=False
+    )
+    page_number = serializers.IntegerField(required=False, min_value=1)
+    base_version = serializers.IntegerField(required=False, min_value=1)
+
+
+class BulkPageSerializer(serializers.Serializer):
+    """Batch of page creates, updates and deletes applied in one request."""
+
+    create = BulkCreatePageSerializer(many=True, required=False, default=list)
+    update = BulkUpdatePageSerializer(many=True, required=False, default=list)
+    delete = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        update_ids = [item["id"] for item in attrs["update"]]
+        if len(update_ids) != len(set(update_ids)):
+            raise serializers.ValidationError("A page can only be updated once.")
+        if set(update_ids) & set(attrs["delete"]):
+            raise serializers.ValidationError(
+                "A page cannot be updated and deleted in the same request."
+            )
+        return attrs
+
+
+class MovePagesSerializer(serializers.Serializer):
+    """Move the contiguous pages from ``first`` to ``last`` after ``after``.
+
+    ``after`` set to null moves the pages to the front of the book.
+    """
+
+    first = serializers.IntegerField()
+    last = serializers.IntegerField(required=False)
+    after = serializers.IntegerField(allow_null=True)
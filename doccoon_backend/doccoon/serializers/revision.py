@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from doccoon.models.revision import PageRevision
+
+
+class PageRevisionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PageRevision
+        fields = ["id", "version", "created_at"]
+        read_only_fields = fields
+
+
+class PageRevisionContentSerializer(serializers.Serializer):
+    """A recorded version of a page with its rebuilt content."""
+
+    version = serializers.IntegerField()
+    content = serializers.CharField()
+    created_at = serializers.DateTimeField()
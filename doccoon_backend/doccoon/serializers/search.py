@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Query parameters of a search."""
+
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Query parameters of a title autocomplete."""
+
+    q = serializers.CharField(max_length=100)
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=10)
+
+
+class TitleSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    similarity = serializers.FloatField()
+
+
+class BookSearchHitSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    snippet = serializers.CharField()
+
+
+class PageSearchHitSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    book_id = serializers.IntegerField()
+    book_title = serializers.CharField()
+    page_number = serializers.IntegerField()
+    snippet = serializers.CharField()
+
+
+class SearchResultSerializer(serializers.Serializer):
+    books = BookSearchHitSerializer(many=True)
+    pages = PageSearchHitSerializer(many=True)
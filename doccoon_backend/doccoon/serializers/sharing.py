@@ -1,6 +1,13 @@
+from typing import Optional
+
 from rest_framework import serializers
 
 from doccoon.models.sharing import SharedBook, SharedPage
+from doccoon.services.sharing import (
+    SHARE_PAGE_WINDOW,
+    SHARE_PAGE_WINDOW_MAX,
+    get_content_html,
+)
 
 
 class SharedBookSerializer(serializers.ModelSerializer):
@@ -18,20 +25,57 @@ class SharedPageSerializer(serializers.ModelSerializer):
 
 
 class PublicBookSerializer(serializers.ModelSerializer):
+    """A shared book's details and the outline of its pages, without their
+    content, which is fetched in windows (see PublicBookPagesQuerySerializer).
+    """
+
     title = serializers.CharField(source="book.title", read_only=True)
     description = serializers.CharField(source="book.description", read_only=True)
     year = serializers.IntegerField(source="book.year", read_only=True)
     status = serializers.CharField(source="book.status", read_only=True)
-    pages = serializers.JSONField(source="pages_snapshot", read_only=True)
+    page_count = serializers.SerializerMethodField()
+    pages = serializers.SerializerMethodField()
 
     class Meta:
         model = SharedBook
-        fields = ["id", "title", "description", "year", "status", "pages"]
+        fields = ["id", "title", "description", "year", "status", "page_count", "pages"]
         read_only_fields = fields
 
+    def get_page_count(self, obj) -> int:
+        return len(obj.manifest)
+
+    def get_pages(self, obj) -> list[dict]:
+        return [
+            {
+                "page_number": page["page_number"],
+                "size": page["size"],
+                "headings": page.get("headings", []),
+            }
+            for page in obj.manifest
+        ]
+
+
+class PublicBookPagesQuerySerializer(serializers.Serializer):
+    """Query parameters of a window of pages of a shared book."""
+
+    start = serializers.IntegerField(min_value=1, default=1)
+    end = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        start = attrs["start"]
+        end = attrs.setdefault("end", start + SHARE_PAGE_WINDOW - 1)
+        if end < start:
+            raise serializers.ValidationError({"end": "Must not be before start."})
+        if end - start + 1 > SHARE_PAGE_WINDOW_MAX:
+            raise serializers.ValidationError(
+                {"end": f"At most {SHARE_PAGE_WINDOW_MAX} pages per request."}
+            )
+        return attrs
+
 
 class PublicPageSerializer(serializers.ModelSerializer):
-    content = serializers.CharField(source="content_snapshot", read_only=True)
+    content = serializers.CharField(source="content_object.content", read_only=True)
+    html = serializers.SerializerMethodField()
     page_number = serializers.IntegerField(source="page.page_number", read_only=True)
     book_title = serializers.CharField(source="page.book.title", read_only=True)
     book_is_public = serializers.SerializerMethodField()
@@ -41,6 +85,7 @@ class PublicPageSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "content",
+            "html",
             "page_number",
             "book_title",
             "book_is_public",
@@ -49,5 +94,8 @@ class PublicPageSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+    def get_html(self, obj) -> Optional[str]:
+        return get_content_html(obj.content_object)
+
     def get_book_is_public(self, obj):
         return obj.page.book.status == "Published"
@@ -0,0 +1,146 @@
+"""
+Serializing ``QuerySet.values()`` rows in the shape of a ModelSerializer.
+
+Hot read endpoints skip building model instances and going through DRF's
+per-field machinery. A ValuesSerializer reads the fields of an existing
+ModelSerializer once, and turns each into the column to select and the
+conversion its value needs, so the output matches the ModelSerializer's
+field for field.
+"""
+
+from typing import Callable, Iterable, Optional
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from doccoon.models.fields import CompressedTextField
+
+# Fields whose representation of a database value is the value itself
+_IDENTITY_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+Converter = Optional[Callable]
+
+
+def _datetime_converter(field: serializers.DateTimeField) -> Callable:
+    """DateTimeField.to_representation with the timezone looked up once,
+    instead of for every value."""
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = (
+        field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    )
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    if field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+class ValuesSerializer:
+    """
+    Serialize ``values()`` rows like a ModelSerializer serializes instances.
+
+    Fields are compiled on first use, from the ModelSerializer's own bound
+    fields, so formats and settings carry over. Only fields reading a model
+    field are supported: method fields, nested serializers and dotted sources
+    raise ImproperlyConfigured.
+
+    Args:
+        serializer_class: The ModelSerializer whose output is reproduced
+        computed: Fields filled in by the caller instead of read from the row
+    """
+
+    def __init__(self, serializer_class: type, computed: Iterable[str] = ()):
+        self.serializer_class = serializer_class
+        self.computed = frozenset(computed)
+        self._fields: Optional[list[tuple[str, str, Converter, bool]]] = None
+
+    @property
+    def fields(self) -> list[tuple[str, str, Converter, bool]]:
+        """The output name, column and conversion of each field, and whether
+        the conversion depends on the current timezone."""
+        if self._fields is None:
+            self._fields = self._compile()
+        return self._fields
+
+    @property
+    def columns(self) -> list[str]:
+        """The columns to pass to ``values()``."""
+        return [column for _, column, _, _ in self.fields if column]
+
+    def _compile(self) -> list[tuple[str, str, Converter, bool]]:
+        model = self.serializer_class.Meta.model
+        fields = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                fields.append((name, "", None, False))
+                continue
+            if (
+                isinstance(
+                    field,
+                    (serializers.BaseSerializer, serializers.SerializerMethodField),
+                )
+                or "." in field.source
+                or field.source == "*"
+            ):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} cannot be read "
+                    "from a values() row."
+                )
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist as error:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} is not a model field."
+                ) from error
+
+            if isinstance(model_field, CompressedTextField):
+                fields.append((name, field.source, model_field.from_stored, False))
+            elif isinstance(field, serializers.DateTimeField):
+                fields.append((name, field.source, field, True))
+            elif isinstance(field, _IDENTITY_FIELDS):
+                fields.append((name, field.source, None, False))
+            else:
+                fields.append((name, field.source, field.to_representation, False))
+        return fields
+
+    def _converters(self) -> list[tuple[str, str, Converter]]:
+        return [
+            (name, column, _datetime_converter(convert) if zoned else convert)
+            for name, column, convert, zoned in self.fields
+        ]
+
+    def many(self, rows: Iterable[dict]) -> list[dict]:
+        converters = self._converters()
+        results = []
+        for row in rows:
+            data = {}
+            for name, column, convert in converters:
+                if not column:
+                    data[name] = None
+                    continue
+                value = row[column]
+                # None is passed through, as Serializer.to_representation does
+                if convert is not None and value is not None:
+                    value = convert(value)
+                data[name] = value
+            results.append(data)
+        return results
+
+    def to_representation(self, row: dict) -> dict:
+        return self.many([row])[0]
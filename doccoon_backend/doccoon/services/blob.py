@@ -0,0 +1,178 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage, storages
+from django.utils import timezone
+
+from doccoon.models.book import DoccoonPage, PageBlock
+from doccoon.models.content import ContentObject
+from doccoon.models.revision import PageRevision
+from doccoon.utils.delta import apply_delta
+
+# Image types moved out of data URIs, with the extension they are stored under.
+# SVG stays inline, served from the API domain its scripts would run there.
+BLOB_IMAGE_TYPES = {
+    "image/avif": "avif",
+    "image/bmp": "bmp",
+    "image/gif": "gif",
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+}
+BLOB_CONTENT_TYPES = {ext: mime for mime, ext in BLOB_IMAGE_TYPES.items()}
+
+# Blobs younger than this are never collected, a page referencing one may
+# still be saving
+BLOB_GC_MIN_AGE = timedelta(days=1)
+
+_DATA_IMAGE_RE = re.compile(
+    r"data:(image/[a-zA-Z0-9.+-]+);base64,([A-Za-z0-9+/]+={0,2})"
+)
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+_BLOB_REFERENCE_RE = re.compile(r"/blobs/([0-9a-f]{64})\.")
+
+
+def get_blob_storage() -> Storage:
+    return storages["blobs"]
+
+
+def get_blob_name(digest: str, ext: str) -> str:
+    return f"{digest[:2]}/{digest}.{ext}"
+
+
+def get_blob_url(digest: str, ext: str) -> str:
+    return f"{settings.BLOB_BASE_URL}{digest}.{ext}"
+
+
+def store_blob(data: bytes, ext: str) -> str:
+    """Store data under its SHA-256 digest, once, and return the digest.
+
+    A blob stored already is touched instead, so collection counts its age
+    from this new reference.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    storage = get_blob_storage()
+    name = get_blob_name(digest, ext)
+    if not (storage.exists(name) and _touch_blob(storage, name)):
+        storage.save(name, ContentFile(data))
+    return digest
+
+
+def _touch_blob(storage: Storage, name: str) -> bool:
+    """Set a stored blob's modified time to now, False if it is gone."""
+    if not isinstance(storage, FileSystemStorage):
+        # Other storages cannot be touched, collection re-checks references
+        return True
+    try:
+        os.utime(storage.path(name))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def open_blob(digest: str, ext: str) -> Optional[File]:
+    """Open a stored blob for reading, or return None if it does not exist."""
+    if not _DIGEST_RE.fullmatch(digest):
+        return None
+    storage = get_blob_storage()
+    name = get_blob_name(digest, ext)
+    if not storage.exists(name):
+        return None
+    return storage.open(name)
+
+
+def extract_data_images(content: str) -> str:
+    """
+    Move inline base64 images into the blob store and link to them instead.
+
+    Data URIs of unsupported types or with invalid base64 are left in place.
+    """
+    if not content or "data:image/" not in content:
+        return content
+
+    def replace(match: re.Match) -> str:
+        ext = BLOB_IMAGE_TYPES.get(match[1].lower())
+        if ext is None:
+            return match[0]
+        try:
+            data = base64.b64decode(match[2], validate=True)
+        except (binascii.Error, ValueError):
+            return match[0]
+        return get_blob_url(store_blob(data, ext), ext)
+
+    return _DATA_IMAGE_RE.sub(replace, content)
+
+
+def get_referenced_blobs() -> set[str]:
+    """Return the digests of blobs linked from pages, revisions or shares."""
+    digests = set()
+    # Content is stored compressed, so it is searched here rather than in SQL
+    shared = ContentObject.objects.only("content")
+    for row in shared.iterator(chunk_size=500):
+        if "/blobs/" in row.content:
+            digests.update(_BLOB_REFERENCE_RE.findall(row.content))
+
+    # Revisions are rebuilt as get_revision_content does, newest first from
+    # their page, as a reference may be split between a delta and the text
+    # it keeps
+    pages = DoccoonPage.objects.only("id", "content", "chunked").order_by("id")
+    revisions = iter(
+        PageRevision.objects.only("page_id", "content", "is_checkpoint", "delta")
+        .order_by("page_id", "-version")
+        .iterator(chunk_size=500)
+    )
+    revision = next(revisions, None)
+    for page in pages.iterator(chunk_size=500):
+        # Blocks are joined first, a reference may span two of them
+        content = PageBlock.read(page.id) if page.chunked else page.content
+        digests.update(_BLOB_REFERENCE_RE.findall(content))
+        while revision is not None and revision.page_id == page.id:
+            if revision.is_checkpoint:
+                content = revision.content
+            else:
+                content = apply_delta(content, revision.delta)
+            digests.update(_BLOB_REFERENCE_RE.findall(content))
+            revision = next(revisions, None)
+    return digests
+
+
+def collect_orphaned_blobs(min_age: timedelta = BLOB_GC_MIN_AGE) -> int:
+    """
+    Delete stored blobs that no page, revision or share links to anymore.
+
+    Returns:
+        The number of blobs deleted.
+    """
+    storage = get_blob_storage()
+    if not storage.exists(""):
+        return 0
+
+    referenced = get_referenced_blobs()
+    cutoff = timezone.now() - min_age
+    orphaned = []
+    for prefix in storage.listdir("")[0]:
+        for filename in storage.listdir(prefix)[1]:
+            name = f"{prefix}/{filename}"
+            digest = filename.split(".")[0]
+            if digest in referenced or storage.get_modified_time(name) > cutoff:
+                continue
+            orphaned.append((digest, name))
+    if orphaned:
+        # Pages saved during the scan may link to an old blob again
+        referenced = get_referenced_blobs()
+    deleted = 0
+    for digest, name in orphaned:
+        # store_blob touches blobs it reuses, check their age last
+        if digest in referenced or storage.get_modified_time(name) > cutoff:
+            continue
+        storage.delete(name)
+        deleted += 1
+    return deleted
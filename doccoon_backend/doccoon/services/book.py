@@ -1,14 +1,34 @@
 from typing import Optional
 
-from django.db.models import Prefetch, QuerySet
+from django.db import connection, transaction
+from django.db.models import (
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Sum,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.book import BOOK_STATUS, DoccoonPage, PageBlock, doccoon
+from doccoon.models.user import User
+from doccoon.utils.search_index import copy_page_index, index_page_content
+
+# Books with at least this many bytes of content are sent page by page
+BOOK_STREAM_MIN_SIZE = 256 * 1024
+
+# Pages fetched per round trip while streaming a book
+BOOK_STREAM_BATCH_SIZE = 50
 
 
 def get_book_pages(book_id: int) -> QuerySet[DoccoonPage]:
     """Get all the pages of a book."""
     return DoccoonPage.objects.filter(book_id=book_id, is_deleted=False).order_by(
-        "page_number"
+        "position", "id"
     )
 
 
@@ -25,12 +45,12 @@ def get_book_by_id(book_id: int, include_pages: bool = True) -> Optional[doccoon
     try:
         queryset = doccoon.objects.select_related("author")
         if include_pages:
-            # Prefetch only non-deleted pages, ordered by page_number
+            # Prefetch only non-deleted pages, in page order
             queryset = queryset.prefetch_related(
                 Prefetch(
                     "doccoonpage_set",
                     queryset=DoccoonPage.objects.filter(is_deleted=False).order_by(
-                        "page_number"
+                        "position", "id"
                     ),
                 )
             )
@@ -39,6 +59,11 @@ def get_book_by_id(book_id: int, include_pages: bool = True) -> Optional[doccoon
         return None
 
 
+def can_stream_book(book: doccoon) -> bool:
+    """Whether a book is large enough to be sent page by page."""
+    return book.book_size >= BOOK_STREAM_MIN_SIZE
+
+
 def get_book_by_id_simple(book_id: int) -> Optional[doccoon]:
     """Get a book by id without any prefetching - for simple existence checks."""
     if book_id is None:
@@ -49,3 +74,138 @@ def get_book_by_id_simple(book_id: int) -> Optional[doccoon]:
         )
     except doccoon.DoesNotExist:
         return None
+
+
+def recount_page_stats(book_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """Recompute the stored content stats of pages from their content.
+
+    Returns:
+        The number of pages whose stats were out of date.
+    """
+    pages = DoccoonPage.objects.only(
+        "id", "content", "chunked", "image_count", "content_size"
+    )
+    if book_id is not None:
+        pages = pages.filter(book_id=book_id)
+    stale = []
+    updated = 0
+    for page in pages.iterator(chunk_size=batch_size):
+        if page.update_content_stats() != (0, 0):
+            stale.append(page)
+        if len(stale) >= batch_size:
+            DoccoonPage.objects.bulk_update(stale, ["image_count", "content_size"])
+            updated += len(stale)
+            stale = []
+    if stale:
+        DoccoonPage.objects.bulk_update(stale, ["image_count", "content_size"])
+        updated += len(stale)
+    return updated
+
+
+def reconcile_book_stats(book_id: Optional[int] = None) -> int:
+    """Reset books' page, image and size totals from their active pages.
+
+    Returns:
+        The number of books whose totals had drifted.
+    """
+    pages = DoccoonPage.objects.filter(book_id=OuterRef("id"), is_deleted=False)
+
+    def total(aggregate):
+        return Coalesce(
+            pages.values("book_id").annotate(total=aggregate).values("total"),
+            0,
+            output_field=IntegerField(),
+        )
+
+    totals = {
+        "page_count": total(Count("id")),
+        "image_count": total(Sum("image_count")),
+        "book_size": total(Sum("content_size")),
+    }
+    books = doccoon.objects.annotate(
+        **{f"actual_{field}": value for field, value in totals.items()}
+    )
+    if book_id is not None:
+        books = books.filter(id=book_id)
+    drifted = books.filter(
+        ~Q(page_count=F("actual_page_count"))
+        | ~Q(image_count=F("actual_image_count"))
+        | ~Q(book_size=F("actual_book_size"))
+    ).values_list("id", flat=True)
+    # Recount in the UPDATE itself so concurrent page writes are not lost
+    return doccoon.objects.filter(id__in=list(drifted)).update(**totals)
+
+
+# Copies of a book's active pages and their blocks, made in the database so
+# the stored content is copied as it is, still compressed, without passing
+# through the application
+_CLONE_PAGES = """
+    INSERT INTO doccoon_doccoonpage (
+        created_at, modified_at, is_deleted, book_id, content, content_hash,
+        version, page_number, position, image_count, content_size, chunked
+    )
+    SELECT %s, %s, %s, %s, content, content_hash,
+           1, page_number, position, image_count, content_size, chunked
+    FROM doccoon_doccoonpage
+    WHERE book_id = %s AND is_deleted = %s
+"""
+# Active positions are unique within a book, so they pair copies with sources
+_CLONED_PAGE_IDS = """
+    SELECT page_copy.id, source.id
+    FROM doccoon_doccoonpage AS page_copy
+    JOIN doccoon_doccoonpage AS source
+      ON source.book_id = %s AND source.is_deleted = %s
+     AND source.position = page_copy.position
+    WHERE page_copy.book_id = %s
+"""
+_CLONE_BLOCKS = """
+    INSERT INTO doccoon_pageblock (page_id, "index", content, content_hash)
+    SELECT page_copy.id, block."index", block.content, block.content_hash
+    FROM doccoon_pageblock AS block
+    JOIN doccoon_doccoonpage AS source ON source.id = block.page_id
+    JOIN doccoon_doccoonpage AS page_copy
+      ON page_copy.book_id = %s AND page_copy.position = source.position
+    WHERE source.book_id = %s AND source.is_deleted = %s AND source.chunked = %s
+"""
+
+
+def clone_book(book: doccoon, user: User, title: Optional[str] = None) -> doccoon:
+    """Copy a book and its active pages, as a draft owned by ``user``.
+
+    Pages and their blocks are copied with one INSERT ... SELECT each, so
+    the number of queries does not grow with the book. Copies keep their
+    content digests, so shares of the clone reuse the content objects
+    stored for the original. Revisions are not copied.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        clone = doccoon.objects.create(
+            author=user,
+            title=title or f"{book.title} (copy)"[:255],
+            description=book.description,
+            year=book.year,
+            status=BOOK_STATUS.Draft,
+            last_page_number=book.last_page_number,
+            last_page_position=book.last_page_position,
+            page_count=book.page_count,
+            image_count=book.image_count,
+            book_size=book.book_size,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(_CLONE_PAGES, [now, now, False, clone.id, book.id, False])
+            cursor.execute(_CLONE_BLOCKS, [clone.id, book.id, False, True])
+            cursor.execute(_CLONED_PAGE_IDS, [book.id, False, clone.id])
+            page_ids = cursor.fetchall()
+
+        if not copy_page_index(page_ids):
+            pages = DoccoonPage.objects.filter(book=clone).only(
+                "id", "content", "chunked"
+            )
+            chunked = PageBlock.read_many(
+                pages.filter(chunked=True).values_list("id", flat=True)
+            )
+            index_page_content(
+                (page.id, chunked[page.id] if page.chunked else page.content)
+                for page in pages.iterator()
+            )
+    return clone
@@ -0,0 +1,191 @@
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from django.core.files.storage import Storage, storages
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+from doccoon.models.book import doccoon
+from doccoon.models.book_import import IMPORT_STATUS, BookImport
+from doccoon.models.user import User
+from doccoon.services.blob import extract_data_images
+from doccoon.services.page import bulk_save_pages, create_pages
+from doccoon.utils.archive import ArchiveError, open_markdown_files
+from doccoon.utils.export import PAGE_SEPARATOR, parse_front_matter
+from doccoon.utils.sanitize import sanitize_markdown, sanitize_plain_text
+
+logger = logging.getLogger(__name__)
+
+# Pages sanitized and inserted together
+IMPORT_BATCH_SIZE = 200
+
+# Largest upload accepted, in bytes
+IMPORT_MAX_SIZE = 50 * 1024 * 1024
+
+# Most bytes of Markdown read out of an archive, against zip bombs
+IMPORT_MAX_CONTENT_SIZE = 200 * 1024 * 1024
+
+# Most pages a single import creates
+IMPORT_MAX_PAGES = 10000
+
+# Suffixes dropped from an upload's name to title a new book
+_UPLOAD_SUFFIXES = (".gz", ".bz2", ".xz", ".tgz", ".tar", ".zip", ".md", ".markdown")
+
+
+def get_import_storage() -> Storage:
+    return storages["imports"]
+
+
+def get_book_import(user: User, import_id: int) -> Optional[BookImport]:
+    return BookImport.objects.filter(requested_by=user, id=import_id).first()
+
+
+def create_book_import(
+    user: User,
+    upload: UploadedFile,
+    book: Optional[doccoon] = None,
+    **details,
+) -> BookImport:
+    """Store an upload and queue importing it once the transaction commits.
+
+    Args:
+        user: Who imports the upload, and owns the book it creates
+        upload: A zip or tar archive of Markdown files, or one Markdown file
+        book: The book the pages are added to, a new one when None
+        details: The title, description and year of a new book
+    """
+    from doccoon.tasks.book_import import import_book_task
+
+    upload_name = get_import_storage().save(
+        f"{user.id}/{get_valid_filename(upload.name)}", upload
+    )
+    book_import = BookImport.objects.create(
+        requested_by=user,
+        book=book,
+        file_name=upload.name[:255],
+        upload_name=upload_name,
+        **details,
+    )
+    transaction.on_commit(lambda: import_book_task.delay(book_import.id))
+    return book_import
+
+
+def split_pages(text: str) -> list[str]:
+    """Split a Markdown file into pages at PAGE_SEPARATOR, as exports write
+    them. Files with nothing but whitespace hold no pages."""
+    if not text.strip():
+        return []
+    return text.split(PAGE_SEPARATOR)
+
+
+def _book_year(value) -> int:
+    current_year = datetime.now().year
+    try:
+        year = int(value)
+    except (TypeError, ValueError):
+        return current_year
+    return year if 1900 <= year <= current_year else current_year
+
+
+def _file_title(name: str) -> str:
+    title = os.path.basename(name)
+    while title.lower().endswith(_UPLOAD_SUFFIXES):
+        title = os.path.splitext(title)[0]
+    return title
+
+
+def create_import_book(book_import: BookImport, front_matter: dict) -> doccoon:
+    """Create the book an import adds pages to, from the details given with
+    the upload, then its front matter, then its file name."""
+
+    def detail(name: str) -> str:
+        value = getattr(book_import, name) or front_matter.get(name) or ""
+        return sanitize_plain_text(str(value))
+
+    return doccoon.objects.create(
+        author_id=book_import.requested_by_id,
+        title=(detail("title") or _file_title(book_import.file_name))[:255],
+        description=detail("description"),
+        year=_book_year(book_import.year or front_matter.get("year")),
+    )
+
+
+def _import_batch(book_import: BookImport, batch: list[str]) -> list[int]:
+    contents = [sanitize_markdown(extract_data_images(content)) for content in batch]
+    pages = create_pages(book_import.book, contents)
+    book_import.page_count += len(pages)
+    book_import.save(update_fields=["files_done", "page_count", "modified_at"])
+    return [page.id for page in pages]
+
+
+def import_book(import_id: int) -> Optional[BookImport]:
+    """
+    Import an upload's Markdown files as pages, in batches of
+    IMPORT_BATCH_SIZE.
+
+    Files become pages in the order of their names, and split into several
+    at PAGE_SEPARATOR. Progress is saved after every batch. A failed import
+    removes what it added, along with the book if it created one.
+    """
+    book_import = BookImport.objects.select_related("book").filter(id=import_id).first()
+    if book_import is None or book_import.status != IMPORT_STATUS.Pending:
+        return book_import
+    book_import.status = IMPORT_STATUS.Running
+    book_import.save(update_fields=["status", "modified_at"])
+
+    storage = get_import_storage()
+    created_book = book_import.book is None
+    created_pages = []
+    try:
+        if not storage.exists(book_import.upload_name):
+            # Uploads are stored by the web process and read by the worker
+            raise ArchiveError(
+                "The upload is not available to the import worker, the imports "
+                "storage must be shared with it."
+            )
+        with (
+            storage.open(book_import.upload_name) as upload,
+            open_markdown_files(
+                upload, book_import.file_name, IMPORT_MAX_CONTENT_SIZE
+            ) as files,
+        ):
+            if not files:
+                raise ArchiveError("The upload holds no Markdown files.")
+            book_import.file_count = len(files)
+            book_import.save(update_fields=["file_count", "modified_at"])
+
+            batch = []
+            for markdown_file in files:
+                front_matter, text = parse_front_matter(markdown_file.read())
+                if book_import.book is None:
+                    book_import.book = create_import_book(book_import, front_matter)
+                    book_import.save(update_fields=["book", "modified_at"])
+                batch += split_pages(text)
+                if book_import.page_count + len(batch) > IMPORT_MAX_PAGES:
+                    raise ArchiveError(
+                        f"Imports are limited to {IMPORT_MAX_PAGES} pages."
+                    )
+                book_import.files_done += 1
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    created_pages += _import_batch(book_import, batch)
+                    batch = []
+            created_pages += _import_batch(book_import, batch)
+        book_import.status = IMPORT_STATUS.Done
+    except Exception as error:
+        logger.exception(f"Failed to import {book_import.id}")
+        if created_book and book_import.book is not None:
+            book_import.book.delete()
+            book_import.book = None
+        elif created_pages:
+            bulk_save_pages(book_import.book, [], [], created_pages, {})
+        book_import.status = IMPORT_STATUS.Failed
+        book_import.error = str(error)
+        book_import.page_count = 0
+    finally:
+        storage.delete(book_import.upload_name)
+    book_import.upload_name = ""
+    book_import.save()
+    return book_import
@@ -0,0 +1,65 @@
+import time
+
+from django.db import models, transaction
+
+from doccoon.models.book import DoccoonPage, PageBlock
+from doccoon.models.content import ContentObject
+from doccoon.models.revision import PageRevision
+from doccoon.models.sharing import SharedBook
+
+# Fields stored with doccoon.models.fields compression, with a field that
+# changes whenever they are written
+COMPRESSED_FIELDS = [
+    (DoccoonPage, "content", "modified_at"),
+    (PageBlock, "content", "content_hash"),
+    (PageRevision, "content", "modified_at"),
+    (PageRevision, "delta", "modified_at"),
+    (ContentObject, "content", "digest"),
+    (ContentObject, "html", "html_version"),
+    (SharedBook, "manifest", "modified_at"),
+]
+
+
+def recompress_field(
+    model: type[models.Model],
+    field_name: str,
+    version_field: str = "modified_at",
+    batch_size: int = 500,
+    pause: float = 0,
+) -> int:
+    """Rewrite stored values that do not match the current compression settings.
+
+    Walks the table in primary key order, one short transaction per batch, so
+    it can run while the application is serving. Rows whose ``version_field``
+    changed since they were read are left to the save that changed them.
+
+    Returns:
+        The number of rows rewritten.
+    """
+    field = model._meta.get_field(field_name)
+    last_pk = None
+    rewritten = 0
+    while True:
+        rows = model.objects.order_by("pk")
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        rows = list(rows.values_list("pk", version_field, field_name)[:batch_size])
+        if not rows:
+            return rewritten
+        last_pk = rows[-1][0]
+
+        stale = []
+        for row_id, version, stored in rows:
+            if stored is None:
+                continue
+            stored = bytes(stored)
+            encoded = field.to_stored(field.from_stored(stored))
+            if encoded != stored:
+                stale.append((row_id, version, encoded))
+        with transaction.atomic():
+            for row_id, version, encoded in stale:
+                rewritten += model.objects.filter(
+                    pk=row_id, **{version_field: version}
+                ).update(**{field_name: encoded})
+        if pause:
+            time.sleep(pause)
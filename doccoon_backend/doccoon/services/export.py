@@ -0,0 +1,167 @@
+import logging
+import tempfile
+from datetime import timedelta
+from typing import Callable, Iterator, NamedTuple, Optional
+
+from django.core.files import File
+from django.core.files.storage import Storage, storages
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from doccoon.models.book import doccoon
+from doccoon.models.export import EXPORT_STATUS, BookExport
+from doccoon.models.user import User
+from doccoon.services.book import get_book_pages
+from doccoon.utils.export import write_epub, write_html_bundle, write_markdown
+
+logger = logging.getLogger(__name__)
+
+# Pages fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 100
+
+# Books larger than this, in bytes of content, are exported to a file in
+# the background instead of streamed in the response
+EXPORT_STREAM_MAX_SIZE = 50 * 1024 * 1024
+
+# Built export files are deleted after this long
+EXPORT_FILE_TTL = timedelta(days=1)
+
+# Bytes read per chunk when serving export files
+EXPORT_READ_SIZE = 64 * 1024
+
+
+class ExportFormat(NamedTuple):
+    write: Callable[..., Iterator[bytes]]
+    content_type: str
+    extension: str
+
+
+EXPORT_FORMATS = {
+    "markdown": ExportFormat(write_markdown, "text/markdown; charset=utf-8", "md"),
+    "html": ExportFormat(write_html_bundle, "application/zip", "zip"),
+    "epub": ExportFormat(write_epub, "application/epub+zip", "epub"),
+}
+
+
+def get_export_storage() -> Storage:
+    return storages["exports"]
+
+
+def export_file_name(book: doccoon, export_format: str) -> str:
+    name = slugify(book.title) or "book"
+    return f"{name}.{EXPORT_FORMATS[export_format].extension}"
+
+
+def iter_book_pages(book: doccoon) -> Iterator[tuple[int, str]]:
+    """Yield the number and content of a book's active pages, in order,
+    fetching them in batches."""
+    pages = get_book_pages(book.id).only("id", "content", "chunked")
+    for number, page in enumerate(pages.iterator(chunk_size=EXPORT_BATCH_SIZE), 1):
+        yield number, page.content
+
+
+def export_book(book: doccoon, export_format: str) -> Iterator[bytes]:
+    """Export a book in one of EXPORT_FORMATS, as a stream of chunks."""
+    return EXPORT_FORMATS[export_format].write(book, iter_book_pages(book))
+
+
+def can_stream_export(book: doccoon) -> bool:
+    return book.book_size <= EXPORT_STREAM_MAX_SIZE
+
+
+def get_book_export(book: doccoon, export_id: int) -> Optional[BookExport]:
+    return BookExport.objects.filter(book=book, id=export_id).first()
+
+
+def create_book_export(book: doccoon, user: User, export_format: str) -> BookExport:
+    """Queue building an export file of a book once the transaction commits."""
+    from doccoon.tasks.export import build_book_export_task
+
+    export = BookExport.objects.create(
+        book=book, requested_by=user, format=export_format
+    )
+    transaction.on_commit(lambda: build_book_export_task.delay(export.id))
+    return export
+
+
+def build_book_export(export_id: int) -> Optional[BookExport]:
+    """Write an export to the exports storage, through a temporary file."""
+    export = (
+        BookExport.objects.select_related("book__author").filter(id=export_id).first()
+    )
+    if export is None or export.status != EXPORT_STATUS.Pending:
+        return export
+    export.status = EXPORT_STATUS.Running
+    export.save(update_fields=["status", "modified_at"])
+
+    storage = get_export_storage()
+    try:
+        with tempfile.TemporaryFile() as file:
+            for chunk in export_book(export.book, export.format):
+                file.write(chunk)
+            file.seek(0)
+            name = f"{export.id}/{export_file_name(export.book, export.format)}"
+            export.file_name = storage.save(name, File(file))
+        export.size = storage.size(export.file_name)
+        export.status = EXPORT_STATUS.Done
+    except Exception as error:
+        logger.exception(f"Failed to build export {export.id}")
+        export.status = EXPORT_STATUS.Failed
+        export.error = str(error)
+    export.save()
+    return export
+
+
+def open_export_file(export: BookExport) -> Optional[File]:
+    """Open a built export file for reading, None if it is not available.
+
+    An export built but missing from storage is marked failed, so clients
+    polling it stop waiting for a file they cannot download.
+    """
+    if export.status != EXPORT_STATUS.Done or not export.file_name:
+        return None
+    storage = get_export_storage()
+    if not storage.exists(export.file_name):
+        # Files are written by the worker and read by the web process
+        logger.error(
+            f"Export {export.id} is missing from storage, the exports storage "
+            "must be shared with the worker"
+        )
+        export.status = EXPORT_STATUS.Failed
+        export.error = "The export file is no longer available."
+        export.save(update_fields=["status", "error", "modified_at"])
+        return None
+    return storage.open(export.file_name)
+
+
+def read_file_range(file: File, start: int, length: int) -> Iterator[bytes]:
+    """Yield ``length`` bytes of a file from ``start``, then close it."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(EXPORT_READ_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def collect_expired_exports(max_age: timedelta = EXPORT_FILE_TTL) -> int:
+    """
+    Delete exports, and their files, older than ``max_age``.
+
+    Returns:
+        The number of exports deleted.
+    """
+    storage = get_export_storage()
+    expired = BookExport.objects.filter(created_at__lt=timezone.now() - max_age)
+    deleted = 0
+    for export in expired.only("id", "file_name").iterator():
+        if export.file_name:
+            storage.delete(export.file_name)
+        export.delete()
+        deleted += 1
+    return deleted
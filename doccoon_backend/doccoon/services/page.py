@@ -1,13 +1,54 @@
+from bisect import bisect_left
 from typing import Optional
 
-from django.db.models import Max, QuerySet
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Min, QuerySet
+from django.utils import timezone
 
-from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.book import PAGE_POSITION_GAP, DoccoonPage, doccoon
+from doccoon.models.revision import PageRevision
+from doccoon.services.blob import extract_data_images
+from doccoon.services.revision import get_revision_content, save_page_revisions
+from doccoon.utils.hashing import content_hash
+from doccoon.utils.merge import three_way_merge
+from doccoon.utils.patch import apply_operations
+from doccoon.utils.sanitize import sanitize_markdown
+from doccoon.utils.search_index import index_page_content
+
+# Stored page numbers are refreshed at most once per this many seconds per
+# book, however many times its pages move in between
+PAGE_COMPACTION_DELAY = 5 * 60
+
+
+class PageConflictError(Exception):
+    """Raised when concurrent edits to a page cannot be merged."""
 
 
 def get_pages_by_book(book_id: int) -> QuerySet:
     return DoccoonPage.objects.filter(book_id=book_id, is_deleted=False).order_by(
-        "page_number"
+        "position", "id"
+    )
+
+
+def number_pages(pages, start: int = 1) -> list[DoccoonPage]:
+    """Assign consecutive page numbers to pages already sorted by position.
+
+    Stored page numbers can lag behind moves until the book is compacted.
+    """
+    pages = list(pages)
+    for number, page in enumerate(pages, start=start):
+        page.page_number = number
+    return pages
+
+
+def get_page_number(book_id: int, position: int) -> int:
+    """Return the number of the page at a position, in one indexed count."""
+    return (
+        DoccoonPage.objects.filter(
+            book_id=book_id, is_deleted=False, position__lt=position
+        ).count()
+        + 1
     )
 
 
@@ -18,8 +59,608 @@ def get_page_by_id(page_id: int) -> Optional[DoccoonPage]:
         return None
 
 
-def get_next_page_number(book_id: int) -> int:
-    max_page = DoccoonPage.objects.filter(book_id=book_id, is_deleted=False).aggregate(
-        max_page=Max("page_number")
+def get_page_for_update(page_id: int) -> Optional[DoccoonPage]:
+    """Get a page and lock its row until the end of the current transaction."""
+    try:
+        return DoccoonPage.objects.select_for_update().get(id=page_id, is_deleted=False)
+    except DoccoonPage.DoesNotExist:
+        return None
+
+
+def get_pages_by_ids(
+    book_id: int, page_ids: list[int], for_update: bool = False
+) -> dict[int, DoccoonPage]:
+    """Get the active pages of a book keyed by id, in a single query.
+
+    With ``for_update``, the rows are locked in id order until the end of the
+    current transaction, so concurrent batches cannot deadlock.
+    """
+    if not page_ids:
+        return {}
+    pages = DoccoonPage.objects.filter(
+        book_id=book_id, id__in=page_ids, is_deleted=False
+    )
+    if for_update:
+        pages = pages.select_for_update().order_by("id")
+    return {page.id: page for page in pages}
+
+
+def lock_book(book_id: int) -> None:
+    """Lock a book's row until the end of the current transaction.
+
+    Serializes changes to the order of the book's pages.
+    """
+    doccoon.objects.select_for_update().filter(id=book_id).exists()
+
+
+def allocate_page_slots(book_id: int, count: int = 1) -> tuple[int, int]:
+    """Atomically reserve page numbers and positions at the end of a book.
+
+    Concurrent callers block on the book row, so every reserved slot is
+    unique. Returns the number and position of the first reserved page,
+    the others follow with consecutive numbers and evenly spaced positions.
+    """
+    with transaction.atomic():
+        doccoon.objects.filter(id=book_id).update(
+            last_page_number=F("last_page_number") + count,
+            last_page_position=F("last_page_position") + count * PAGE_POSITION_GAP,
+        )
+        last_number, last_position = (
+            doccoon.objects.filter(id=book_id)
+            .values_list("last_page_number", "last_page_position")
+            .get()
+        )
+    return (
+        last_number - count + 1,
+        last_position - (count - 1) * PAGE_POSITION_GAP,
     )
-    return (max_page["max_page"] or 0) + 1
+
+
+def get_position_after(book_id: int, after: Optional[DoccoonPage]) -> int:
+    """Return a free position right after a page, or at the front of the book.
+
+    Re-spaces the book's positions if there is no room left between the
+    page and its successor. Callers should hold the lock from lock_book.
+    """
+    low = after.position if after else 0
+    high = DoccoonPage.objects.filter(
+        book_id=book_id, is_deleted=False, position__gt=low
+    ).aggregate(high=Min("position"))["high"]
+    if high is None:
+        return allocate_page_slots(book_id)[1]
+    if high - low < 2:
+        compact_page_order(book_id, regap=True)
+        if after:
+            after.refresh_from_db(fields=["position"])
+        return get_position_after(book_id, after)
+    return (low + high) // 2
+
+
+def move_pages(
+    book_id: int,
+    first: DoccoonPage,
+    last: DoccoonPage,
+    after: Optional[DoccoonPage],
+) -> None:
+    """Move the pages from ``first`` to ``last`` right after ``after``.
+
+    The range keeps its order and lands at the front of the book when
+    ``after`` is None. When the target gap has room, only the moved rows are
+    written, in a single UPDATE. Otherwise the book is re-spaced.
+
+    Raises ValueError if ``after`` is inside the moved range.
+    """
+    low, high = sorted((first.position, last.position))
+    if after and low <= after.position <= high:
+        raise ValueError("Pages cannot be moved after a page inside the range.")
+
+    pages = DoccoonPage.objects.filter(book_id=book_id, is_deleted=False)
+    moved = pages.filter(position__range=(low, high))
+    span = high - low
+
+    with transaction.atomic():
+        lock_book(book_id)
+        gap_low = after.position if after else 0
+        gap_high = (
+            pages.exclude(position__range=(low, high))
+            .filter(position__gt=gap_low)
+            .aggregate(gap_high=Min("position"))["gap_high"]
+        )
+        if gap_low < low and (gap_high is None or high < gap_high):
+            # The range already follows ``after``
+            return
+        if gap_high is None:
+            # Moving to the end, take positions past every allocated one
+            gap_high = allocate_page_slots(
+                book_id, count=span // PAGE_POSITION_GAP + 2
+            )[1]
+
+        if gap_high - gap_low >= span + 2:
+            # Scale the range into the gap, which holds no other page, so the
+            # new positions never collide with existing ones
+            moved.update(
+                position=gap_low
+                + (F("position") - low + 1) * (gap_high - gap_low) / (span + 2)
+            )
+        else:
+            ids = list(pages.order_by("position", "id").values_list("id", flat=True))
+            moved_ids = set(moved.values_list("id", flat=True))
+            order = [page_id for page_id in ids if page_id not in moved_ids]
+            index = order.index(after.id) + 1 if after else 0
+            order[index:index] = [page_id for page_id in ids if page_id in moved_ids]
+            compact_page_order(book_id, order=order)
+
+        schedule_page_compaction(book_id)
+
+
+def _page_compaction_key(book_id: int) -> str:
+    return f"page_compaction:{book_id}"
+
+
+def schedule_page_compaction(book_id: int) -> None:
+    """Refresh the stored page numbers of a book a while after it commits.
+
+    Changes within PAGE_COMPACTION_DELAY share a single compaction, so a burst
+    of moves rewrites the stored numbers once rather than once per move.
+    """
+    from doccoon.tasks.pages import compact_page_order_task
+
+    def schedule():
+        if cache.add(_page_compaction_key(book_id), True, PAGE_COMPACTION_DELAY):
+            compact_page_order_task.apply_async(
+                (book_id,), countdown=PAGE_COMPACTION_DELAY
+            )
+
+    transaction.on_commit(schedule)
+
+
+def run_scheduled_page_compaction(book_id: int) -> int:
+    """Compact a book scheduled by schedule_page_compaction.
+
+    Changes committed from now on schedule a new compaction.
+    """
+    cache.delete(_page_compaction_key(book_id))
+    return compact_page_order(book_id)
+
+
+def compact_page_order(
+    book_id: int, regap: bool = False, order: Optional[list[int]] = None
+) -> int:
+    """Renumber a book's pages from their order, writing only changed rows.
+
+    Also resets the book's allocation counters to its last page.
+
+    Args:
+        book_id: The book to compact
+        regap: Whether to also re-space positions evenly
+        order: Page ids in their new order, implies ``regap``
+
+    Returns:
+        The number of pages written.
+    """
+    with transaction.atomic():
+        lock_book(book_id)
+        pages = DoccoonPage.objects.filter(book_id=book_id, is_deleted=False).only(
+            "id", "position", "page_number"
+        )
+        pages = list(pages.order_by("position", "id"))
+        if order is not None:
+            by_id = {page.id: page for page in pages}
+            pages = [by_id[page_id] for page_id in order]
+            regap = True
+
+        changed = []
+        repositioned = []
+        for number, page in enumerate(pages, start=1):
+            position = number * PAGE_POSITION_GAP if regap else page.position
+            if page.position != position:
+                repositioned.append(page.id)
+            if page.page_number != number or page.position != position:
+                page.page_number = number
+                page.position = position
+                changed.append(page)
+
+        if repositioned:
+            # Park moved pages on unique negative positions first, so the
+            # unique constraint holds after every row of the bulk update
+            DoccoonPage.objects.filter(id__in=repositioned).update(position=-F("id"))
+        DoccoonPage.objects.bulk_update(changed, ["page_number", "position"])
+        doccoon.objects.filter(id=book_id).update(
+            last_page_number=len(pages),
+            last_page_position=pages[-1].position if pages else 0,
+        )
+    return len(changed)
+
+
+def _increasing_subsequence(values: list[int]) -> set[int]:
+    """Return the indexes of a longest increasing subsequence of values."""
+    # The smallest tail of an increasing subsequence of each length
+    tails = []
+    tail_values = []
+    previous = [-1] * len(values)
+    for index, value in enumerate(values):
+        length = bisect_left(tail_values, value)
+        if length:
+            previous[index] = tails[length - 1]
+        if length == len(tails):
+            tails.append(index)
+            tail_values.append(value)
+        else:
+            tails[length] = index
+            tail_values[length] = value
+    kept = set()
+    index = tails[-1] if tails else -1
+    while index != -1:
+        kept.add(index)
+        index = previous[index]
+    return kept
+
+
+def reorder_pages_by_number(book_id: int, numbers: dict[int, int]) -> int:
+    """Order a book's pages by the page numbers clients assigned to them.
+
+    ``numbers`` maps page ids to their requested number, other pages keep
+    their place. A page given an occupied number takes over the slot. Only
+    the fewest pages needed to reach the new order are given new positions,
+    nothing is written when the numbers already match the current order.
+
+    Returns the number of pages written.
+    """
+    with transaction.atomic():
+        lock_book(book_id)
+        rows = list(get_pages_by_book(book_id).values_list("id", "position"))
+        ranked = sorted(
+            (numbers.get(page_id, index), page_id not in numbers, index, page_id)
+            for index, (page_id, _) in enumerate(rows, start=1)
+        )
+        if [row[2] for row in ranked] == list(range(1, len(rows) + 1)):
+            return 0
+
+        # Pages keeping their relative order stay where they are, the others
+        # are spread over the gaps between them
+        kept = _increasing_subsequence([row[2] for row in ranked])
+        positions = {page_id: position for page_id, position in rows}
+        moved = {}
+        low = 0
+        run = []
+        for index, row in enumerate([*ranked, None]):
+            if row is not None and index not in kept:
+                run.append(row[3])
+                continue
+            if run and row is None:
+                # Past the last kept page, take positions past every one
+                position = allocate_page_slots(book_id, count=len(run))[1]
+                for page_id in run:
+                    moved[page_id] = position
+                    position += PAGE_POSITION_GAP
+            elif run:
+                step = (positions[row[3]] - low) // (len(run) + 1)
+                if step < 1:
+                    return compact_page_order(book_id, order=[row[3] for row in ranked])
+                for offset, page_id in enumerate(run, start=1):
+                    moved[page_id] = low + offset * step
+            run = []
+            if row is not None:
+                low = positions[row[3]]
+
+        # Park moved pages on unique negative positions first, so the unique
+        # constraint holds after every row of the bulk update
+        DoccoonPage.objects.filter(id__in=moved).update(position=-F("id"))
+        DoccoonPage.objects.bulk_update(
+            [DoccoonPage(id=page_id, position=moved[page_id]) for page_id in moved],
+            ["position"],
+        )
+        schedule_page_compaction(book_id)
+    return len(moved)
+
+
+def create_pages(book: doccoon, contents: list[str]) -> list[DoccoonPage]:
+    """Append pages of already sanitized content to the end of a book.
+
+    The rows are written in a single INSERT, and the book's totals and the
+    search index updated once for all of them.
+    """
+    if not contents:
+        return []
+    with transaction.atomic():
+        number, position = allocate_page_slots(book.id, count=len(contents))
+        pages = []
+        images = size = 0
+        for content in contents:
+            page = DoccoonPage(
+                book=book,
+                content=content,
+                content_hash=content_hash(content),
+                page_number=number,
+                position=position,
+            )
+            page_images, page_size = page.update_content_stats()
+            images += page_images
+            size += page_size
+            pages.append(page)
+            number += 1
+            position += PAGE_POSITION_GAP
+        with DoccoonPage.storing_content(pages):
+            pages = DoccoonPage.objects.bulk_create(pages)
+        doccoon.add_page_stats(book.id, pages=len(pages), images=images, size=size)
+        index_page_content((page.id, page.content) for page in pages)
+    return pages
+
+
+def patch_page_content(page: DoccoonPage, operations: list[dict]) -> DoccoonPage:
+    """Apply text operations to a page and sanitize the result.
+
+    The whole content is sanitized again, as an edit can splice into a tag
+    anywhere in it. Only the blocks that changed miss the sanitizer's cache.
+
+    Raises ValueError if an operation does not fit the current content.
+    """
+    content, _, _ = apply_operations(page.content, operations)
+    content = sanitize_markdown(extract_data_images(content))
+    if content != page.content:
+        revision = _supersede(page, content)
+        page.save(update_fields=["content", "content_hash", "version", "modified_at"])
+        save_page_revisions([revision])
+    return page
+
+
+def _supersede(page: DoccoonPage, content: str) -> PageRevision:
+    """Replace sanitized page content, returning the revision it superseded."""
+    revision = PageRevision(page=page, version=page.version, content=page.content)
+    page.content = content
+    page.content_hash = content_hash(content)
+    page.version += 1
+    return revision
+
+
+def set_page_content(
+    page: DoccoonPage, content: str, revisions: list[PageRevision]
+) -> bool:
+    """Sanitize and assign new content to a page without saving it.
+
+    Content whose digest matches the stored one is skipped before
+    sanitization. Inline images are moved to the blob store first. The
+    superseded revision is appended to ``revisions`` for the caller to save.
+    Returns whether the page content changed.
+    """
+    if content_hash(content) == page.content_hash:
+        return False
+    content = sanitize_markdown(extract_data_images(content))
+    if content == page.content:
+        return False
+    revisions.append(_supersede(page, content))
+    return True
+
+
+def merge_page_content(page: DoccoonPage, base_version: int, content: str) -> str:
+    """Merge content edited from ``base_version`` into the current page content.
+
+    Versions coalesced out of the history are merged from the newest
+    revision before them, which is a common ancestor as well.
+
+    Raises PageConflictError if no base revision is available or both sides
+    changed the same lines.
+    """
+    if base_version == page.version:
+        return content
+
+    base_version = (
+        PageRevision.objects.filter(page=page, version__lte=base_version)
+        .order_by("-version")
+        .values_list("version", flat=True)
+        .first()
+        if base_version < page.version
+        else None
+    )
+    base = get_revision_content(page, base_version) if base_version else None
+    if base is None:
+        raise PageConflictError("The base version is no longer available.")
+
+    merged = three_way_merge(
+        base, page.content, sanitize_markdown(extract_data_images(content))
+    )
+    if merged is None:
+        raise PageConflictError("The page was changed by another edit.")
+    return merged
+
+
+def restore_page_revision(page: DoccoonPage, version: int) -> Optional[bool]:
+    """Bring back the content a page had at a recorded version.
+
+    The content being replaced is recorded like any other edit, so a restore
+    can be undone. Callers should hold the row lock from get_page_for_update.
+
+    Returns whether the page was written, or None if the version was not
+    recorded.
+    """
+    content = get_revision_content(page, version)
+    if content is None:
+        return None
+    return update_page(page, {"content": content})
+
+
+def update_page(
+    page: DoccoonPage, data: dict, base_version: Optional[int] = None
+) -> bool:
+    """Update a page's content and number, writing only what changed.
+
+    A new number moves the page, its stored number is refreshed later by
+    compaction.
+
+    When ``base_version`` is given and the page has moved on since, the new
+    content is three-way merged with the edits made in between. Callers
+    should hold the row lock from get_page_for_update.
+
+    Returns whether the page was written. Raises PageConflictError if the
+    edits cannot be merged.
+    """
+    fields = []
+    revisions = []
+    if "content" in data:
+        content = data["content"]
+        if base_version is not None:
+            content = merge_page_content(page, base_version, content)
+        if set_page_content(page, content, revisions):
+            fields += ["content", "content_hash", "version"]
+
+    if fields:
+        page.save(update_fields=[*fields, "modified_at"])
+        save_page_revisions(revisions)
+    renumbered = False
+    if "page_number" in data:
+        # Clients that number pages themselves also decide their order
+        renumbered = bool(
+            reorder_pages_by_number(page.book_id, {page.id: data["page_number"]})
+        )
+        page.refresh_from_db(fields=["position"])
+        page.page_number = get_page_number(page.book_id, page.position)
+    return bool(fields) or renumbered
+
+
+def bulk_save_pages(
+    book: doccoon,
+    creates: list[dict],
+    updates: list[dict],
+    deletes: list[int],
+    pages: dict[int, DoccoonPage],
+) -> dict:
+    """Apply a batch of page creates, updates and deletes in one transaction.
+
+    Args:
+        book: The book that owns every page in the batch
+        creates: Validated page data for new pages
+        updates: Validated page data, each item carrying the page ``id`` and
+            optionally the ``base_version`` its content was edited from
+        deletes: Ids of pages to soft-delete
+        pages: The pages referenced by ``updates``, locked by
+            get_pages_by_ids(for_update=True) in the caller's transaction
+
+    Returns:
+        The ids of the created, updated and deleted pages, and the versions
+        of the created and updated ones. Updates that leave a page unchanged
+        are not written and not reported as updated. Pages merged with newer
+        edits have no version reported, as the client does not hold their
+        content and should keep saving from its base version.
+
+        The ids of pages whose edits conflicted are reported under
+        ``conflicts``. Content edited from an older version is three-way
+        merged as update_page does, a page where that fails keeps its
+        content while the rest of the batch is saved.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Change in the book's totals, applied once at the end
+        count = images = size = 0
+        if deletes:
+            deleted = DoccoonPage.objects.filter(
+                book_id=book.id, id__in=deletes, is_deleted=False
+            )
+            # Lock the rows so only pages this batch deletes leave the totals
+            rows = list(
+                deleted.select_for_update().values_list(
+                    "id", "image_count", "content_size"
+                )
+            )
+            deleted.filter(id__in=[row[0] for row in rows]).update(
+                is_deleted=True, deleted_at=now, modified_at=now
+            )
+            count -= len(rows)
+            images -= sum(row[1] for row in rows)
+            size -= sum(row[2] for row in rows)
+
+        changed = []
+        revisions = []
+        numbers = {}
+        reindexed = []
+        merged = []
+        conflicts = []
+        for data in updates:
+            page = pages[data["id"]]
+            modified = False
+            content = data.get("content")
+            base_version = data.get("base_version")
+            if base_version is not None and base_version != page.version:
+                merged.append(page.id)
+                try:
+                    content = merge_page_content(page, base_version, content)
+                except PageConflictError:
+                    conflicts.append(page.id)
+                    content = None
+            if content is not None and set_page_content(page, content, revisions):
+                page_images, page_size = page.update_content_stats()
+                images += page_images
+                size += page_size
+                reindexed.append(page)
+                modified = True
+            if "page_number" in data:
+                numbers[page.id] = data["page_number"]
+            if not modified:
+                continue
+            # bulk_update() skips auto_now, so stamp it explicitly
+            page.modified_at = now
+            changed.append(page)
+        if changed:
+            with DoccoonPage.storing_content(changed):
+                DoccoonPage.objects.bulk_update(
+                    changed,
+                    [
+                        "content",
+                        "content_hash",
+                        "image_count",
+                        "content_size",
+                        "chunked",
+                        "version",
+                        "modified_at",
+                    ],
+                )
+            save_page_revisions(revisions)
+
+        created = []
+        if creates:
+            number, position = allocate_page_slots(book.id, count=len(creates))
+            for data in creates:
+                content = data.get("content", "")
+                page = DoccoonPage(
+                    book=book,
+                    content=content,
+                    content_hash=content_hash(content),
+                    page_number=number,
+                    position=position,
+                )
+                page_images, page_size = page.update_content_stats()
+                images += page_images
+                size += page_size
+                created.append(page)
+                number += 1
+                position += PAGE_POSITION_GAP
+            with DoccoonPage.storing_content(created):
+                created = DoccoonPage.objects.bulk_create(created)
+            count += len(created)
+        doccoon.add_page_stats(book.id, pages=count, images=images, size=size)
+        # bulk_update() and bulk_create() bypass save(), which indexes content
+        index_page_content((page.id, page.content) for page in [*reindexed, *created])
+
+        numbers.update(
+            (page.id, data["page_number"])
+            for page, data in zip(created, creates)
+            if "page_number" in data
+        )
+        if numbers:
+            # Clients that number pages themselves also decide their order
+            reorder_pages_by_number(book.id, numbers)
+        elif deletes:
+            # Close the numbering gaps left by the deleted pages
+            schedule_page_compaction(book.id)
+
+    return {
+        "created": [page.id for page in created],
+        "updated": [page.id for page in changed],
+        "deleted": list(deletes),
+        "versions": {
+            page.id: page.version
+            for page in [*created, *changed]
+            if page.id not in merged
+        },
+        "conflicts": conflicts,
+    }
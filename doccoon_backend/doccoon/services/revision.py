@@ -0,0 +1,142 @@
+from datetime import timedelta
+from itertools import chain, groupby
+from typing import Optional
+
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from doccoon.models.book import DoccoonPage
+from doccoon.models.revision import PageRevision
+from doccoon.utils.delta import apply_delta, make_delta
+
+# Most deltas applied to rebuild a revision, a full checkpoint is stored
+# once the revisions since the last one would need more
+REVISION_CHECKPOINT_INTERVAL = 10
+
+# Edits saved this soon after the newest revision was recorded replace the
+# content it leads to instead of recording the version they supersede
+REVISION_COALESCE_WINDOW = timedelta(minutes=5)
+
+# Revisions kept per page, older ones are dropped as checkpoints are stored
+PAGE_REVISIONS_KEPT = 500
+
+
+def get_page_revisions(page: DoccoonPage) -> QuerySet:
+    return PageRevision.objects.filter(page=page).only("id", "version", "created_at")
+
+
+def get_page_revision(page: DoccoonPage, version: int) -> Optional[PageRevision]:
+    return get_page_revisions(page).filter(version=version).first()
+
+
+def get_revision_content(page: DoccoonPage, version: int) -> Optional[str]:
+    """Rebuild the content of a page at a recorded version.
+
+    Starts from the nearest newer checkpoint, or the page's own content, and
+    applies at most REVISION_CHECKPOINT_INTERVAL reverse deltas.
+
+    Returns None if the version was not recorded.
+    """
+    revisions = (
+        PageRevision.objects.filter(page=page, version__gte=version)
+        .order_by("version")
+        .only("version", "content", "is_checkpoint", "delta")
+        .iterator(chunk_size=REVISION_CHECKPOINT_INTERVAL + 1)
+    )
+    first = next(revisions, None)
+    if first is None or first.version != version:
+        return None
+
+    deltas = []
+    content = None
+    for revision in chain([first], revisions):
+        if revision.is_checkpoint:
+            content = revision.content
+            break
+        deltas.append(revision)
+    if content is None:
+        # The newest revisions are deltas from the page itself
+        content = page.content
+    for revision in reversed(deltas):
+        content = apply_delta(content, revision.delta)
+    return content
+
+
+def _newest_revisions(page_ids: list[int]) -> dict[int, list[PageRevision]]:
+    """Return the two newest revisions of pages, newest first, in one query."""
+    newer = PageRevision.objects.filter(page_id=OuterRef("page_id")).order_by(
+        "-version"
+    )
+    revisions = (
+        PageRevision.objects.filter(page_id__in=page_ids)
+        .filter(version__gte=Coalesce(Subquery(newer.values("version")[1:2]), 0))
+        .order_by("page_id", "-version")
+    )
+    return {
+        page_id: list(rows)
+        for page_id, rows in groupby(revisions, key=lambda revision: revision.page_id)
+    }
+
+
+def save_page_revisions(revisions: list[PageRevision]) -> None:
+    """Record superseded page versions once their pages hold the new content.
+
+    Each revision carries the full content it supersedes. It is stored as a
+    reverse delta from the page's new content, or in full when the chain of
+    deltas below it is long enough.
+
+    The newest revision is always kept, as the merge base of clients one
+    version behind. When the one before it was recorded less than
+    REVISION_COALESCE_WINDOW ago, the newest is an autosave within that
+    window and the new revision takes its place, so bursts of edits keep
+    about one revision per window.
+    """
+    if not revisions:
+        return
+    now = timezone.now()
+    newest = _newest_revisions([revision.page_id for revision in revisions])
+
+    created = []
+    rebased = []
+    replaced = []
+    checkpointed = []
+    for revision in revisions:
+        head = revision.page.content
+        previous, *below = newest.get(revision.page_id, [None])
+        if below and now - below[0].created_at < REVISION_COALESCE_WINDOW:
+            # Take the place of the previous revision in the chain, rebasing
+            # the one below onto the content recorded instead
+            if previous.is_checkpoint:
+                dropped = previous.content
+            else:
+                dropped = apply_delta(revision.content, previous.delta)
+            if not below[0].is_checkpoint:
+                content = apply_delta(dropped, below[0].delta)
+                below[0].delta = make_delta(revision.content, content)
+                below[0].modified_at = now
+                rebased.append(below[0])
+            replaced.append(previous.id)
+            revision.is_checkpoint = previous.is_checkpoint
+            chain_length = previous.chain_length
+        else:
+            chain_length = previous.chain_length + 1 if previous else 1
+            revision.is_checkpoint = chain_length > REVISION_CHECKPOINT_INTERVAL
+
+        if revision.is_checkpoint:
+            revision.chain_length = 0
+            checkpointed.append(revision.page_id)
+        else:
+            revision.delta = make_delta(head, revision.content)
+            revision.content = ""
+            revision.chain_length = chain_length
+        created.append(revision)
+
+    PageRevision.objects.filter(id__in=replaced).delete()
+    PageRevision.objects.bulk_update(rebased, ["delta", "modified_at"])
+    PageRevision.objects.bulk_create(created)
+    for page_id in checkpointed:
+        # Older revisions only depend on newer ones, so the oldest can go
+        expired = PageRevision.objects.filter(page_id=page_id).order_by("-version")
+        expired_ids = expired.values_list("id", flat=True)[PAGE_REVISIONS_KEPT:]
+        PageRevision.objects.filter(id__in=list(expired_ids)).delete()
@@ -0,0 +1,293 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, F, Max, QuerySet
+from django.db.models.expressions import RawSQL
+
+from doccoon.models.book import BOOK_STATUS, DoccoonPage, PageBlock, doccoon
+from doccoon.models.user import User
+from doccoon.utils.trigram import TrigramIndex
+
+SEARCH_CONFIG = "english"
+# Words around each match kept in a snippet
+SNIPPET_WORDS = 24
+
+# Lowest share of the typed trigrams a title must contain to be suggested
+AUTOCOMPLETE_MIN_SIMILARITY = 0.3
+# Users whose title index is kept in memory when pg_trgm is not available
+TITLE_INDEX_CACHE_SIZE = 256
+
+# Control characters marking matches, swapped for <mark> after escaping
+_START, _STOP = "\x02", "\x03"
+_WORD_RE = re.compile(r"\w+")
+
+_SQLITE_BOOKS = f"""
+    SELECT b.id, b.title,
+           snippet(doccoon_book_search, -1, char(2), char(3), '…', {SNIPPET_WORDS})
+    FROM doccoon_book_search
+    JOIN doccoon_doccoon b ON b.id = doccoon_book_search.rowid
+    WHERE doccoon_book_search MATCH %s
+      AND b.author_id = %s AND b.is_deleted = 0 AND b.status IN (%s, %s)
+    ORDER BY bm25(doccoon_book_search, 10.0, 1.0)
+    LIMIT %s
+"""
+
+_SQLITE_PAGES = f"""
+    SELECT p.id, p.book_id, b.title, p.page_number,
+           snippet(doccoon_page_search, 0, char(2), char(3), '…', {SNIPPET_WORDS})
+    FROM doccoon_page_search
+    JOIN doccoon_doccoonpage p ON p.id = doccoon_page_search.rowid
+    JOIN doccoon_doccoon b ON b.id = p.book_id
+    WHERE doccoon_page_search MATCH %s
+      AND p.is_deleted = 0
+      AND b.author_id = %s AND b.is_deleted = 0 AND b.status IN (%s, %s)
+    ORDER BY bm25(doccoon_page_search)
+    LIMIT %s
+"""
+
+
+_POSTGRESQL_HEADLINES = f"""
+    SELECT ts_headline(
+        '{SEARCH_CONFIG}', item.body, websearch_to_tsquery('{SEARCH_CONFIG}', %s), %s
+    )
+    FROM unnest(%s::text[]) WITH ORDINALITY AS item(body, n)
+    ORDER BY item.n
+"""
+_HEADLINE_OPTIONS = (
+    f'StartSel="{_START}", StopSel="{_STOP}", '
+    f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+)
+
+
+def _highlight(snippet: str) -> str:
+    """Escape a snippet and turn its match markers into <mark> tags."""
+    snippet = html.escape(snippet or "")
+    return snippet.replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _postgresql_search(user: User, query: str, limit: int) -> dict:
+    # Needs psycopg, which SQLite development setups may not have
+    from django.contrib.postgres.search import (
+        SearchHeadline,
+        SearchQuery,
+        SearchRank,
+        SearchVectorField,
+    )
+
+    def search_vector(table: str) -> RawSQL:
+        # The column is maintained outside the ORM and is not a model field
+        return RawSQL(
+            f'"{table}"."search_vector"', (), output_field=SearchVectorField()
+        )
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    headline = {
+        "config": SEARCH_CONFIG,
+        "start_sel": _START,
+        "stop_sel": _STOP,
+        "max_words": SNIPPET_WORDS,
+        "min_words": SNIPPET_WORDS // 2,
+    }
+    books = (
+        doccoon.objects.filter(
+            author=user,
+            is_deleted=False,
+            status__in=[BOOK_STATUS.Draft, BOOK_STATUS.Published],
+        )
+        .annotate(vector=search_vector(doccoon._meta.db_table))
+        .filter(vector=search_query)
+        .annotate(
+            rank=SearchRank(F("vector"), search_query),
+            snippet=SearchHeadline("description", search_query, **headline),
+        )
+        .order_by("-rank", "-id")
+        .values("id", "title", "description", "snippet")[:limit]
+    )
+    pages = (
+        DoccoonPage.objects.filter(
+            book__author=user,
+            book__is_deleted=False,
+            book__status__in=[BOOK_STATUS.Draft, BOOK_STATUS.Published],
+            is_deleted=False,
+        )
+        .annotate(vector=search_vector(DoccoonPage._meta.db_table))
+        .filter(vector=search_query)
+        .annotate(rank=SearchRank(F("vector"), search_query))
+        .order_by("-rank", "id")
+        .values("id", "book_id", "book__title", "page_number", "content", "chunked")[
+            :limit
+        ]
+    )
+    # Page content is stored compressed, so snippets are cut from the
+    # decompressed text of the hits only
+    pages = list(pages)
+    content_field = DoccoonPage._meta.get_field("content")
+    blocks = PageBlock.read_many(page["id"] for page in pages if page["chunked"])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _POSTGRESQL_HEADLINES,
+            [
+                query,
+                _HEADLINE_OPTIONS,
+                [
+                    (
+                        blocks.get(page["id"], "")
+                        if page["chunked"]
+                        else content_field.from_stored(page["content"])
+                    )
+                    for page in pages
+                ],
+            ],
+        )
+        snippets = [snippet for (snippet,) in cursor.fetchall()]
+    for page, snippet in zip(pages, snippets):
+        page["snippet"] = snippet
+    return {
+        "books": [
+            {
+                "id": book["id"],
+                "title": book["title"],
+                # Title-only matches highlight nothing in the description
+                "snippet": _highlight(
+                    book["snippet"] if book["description"] else book["title"]
+                ),
+            }
+            for book in books
+        ],
+        "pages": [
+            {
+                "id": page["id"],
+                "book_id": page["book_id"],
+                "book_title": page["book__title"],
+                "page_number": page["page_number"],
+                "snippet": _highlight(page["snippet"]),
+            }
+            for page in pages
+        ],
+    }
+
+
+def _sqlite_search(user: User, query: str, limit: int) -> dict:
+    # Quote every word so FTS5 query syntax in user input is taken literally
+    match = " ".join(f'"{word}"' for word in _WORD_RE.findall(query))
+    if not match:
+        return {"books": [], "pages": []}
+    params = [match, user.id, BOOK_STATUS.Draft, BOOK_STATUS.Published, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(_SQLITE_BOOKS, params)
+        books = cursor.fetchall()
+        cursor.execute(_SQLITE_PAGES, params)
+        pages = cursor.fetchall()
+    return {
+        "books": [
+            {"id": book_id, "title": title, "snippet": _highlight(snippet)}
+            for book_id, title, snippet in books
+        ],
+        "pages": [
+            {
+                "id": page_id,
+                "book_id": book_id,
+                "book_title": title,
+                "page_number": page_number,
+                "snippet": _highlight(snippet),
+            }
+            for page_id, book_id, title, page_number, snippet in pages
+        ],
+    }
+
+
+def search_user_content(user: User, query: str, limit: int = 20) -> dict:
+    """Search the titles, descriptions and pages of a user's books.
+
+    Uses the ``search_vector`` columns on PostgreSQL and the FTS5 tables on
+    SQLite. Books are indexed by triggers and pages on save, see
+    doccoon.utils.search_index.
+
+    Returns:
+        The best ranked book and page hits, each with an HTML snippet whose
+        matches are wrapped in <mark> tags.
+    """
+    if connection.vendor == "postgresql":
+        return _postgresql_search(user, query, limit)
+    if connection.vendor == "sqlite":
+        return _sqlite_search(user, query, limit)
+    raise NotImplementedError(f"Search is not supported on {connection.vendor}.")
+
+
+_title_indexes: OrderedDict[int, tuple[tuple, TrigramIndex]] = OrderedDict()
+_title_indexes_lock = threading.Lock()
+
+
+def _user_books(user: User) -> QuerySet[doccoon]:
+    return doccoon.objects.filter(
+        author=user,
+        is_deleted=False,
+        status__in=[BOOK_STATUS.Draft, BOOK_STATUS.Published],
+    )
+
+
+def _postgresql_autocomplete(user: User, query: str, limit: int) -> list[dict]:
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    # "<%" is the word similarity operator the trigram GIN index serves
+    similar = RawSQL(
+        f'%s <%% "{doccoon._meta.db_table}"."title"',
+        (query,),
+        output_field=BooleanField(),
+    )
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(AUTOCOMPLETE_MIN_SIMILARITY)],
+            )
+        return list(
+            _user_books(user)
+            .filter(similar)
+            .annotate(similarity=TrigramWordSimilarity(query, "title"))
+            .order_by("-similarity", "title")
+            .values("id", "title", "similarity")[:limit]
+        )
+
+
+def _get_title_index(user: User) -> TrigramIndex:
+    """Return the user's title index, rebuilding it when their books change."""
+    books = _user_books(user)
+    totals = books.aggregate(count=Count("id"), modified=Max("modified_at"))
+    signature = (totals["count"], totals["modified"])
+    with _title_indexes_lock:
+        cached = _title_indexes.get(user.id)
+        if cached and cached[0] == signature:
+            _title_indexes.move_to_end(user.id)
+            return cached[1]
+
+    index = TrigramIndex(books.values_list("id", "title"))
+    with _title_indexes_lock:
+        _title_indexes[user.id] = (signature, index)
+        _title_indexes.move_to_end(user.id)
+        while len(_title_indexes) > TITLE_INDEX_CACHE_SIZE:
+            _title_indexes.popitem(last=False)
+    return index
+
+
+def autocomplete_book_titles(user: User, query: str, limit: int = 10) -> list[dict]:
+    """Suggest the user's books whose titles best match a partial title.
+
+    Tolerates typos and unfinished words. Uses the pg_trgm index on
+    PostgreSQL and a cached in-process trigram index elsewhere.
+
+    Returns:
+        Up to ``limit`` books with their title similarity, best first.
+    """
+    if connection.vendor == "postgresql":
+        return _postgresql_autocomplete(user, query, limit)
+    index = _get_title_index(user)
+    return [
+        {"id": book_id, "title": index.texts[book_id], "similarity": similarity}
+        for book_id, similarity in index.search(
+            query, limit, AUTOCOMPLETE_MIN_SIMILARITY
+        )
+    ]
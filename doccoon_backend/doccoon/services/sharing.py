@@ -1,77 +1,427 @@
-from typing import Optional
+import logging
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
 
 from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.content import ContentObject
 from doccoon.models.sharing import SharedBook, SharedPage
 from doccoon.models.user import User
+from doccoon.utils.hashing import content_hash
+from doccoon.utils.render import RENDER_VERSION, render_markdown
+from doccoon.utils.stats import content_size, page_headings
+
+logger = logging.getLogger(__name__)
+
+# Digests looked up or content objects written per query
+CONTENT_BATCH_SIZE = 500
+
+# Content objects used more recently than this are never collected, a share
+# referencing one may still be saving
+CONTENT_GC_MIN_AGE = timedelta(hours=1)
+# Reused objects are marked as used at most this often, well within
+# CONTENT_GC_MIN_AGE
+CONTENT_USE_INTERVAL = timedelta(minutes=10)
+
+# Public share payloads are cached pre-encoded, per share token
+SHARE_CACHE_TIMEOUT = 60 * 60  # 1 hour
+SHARE_MISSING_TIMEOUT = 60  # unknown or revoked tokens
+SHARE_BUILD_LOCK_TIMEOUT = 10
+SHARE_BUILD_WAIT = 2.0  # seconds a reader waits for another one to build
+SHARE_BUILD_POLL = 0.05
+
+# Pages of a shared book returned per request, by default and at most
+SHARE_PAGE_WINDOW = 20
+SHARE_PAGE_WINDOW_MAX = 100
+
+# Shares are invalidated by moving them to a new generation, payloads are
+# cached per generation. An expired generation only costs a rebuild.
+SHARE_GENERATION_TIMEOUT = 24 * 60 * 60
+
+# Cached marker, payloads are JSON documents so never equal to it
+_SHARE_MISSING = b"missing"
 
 
 def get_shared_book_by_token(share_token: str) -> Optional[SharedBook]:
     try:
-        return SharedBook.objects.select_related("book", "book__author").get(
+        return SharedBook.objects.select_related("book").get(
             share_token=share_token,
             is_active=True,
             is_deleted=False,
             book__is_deleted=False,
         )
-    except SharedBook.DoesNotExist:
+    except (SharedBook.DoesNotExist, ValidationError):
+        # Malformed tokens are not found either
         return None
 
 
 def get_shared_page_by_token(share_token: str) -> Optional[SharedPage]:
+    # The live page is only needed for its number and book, its content is
+    # never shown
     try:
-        return SharedPage.objects.select_related("page", "page__book").get(
-            share_token=share_token,
-            is_active=True,
-            is_deleted=False,
-            page__is_deleted=False,
+        return (
+            SharedPage.objects.select_related("page__book", "content_object")
+            .only(
+                "created_at",
+                "modified_at",
+                "page__page_number",
+                "page__book__title",
+                "page__book__status",
+                "content_object__content",
+                "content_object__html",
+                "content_object__html_version",
+            )
+            .get(
+                share_token=share_token,
+                is_active=True,
+                is_deleted=False,
+                page__is_deleted=False,
+            )
         )
-    except SharedPage.DoesNotExist:
+    except (SharedPage.DoesNotExist, ValidationError):
         return None
 
 
+def _share_cache_key(kind: str, share_token: str) -> str:
+    return f"public_share:{kind}:{share_token}"
+
+
+def _share_generation(key: str) -> str:
+    """The current generation of a share's cached payload, started if none is."""
+    generation_key = f"{key}:generation"
+    generation = cache.get(generation_key)
+    if generation is None:
+        cache.add(generation_key, uuid.uuid4().hex, SHARE_GENERATION_TIMEOUT)
+        generation = cache.get(generation_key)
+    return generation
+
+
+def get_public_share_payload(
+    kind: str, share_token: str, build: Callable[[], Optional[bytes]]
+) -> Optional[bytes]:
+    """Return the encoded public payload of a share, None if not found.
+
+    Payloads are cached per share token and generation. On a miss, one
+    reader builds the payload while the others wait for it instead of all
+    querying the database. A payload is stored under the generation seen
+    before building it, so one built across an invalidation is never read.
+
+    Args:
+        kind: "book" or "page".
+        build: Builds the payload from the database, None if not found.
+    """
+    try:
+        # One cache entry per share, whatever the spelling of its token
+        share_token = str(uuid.UUID(share_token))
+    except ValueError:
+        return None
+    key = _share_cache_key(kind, share_token)
+    generation = _share_generation(key)
+    if generation is None:
+        # The cache is not storing anything
+        return build()
+    payload_key = f"{key}:{generation}"
+    lock_key = f"{payload_key}:lock"
+    deadline = time.monotonic() + SHARE_BUILD_WAIT
+    while True:
+        cached = cache.get(payload_key)
+        if cached is not None:
+            return None if cached == _SHARE_MISSING else cached
+        if cache.add(lock_key, 1, SHARE_BUILD_LOCK_TIMEOUT):
+            break
+        if time.monotonic() >= deadline:
+            # The builder is stuck, serve this request uncached
+            return build()
+        time.sleep(SHARE_BUILD_POLL)
+
+    try:
+        payload = build()
+        if payload is None:
+            cache.set(payload_key, _SHARE_MISSING, SHARE_MISSING_TIMEOUT)
+        else:
+            cache.set(payload_key, payload, SHARE_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return payload
+
+
+def invalidate_public_share(kind: str, share_token: uuid.UUID) -> None:
+    """Move a share to a new generation once the transaction commits, so
+    payloads cached or being built before then are no longer read."""
+    key = f"{_share_cache_key(kind, str(share_token))}:generation"
+    transaction.on_commit(
+        lambda: cache.set(key, uuid.uuid4().hex, SHARE_GENERATION_TIMEOUT)
+    )
+
+
+def invalidate_book_shares(book: doccoon) -> None:
+    """Drop the cached payloads of every share showing the book's details."""
+    for token in SharedBook.objects.filter(book=book).values_list(
+        "share_token", flat=True
+    ):
+        invalidate_public_share("book", token)
+    invalidate_page_shares(
+        SharedPage.objects.filter(book=book).values_list("page_id", flat=True)
+    )
+
+
+def invalidate_page_shares(page_ids: Iterable[int]) -> None:
+    """Drop the cached payloads of the shares of pages."""
+    for token in SharedPage.objects.filter(page_id__in=list(page_ids)).values_list(
+        "share_token", flat=True
+    ):
+        invalidate_public_share("page", token)
+
+
+def _batches(items: list, size: int = CONTENT_BATCH_SIZE) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _store_page_content(pages: QuerySet) -> dict[int, tuple[str, int, list]]:
+    """Make sure the content of pages is stored as content objects.
+
+    Pages are matched to stored objects by their ``content_hash``, only the
+    content of pages with no stored object yet is loaded and written.
+
+    Returns:
+        The digest, size and headings of each page's content, keyed by page
+        id in the order of ``pages``.
+    """
+    rows = list(pages.values_list("id", "content_hash", "content_size"))
+    digests = {row[1] for row in rows if row[1]}
+    stored = {}
+    now = timezone.now()
+    for batch in _batches(sorted(digests)):
+        objects = ContentObject.objects.filter(digest__in=batch)
+        # Mark reused objects as used, so collection spares them from now on,
+        # then only count those still there as stored
+        objects.filter(last_used_at__lt=now - CONTENT_USE_INTERVAL).update(
+            last_used_at=now
+        )
+        stored.update(objects.values_list("digest", "headings"))
+
+    result = {
+        page_id: (digest, size, stored.get(digest, []))
+        for page_id, digest, size in rows
+    }
+    missing = [page_id for page_id, digest, _ in rows if digest not in stored]
+    for batch in _batches(missing):
+        objects = {}
+        for page in pages.filter(id__in=batch).only("id", "content", "chunked"):
+            # Hash the content itself, stored digests may predate it
+            digest = content_hash(page.content)
+            if digest in stored:
+                result[page.id] = (digest, content_size(page.content), stored[digest])
+                continue
+            obj = objects.get(digest) or ContentObject(
+                digest=digest,
+                content=page.content,
+                size=content_size(page.content),
+                headings=page_headings(page.content),
+            )
+            objects[digest] = obj
+            result[page.id] = (digest, obj.size, obj.headings)
+        ContentObject.objects.bulk_create(objects.values(), ignore_conflicts=True)
+        stored.update((digest, obj.headings) for digest, obj in objects.items())
+    return result
+
+
 def _capture_book_pages(book: doccoon) -> list[dict]:
     pages = DoccoonPage.objects.filter(book=book, is_deleted=False).order_by(
-        "page_number"
+        "position", "id"
     )
-    return [{"page_number": p.page_number, "content": p.content} for p in pages]
+    stored = _store_page_content(pages)
+    return [
+        {"page_number": number, "digest": digest, "size": size, "headings": headings}
+        for number, (digest, size, headings) in enumerate(stored.values(), start=1)
+    ]
+
+
+def get_snapshot_pages(
+    share: SharedBook, start: int = 1, end: Optional[int] = None
+) -> list[dict]:
+    """Return pages ``start`` to ``end`` of a book share with their content.
+
+    Page numbers are 1-based and inclusive, ``end`` defaults to the last
+    page. Only the content of the requested pages is loaded.
+    """
+    window = share.manifest[max(start, 1) - 1 : end]
+    digests = sorted({page["digest"] for page in window})
+    objects = {}
+    for batch in _batches(digests):
+        objects.update(
+            (obj.digest, obj)
+            for obj in ContentObject.objects.filter(digest__in=batch).only(
+                "digest", "content", "html", "html_version"
+            )
+        )
+    pages = []
+    for page in window:
+        obj = objects.get(page["digest"])
+        if obj is None:
+            # Collected from under the share, show the page as empty
+            logger.error(
+                f"Content {page['digest']} of book share {share.id} is missing"
+            )
+        pages.append(
+            {
+                "page_number": page["page_number"],
+                "content": obj.content if obj else "",
+                "html": get_content_html(obj) if obj else None,
+            }
+        )
+    return pages
+
+
+def get_content_html(obj: ContentObject) -> Optional[str]:
+    """Return the HTML rendering of a content object, None if not rendered
+    by the current renderer yet."""
+    return obj.html if obj.html_version == RENDER_VERSION else None
 
 
 def get_or_create_book_share(book: doccoon, user: User) -> SharedBook:
-    snapshot = _capture_book_pages(book)
+    manifest = _capture_book_pages(book)
     share, created = SharedBook.objects.get_or_create(
         book=book,
         shared_by=user,
-        defaults={"is_active": True, "pages_snapshot": snapshot},
+        defaults={"is_active": True, "manifest": manifest},
     )
     if not created:
-        share.pages_snapshot = snapshot
+        share.manifest = manifest
         if not share.is_active:
             share.is_active = True
         share.save()
+        invalidate_public_share("book", share.share_token)
+    schedule_share_render("book", share.id)
     return share
 
 
 def get_or_create_page_share(
     page: DoccoonPage, book: doccoon, user: User
 ) -> SharedPage:
+    pages = DoccoonPage.objects.filter(id=page.id)
+    digest = _store_page_content(pages)[page.id][0]
     share, created = SharedPage.objects.get_or_create(
         page=page,
         shared_by=user,
-        defaults={"book": book, "is_active": True, "content_snapshot": page.content},
+        defaults={"book": book, "is_active": True, "content_object_id": digest},
     )
     if not created:
-        share.content_snapshot = page.content
+        share.content_object_id = digest
         if not share.is_active:
             share.is_active = True
         share.save()
+        invalidate_public_share("page", share.share_token)
+    schedule_share_render("page", share.id)
     return share
 
 
+def schedule_share_render(kind: str, share_id: int) -> None:
+    """Render a share's content to HTML once the transaction commits, when
+    SHARE_RENDER_HTML is on."""
+    if not settings.SHARE_RENDER_HTML:
+        return
+    from doccoon.tasks.sharing import render_share_task
+
+    transaction.on_commit(lambda: render_share_task.delay(kind, share_id))
+
+
+def render_content_objects(digests: Iterable[str]) -> int:
+    """
+    Render content objects to HTML, skipping those the current renderer
+    already rendered.
+
+    Returns:
+        The number of content objects rendered.
+    """
+    rendered = 0
+    for batch in _batches(sorted(set(digests))):
+        objects = list(
+            ContentObject.objects.filter(digest__in=batch)
+            .exclude(html_version=RENDER_VERSION)
+            .only("digest", "content")
+        )
+        for obj in objects:
+            obj.html = render_markdown(obj.content)
+            obj.html_version = RENDER_VERSION
+        ContentObject.objects.bulk_update(objects, ["html", "html_version"])
+        rendered += len(objects)
+    return rendered
+
+
+def render_share(kind: str, share_id: int) -> int:
+    """
+    Render the content of a share to HTML, and drop its cached payload if
+    anything new was rendered.
+
+    Returns:
+        The number of content objects rendered.
+    """
+    if kind == "book":
+        share = SharedBook.objects.filter(id=share_id).only("share_token", "manifest")
+        share = share.first()
+        digests = [page["digest"] for page in share.manifest] if share else []
+    else:
+        share = SharedPage.objects.filter(id=share_id).only(
+            "share_token", "content_object"
+        )
+        share = share.first()
+        digests = [share.content_object_id] if share else []
+
+    rendered = render_content_objects(digests)
+    if rendered:
+        invalidate_public_share(kind, share.share_token)
+    return rendered
+
+
+def collect_orphaned_content(min_age: timedelta = CONTENT_GC_MIN_AGE) -> int:
+    """
+    Delete content objects that no share refers to anymore.
+
+    Returns:
+        The number of content objects deleted.
+    """
+    referenced = set(
+        SharedPage.objects.values_list("content_object_id", flat=True).distinct()
+    )
+    for share in SharedBook.objects.only("manifest").iterator(chunk_size=100):
+        referenced.update(page["digest"] for page in share.manifest)
+
+    cutoff = timezone.now() - min_age
+    candidates = ContentObject.objects.filter(last_used_at__lt=cutoff).values_list(
+        "digest", flat=True
+    )
+    orphaned = [digest for digest in candidates.iterator() if digest not in referenced]
+    deleted = 0
+    for batch in _batches(orphaned):
+        with transaction.atomic():
+            # Shares taken since the scan marked their objects as used or
+            # refer to them from a page share, lock what is still unused
+            unused = (
+                ContentObject.objects.filter(digest__in=batch, last_used_at__lt=cutoff)
+                .exclude(page_shares__isnull=False)
+                .select_for_update()
+            )
+            digests = list(unused.values_list("digest", flat=True))
+            deleted += ContentObject.objects.filter(digest__in=digests).delete()[0]
+    return deleted
+
+
 def revoke_book_share(book: doccoon, user: User) -> bool:
     try:
         share = SharedBook.objects.get(book=book, shared_by=user, is_active=True)
         share.is_active = False
         share.save()
+        invalidate_public_share("book", share.share_token)
         return True
     except SharedBook.DoesNotExist:
         return False
@@ -82,6 +432,7 @@ def revoke_page_share(page: DoccoonPage, user: User) -> bool:
         share = SharedPage.objects.get(page=page, shared_by=user, is_active=True)
         share.is_active = False
         share.save()
+        invalidate_public_share("page", share.share_token)
         return True
     except SharedPage.DoesNotExist:
         return False
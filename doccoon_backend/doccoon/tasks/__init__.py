@@ -1,3 +1,18 @@
+from .blobs import collect_orphaned_blobs_task
+from .book_import import import_book_task
 from .email import send_email_task, send_password_reset_email_task
+from .export import build_book_export_task, collect_expired_exports_task
+from .pages import compact_page_order_task
+from .sharing import collect_orphaned_content_task, render_share_task
 
-__all__ = ["send_email_task", "send_password_reset_email_task"]
+__all__ = [
+    "build_book_export_task",
+    "collect_expired_exports_task",
+    "collect_orphaned_blobs_task",
+    "collect_orphaned_content_task",
+    "compact_page_order_task",
+    "import_book_task",
+    "render_share_task",
+    "send_email_task",
+    "send_password_reset_email_task",
+]
@@ -0,0 +1,14 @@
+import logging
+
+from celery import shared_task
+
+from doccoon.services.blob import collect_orphaned_blobs
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def collect_orphaned_blobs_task():
+    """Task to delete stored images that no content links to anymore."""
+    deleted = collect_orphaned_blobs()
+    logger.info(f"Collected {deleted} orphaned blobs")
@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+
+from doccoon.services.book_import import import_book
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def import_book_task(import_id: int):
+    """Task to import an upload of Markdown files as pages."""
+    book_import = import_book(import_id)
+    if book_import is not None:
+        logger.info(
+            f"Import {import_id} finished as {book_import.status} "
+            f"with {book_import.page_count} pages"
+        )
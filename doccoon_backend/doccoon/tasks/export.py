@@ -0,0 +1,22 @@
+import logging
+
+from celery import shared_task
+
+from doccoon.services.export import build_book_export, collect_expired_exports
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def build_book_export_task(export_id: int):
+    """Task to build an export file of a book."""
+    export = build_book_export(export_id)
+    if export is not None:
+        logger.info(f"Export {export_id} finished as {export.status}")
+
+
+@shared_task
+def collect_expired_exports_task():
+    """Task to delete export files past their lifetime."""
+    deleted = collect_expired_exports()
+    logger.info(f"Collected {deleted} expired exports")
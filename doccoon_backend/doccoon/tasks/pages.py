@@ -0,0 +1,23 @@
+import logging
+
+from celery import shared_task
+
+from doccoon.services.page import compact_page_order, run_scheduled_page_compaction
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def compact_page_order_task(book_id: int, regap: bool = False):
+    """
+    Task to renumber a book's pages after they were moved.
+
+    Args:
+        book_id: The book to compact
+        regap: Whether to also re-space page positions evenly
+    """
+    if regap:
+        written = compact_page_order(book_id, regap=True)
+    else:
+        written = run_scheduled_page_compaction(book_id)
+    logger.info(f"Compacted page order of book {book_id}: {written} pages written")
@@ -0,0 +1,21 @@
+import logging
+
+from celery import shared_task
+
+from doccoon.services.sharing import collect_orphaned_content, render_share
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def collect_orphaned_content_task():
+    """Task to delete shared content that no share refers to anymore."""
+    deleted = collect_orphaned_content()
+    logger.info(f"Collected {deleted} orphaned content objects")
+
+
+@shared_task
+def render_share_task(kind: str, share_id: int):
+    """Task to render the content of a share to HTML."""
+    rendered = render_share(kind, share_id)
+    logger.info(f"Rendered {rendered} content objects of {kind} share {share_id}")
@@ -0,0 +1,198 @@
+import base64
+import hashlib
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage
+from doccoon.models.revision import PageRevision
+from doccoon.models.user import User
+from doccoon.services.blob import (
+    collect_orphaned_blobs,
+    get_blob_name,
+    get_blob_storage,
+    get_blob_url,
+    get_referenced_blobs,
+    store_blob,
+)
+from doccoon.tests.test_books import create_book
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+PNG_DIGEST = hashlib.sha256(PNG).hexdigest()
+
+
+def data_uri(data: bytes, mime: str = "image/png") -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+class BlobTests(TestCase):
+    """Tests for extracting inline images into the blob store."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.pages_url = f"/api/books/{self.book.id}/pages/"
+
+        storage = get_blob_storage()
+        if storage.exists(""):
+            for prefix in storage.listdir("")[0]:
+                for filename in storage.listdir(prefix)[1]:
+                    storage.delete(f"{prefix}/{filename}")
+
+    def test_inline_image_is_extracted(self):
+        """Test that a base64 image is stored once and linked by URL."""
+        content = f"![a]({data_uri(PNG)})\n\n![b]({data_uri(PNG)})"
+        response = self.client.post(self.pages_url, {"content": content})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        url = get_blob_url(PNG_DIGEST, "png")
+        self.assertEqual(
+            response.json()["results"]["content"], f"![a]({url})\n\n![b]({url})"
+        )
+        storage = get_blob_storage()
+        self.assertTrue(storage.exists(get_blob_name(PNG_DIGEST, "png")))
+        self.assertEqual(storage.listdir(PNG_DIGEST[:2])[1], [f"{PNG_DIGEST}.png"])
+
+    def test_update_extracts_inline_image(self):
+        """Test that inline images are extracted when content is updated."""
+        page = DoccoonPage.objects.create(book=self.book, page_number=1, content="")
+        response = self.client.put(
+            f"{self.pages_url}{page.id}/",
+            {"content": f"![gif]({data_uri(PNG, 'image/gif')})"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page.refresh_from_db()
+        self.assertNotIn("base64", page.content)
+        self.assertIn(get_blob_url(PNG_DIGEST, "gif"), page.content)
+
+    def test_patch_extracts_html_image(self):
+        """Test that an HTML image patched in is extracted before sanitizing,
+        which would drop its data URI."""
+        page = DoccoonPage.objects.create(book=self.book, page_number=1, content="")
+        response = self.client.patch(
+            f"{self.pages_url}{page.id}/",
+            {
+                "base_hash": page.content_hash,
+                "operations": [
+                    {
+                        "op": "insert",
+                        "offset": 0,
+                        "text": f'<img src="{data_uri(PNG)}" alt="a">',
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page.refresh_from_db()
+        self.assertIn(f'src="{get_blob_url(PNG_DIGEST, "png")}"', page.content)
+
+    def test_unsupported_image_is_kept_inline(self):
+        """Test that SVG data URIs are not written to the blob store."""
+        svg = b"<svg/>"
+        uri = data_uri(svg, "image/svg+xml")
+        response = self.client.post(self.pages_url, {"content": f"![x]({uri})"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(uri, response.json()["results"]["content"])
+        digest = hashlib.sha256(svg).hexdigest()
+        self.assertFalse(get_blob_storage().exists(get_blob_name(digest, "svg")))
+
+    def test_serve_blob(self):
+        """Test that stored blobs are served publicly and cached forever."""
+        digest = store_blob(PNG, "png")
+        client = APIClient()
+        response = client.get(f"/api/blobs/{digest}.png")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), PNG)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = client.get(f"/api/blobs/{'0' * 64}.png")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_collect_orphaned_blobs(self):
+        """Test that only unreferenced blobs past the grace period are deleted."""
+        kept = store_blob(PNG, "png")
+        orphan = store_blob(b"orphan", "png")
+        DoccoonPage.objects.create(
+            book=self.book,
+            page_number=1,
+            content=f"![a]({get_blob_url(kept, 'png')})",
+        )
+
+        self.assertEqual(collect_orphaned_blobs(), 0)
+        self.assertEqual(collect_orphaned_blobs(timedelta(0)), 1)
+
+        storage = get_blob_storage()
+        self.assertTrue(storage.exists(get_blob_name(kept, "png")))
+        self.assertFalse(storage.exists(get_blob_name(orphan, "png")))
+
+    def test_reused_blob_is_touched(self):
+        """Test that storing a blob again restarts its grace period."""
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "blobs": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": location},
+                },
+            }
+        ):
+            digest = store_blob(PNG, "png")
+            path = get_blob_storage().path(get_blob_name(digest, "png"))
+            old = time.time() - 2 * 24 * 60 * 60
+            os.utime(path, (old, old))
+            store_blob(PNG, "png")
+
+            self.assertEqual(collect_orphaned_blobs(), 0)
+            self.assertTrue(os.path.exists(path))
+
+    def test_blob_referenced_during_collection_is_kept(self):
+        """Test that references are checked again before deleting."""
+        digest = store_blob(PNG, "png")
+        scans = []
+
+        def scan():
+            # A page linking to the blob is saved right after the first scan
+            scans.append(None)
+            if len(scans) == 1:
+                DoccoonPage.objects.create(
+                    book=self.book,
+                    page_number=1,
+                    content=f"![a]({get_blob_url(digest, 'png')})",
+                )
+                return set()
+            return get_referenced_blobs()
+
+        with mock.patch("doccoon.services.blob.get_referenced_blobs", side_effect=scan):
+            self.assertEqual(collect_orphaned_blobs(timedelta(0)), 0)
+        self.assertTrue(get_blob_storage().exists(get_blob_name(digest, "png")))
+
+    def test_reference_rebuilt_from_delta(self):
+        """Test that a reference split between a delta and the text it keeps
+        is found."""
+        link = f"![a]({get_blob_url(PNG_DIGEST, 'png')})\n"
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=f"Intro\n{link[-20:]}"
+        )
+        PageRevision.objects.create(
+            page=page, version=1, delta=[[0, 1, link[:-20]]], chain_length=1
+        )
+        PageRevision.objects.create(
+            page=page, version=0, delta=[[0, 1, "Gone\n"]], chain_length=2
+        )
+
+        self.assertIn(PNG_DIGEST, get_referenced_blobs())
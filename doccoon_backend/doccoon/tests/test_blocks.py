@@ -0,0 +1,132 @@
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage, PageBlock
+from doccoon.models.user import User
+from doccoon.services.blob import get_referenced_blobs
+from doccoon.tests.test_books import create_book
+from doccoon.utils.blocks import split_blocks
+
+LINES = [f"Line {number} of a very large page.\n" for number in range(400)]
+LARGE_CONTENT = "".join(LINES)
+
+
+@override_settings(PAGE_BLOCK_THRESHOLD=4000, PAGE_BLOCK_SIZE=500)
+class PageBlockTests(TestCase):
+    """Tests for storing large pages in blocks."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.book = create_book(self.user)
+        self.page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=LARGE_CONTENT
+        )
+
+    def block_ids(self) -> dict[int, int]:
+        return dict(PageBlock.objects.filter(page=self.page).values_list("id", "index"))
+
+    def test_split_blocks(self):
+        """Test that blocks join back and only an edited one changes."""
+        blocks = split_blocks(LARGE_CONTENT, 500)
+        self.assertEqual("".join(blocks), LARGE_CONTENT)
+        self.assertTrue(all(len(block) <= 1000 for block in blocks))
+
+        edited = LINES[:200] + ["An inserted line.\n"] + LINES[200:]
+        changed = set(split_blocks("".join(edited), 500)) - set(blocks)
+        self.assertLessEqual(len(changed), 2)
+
+        long_line = "x" * 2500
+        self.assertEqual("".join(split_blocks(long_line, 500)), long_line)
+
+    def test_large_page_stored_in_blocks(self):
+        """Test that large content lives in blocks and reads back whole."""
+        row = DoccoonPage.objects.filter(id=self.page.id).values("content", "chunked")
+        self.assertTrue(row[0]["chunked"])
+        self.assertEqual(bytes(row[0]["content"]), b"")
+        self.assertGreater(len(self.block_ids()), 1)
+
+        page = DoccoonPage.objects.get(id=self.page.id)
+        self.assertNotIn("content", page.__dict__)
+        self.assertEqual(page.content, LARGE_CONTENT)
+
+        response = self.client.get(f"/api/books/{self.book.id}/pages/{page.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["content"], LARGE_CONTENT)
+
+    def test_edit_rewrites_changed_blocks(self):
+        """Test that an edit keeps the rows of the blocks it does not touch."""
+        before = self.block_ids()
+        page = DoccoonPage.objects.get(id=self.page.id)
+        page.content = LARGE_CONTENT.replace("Line 200 ", "Line two hundred ")
+        page.save()
+
+        after = self.block_ids()
+        self.assertEqual(len(before), len(after))
+        self.assertEqual(len(set(before) - set(after)), 0)
+        self.assertEqual(DoccoonPage.objects.get(id=page.id).content, page.content)
+
+    def test_insert_shifts_following_blocks(self):
+        """Test that inserted text keeps later blocks in order."""
+        before = self.block_ids()
+        content = "".join(
+            LINES[:100]
+            + [f"An added line of text, number {n}.\n" for n in range(60)]
+            + LINES[100:]
+        )
+        page = DoccoonPage.objects.get(id=self.page.id)
+        page.content = content
+        page.save()
+
+        after = self.block_ids()
+        self.assertGreater(len(after), len(before))
+        self.assertEqual(sorted(after.values()), list(range(len(after))))
+        # Blocks after the insertion keep their rows under a new index
+        self.assertGreater(len(set(before) & set(after)), len(before) // 2)
+        self.assertEqual(DoccoonPage.objects.get(id=page.id).content, content)
+
+    def test_shrunk_page_leaves_blocks(self):
+        """Test that a page below the threshold goes back to a single row."""
+        page = DoccoonPage.objects.get(id=self.page.id)
+        page.content = "Short again"
+        page.save()
+
+        page = DoccoonPage.objects.get(id=self.page.id)
+        self.assertFalse(page.chunked)
+        self.assertEqual(page.content, "Short again")
+        self.assertFalse(PageBlock.objects.filter(page=page).exists())
+
+    def test_bulk_update_and_search(self):
+        """Test that bulk edits store blocks and chunked pages are searched."""
+        response = self.client.post(
+            f"/api/books/{self.book.id}/pages/bulk/",
+            {
+                "create": [{"content": LARGE_CONTENT + "Hippopotamus\n"}],
+                "update": [{"id": self.page.id, "page_number": 2}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        created = DoccoonPage.objects.get(id=response.json()["results"]["created"][0])
+        self.assertTrue(created.chunked)
+        self.assertTrue(created.content.endswith("Hippopotamus"))
+        self.assertEqual(
+            DoccoonPage.objects.get(id=self.page.id).content, LARGE_CONTENT
+        )
+
+        response = self.client.get("/api/search/", {"q": "hippopotamus"})
+        pages = response.json()["results"]["pages"]
+        self.assertEqual([hit["id"] for hit in pages], [created.id])
+
+    def test_blob_references_in_blocks(self):
+        """Test that blobs linked from chunked pages are not collected."""
+        digest = "a" * 64
+        page = DoccoonPage.objects.get(id=self.page.id)
+        page.content = LARGE_CONTENT + f"![](/api/blobs/{digest}.png)\n"
+        page.save()
+        self.assertIn(digest, get_referenced_blobs())
@@ -1,10 +1,25 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from doccoon.models.book import BOOK_STATUS, DoccoonPage, doccoon
+from doccoon.models.book import BOOK_STATUS, DoccoonPage, PageBlock, doccoon
+from doccoon.models.revision import PageRevision
 from doccoon.models.user import User
+from doccoon.services.book import reconcile_book_stats, recount_page_stats
+from doccoon.services.page import (
+    allocate_page_slots,
+    compact_page_order,
+    get_page_for_update,
+    get_pages_by_book,
+    get_pages_by_ids,
+    run_scheduled_page_compaction,
+)
+from doccoon.utils.hashing import content_hash
 
 
 def create_book(author, title="Test Book", **kwargs):
@@ -78,6 +93,26 @@ class BookCRUDTests(TestCase):
         self.assertEqual(data["title"], "Detail Book")
         self.assertEqual(len(data["pages"]), 2)
 
+    def test_stream_book_detail(self):
+        """Test that large books are streamed in the same shape, byte for byte."""
+        book = create_book(self.user, title="Large Book")
+        for number, content in enumerate(["Café ☕", "Line\u2028break", ""], 1):
+            DoccoonPage.objects.create(book=book, page_number=number, content=content)
+
+        response = self.client.get(f"{self.books_url}{book.id}/")
+        self.assertFalse(response.streaming)
+        with mock.patch("doccoon.services.book.BOOK_STREAM_MIN_SIZE", 0):
+            streamed = self.client.get(f"{self.books_url}{book.id}/")
+        self.assertEqual(streamed.status_code, status.HTTP_200_OK)
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(b"".join(streamed.streaming_content), response.content)
+
+        empty = create_book(self.user, title="Empty Book")
+        response = self.client.get(f"{self.books_url}{empty.id}/")
+        with mock.patch("doccoon.services.book.BOOK_STREAM_MIN_SIZE", 0):
+            streamed = self.client.get(f"{self.books_url}{empty.id}/")
+        self.assertEqual(b"".join(streamed.streaming_content), response.content)
+
     def test_update_book(self):
         """Test updating a book."""
         book = create_book(self.user, title="Original Title")
@@ -213,6 +248,34 @@ class PageCRUDTests(TestCase):
         page.refresh_from_db()
         self.assertEqual(page.content, "Updated content")
 
+    def test_update_page_unchanged_content_skips_write(self):
+        """Test that re-sending the stored content does not write the page."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="Same content"
+        )
+        modified_at = page.modified_at
+
+        response = self.client.put(
+            f"{self.pages_url}{page.id}/", {"content": "Same content"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()["results"]["written"])
+        page.refresh_from_db()
+        self.assertEqual(page.modified_at, modified_at)
+
+    def test_update_page_stores_content_hash(self):
+        """Test that the content digest follows content updates."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="Original content"
+        )
+
+        response = self.client.put(
+            f"{self.pages_url}{page.id}/", {"content": "Updated content"}
+        )
+        self.assertTrue(response.json()["results"]["written"])
+        page.refresh_from_db()
+        self.assertEqual(page.content_hash, content_hash("Updated content"))
+
     def test_delete_page(self):
         """Test soft-deleting a page."""
         page = DoccoonPage.objects.create(
@@ -245,6 +308,716 @@ class PageCRUDTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class PageConcurrencyTests(TestCase):
+    """Tests for versioned page updates and three-way merging."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="one\ntwo\nthree\n"
+        )
+        self.page_url = f"/api/books/{self.book.id}/pages/{self.page.id}/"
+
+    def test_update_increments_version(self):
+        """Test that content updates bump the version and return an ETag."""
+        response = self.client.put(
+            self.page_url, {"content": "changed\n", "base_version": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["version"], 2)
+        self.assertEqual(response["ETag"], '"2"')
+
+    def test_concurrent_edits_are_merged(self):
+        """Test that edits to different lines from the same base are merged."""
+        self.client.put(self.page_url, {"content": "ONE\ntwo\nthree\n"})
+
+        response = self.client.put(
+            self.page_url,
+            {"content": "one\ntwo\nTHREE\n"},
+            HTTP_IF_MATCH='"1"',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.content, "ONE\ntwo\nTHREE\n")
+        self.assertEqual(self.page.version, 3)
+
+    def test_conflicting_edits_return_conflict(self):
+        """Test that edits to the same line from the same base conflict."""
+        self.client.put(self.page_url, {"content": "ONE\ntwo\nthree\n"})
+
+        response = self.client.put(
+            self.page_url, {"content": "uno\ntwo\nthree\n", "base_version": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()["results"]["version"], 2)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.content, "ONE\ntwo\nthree\n")
+
+    def test_update_without_base_version_overwrites(self):
+        """Test that updates without a base version keep last-write-wins."""
+        self.client.put(self.page_url, {"content": "ONE\ntwo\nthree\n"})
+
+        response = self.client.put(self.page_url, {"content": "uno\n"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.content, "uno\n")
+
+
+class PageBulkTests(TestCase):
+    """Tests for the bulk page save endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.bulk_url = f"/api/books/{self.book.id}/pages/bulk/"
+
+    def test_bulk_create_update_delete(self):
+        """Test creating, updating and deleting pages in one request."""
+        page1 = DoccoonPage.objects.create(book=self.book, page_number=1, content="A")
+        page2 = DoccoonPage.objects.create(book=self.book, page_number=2, content="B")
+
+        response = self.client.post(
+            self.bulk_url,
+            {
+                "create": [{"content": "C"}, {"content": "D"}],
+                "update": [{"id": page1.id, "content": "A2"}],
+                "delete": [page2.id],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()["results"]
+        self.assertEqual(len(data["created"]), 2)
+        self.assertEqual(data["updated"], [page1.id])
+        self.assertEqual(data["deleted"], [page2.id])
+
+        page1.refresh_from_db()
+        page2.refresh_from_db()
+        self.assertEqual(page1.content, "A2")
+        self.assertTrue(page2.is_deleted)
+        pages = get_pages_by_book(self.book.id)
+        self.assertEqual([p.content for p in pages], ["A2", "C", "D"])
+
+    def test_bulk_skips_unchanged_pages(self):
+        """Test that unchanged pages are not written or reported as updated."""
+        page = DoccoonPage.objects.create(book=self.book, page_number=1, content="A")
+        modified_at = page.modified_at
+
+        response = self.client.post(
+            self.bulk_url,
+            {"update": [{"id": page.id, "content": "A", "page_number": 1}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["updated"], [])
+        page.refresh_from_db()
+        self.assertEqual(page.modified_at, modified_at)
+
+    def test_bulk_sanitizes_content(self):
+        """Test that bulk saves sanitize page content."""
+        response = self.client.post(
+            self.bulk_url,
+            {"create": [{"content": "<script>alert(1)</script>Hi"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page = DoccoonPage.objects.get(id=response.json()["results"]["created"][0])
+        self.assertNotIn("<script>", page.content)
+
+    def test_bulk_query_count_is_constant(self):
+        """Test that the number of queries does not grow with the batch size."""
+        pages = [
+            DoccoonPage.objects.create(book=self.book, page_number=i, content="x")
+            for i in range(1, 21)
+        ]
+
+        def payload(count):
+            return {
+                "create": [{"content": "new"}] * count,
+                "update": [{"id": p.id, "content": "y"} for p in pages[:count]],
+            }
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.bulk_url, payload(2), format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(self.bulk_url, payload(20), format="json")
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_bulk_merges_from_base_version(self):
+        """Test that bulk updates from an older version are merged like PUT."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="one\ntwo\nthree\n"
+        )
+        url = f"/api/books/{self.book.id}/pages/{page.id}/"
+        self.client.put(url, {"content": "ONE\ntwo\nthree\n"})
+
+        response = self.client.post(
+            self.bulk_url,
+            {
+                "update": [
+                    {"id": page.id, "content": "one\ntwo\nTHREE\n", "base_version": 1}
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The client does not hold the merged content, so keeps its base
+        self.assertEqual(response.json()["results"]["versions"], {})
+        page.refresh_from_db()
+        self.assertEqual(page.content, "ONE\ntwo\nTHREE\n")
+        self.assertEqual(page.version, 3)
+
+        response = self.client.post(
+            self.bulk_url,
+            {"update": [{"id": page.id, "content": "done\n", "base_version": 3}]},
+            format="json",
+        )
+        self.assertEqual(response.json()["results"]["versions"], {str(page.id): 4})
+
+    def test_bulk_conflict_saves_other_pages(self):
+        """Test that a conflicting page is reported and the others saved."""
+        page1 = DoccoonPage.objects.create(book=self.book, page_number=1, content="A")
+        page2 = DoccoonPage.objects.create(book=self.book, page_number=2, content="B")
+        self.client.put(
+            f"/api/books/{self.book.id}/pages/{page2.id}/", {"content": "C"}
+        )
+
+        with mock.patch(
+            "doccoon.views.page.get_pages_by_ids", wraps=get_pages_by_ids
+        ) as get_pages:
+            response = self.client.post(
+                self.bulk_url,
+                {
+                    "update": [
+                        {"id": page1.id, "content": "A2", "base_version": 1},
+                        {"id": page2.id, "content": "D", "base_version": 1},
+                    ]
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(results["updated"], [page1.id])
+        self.assertEqual(results["versions"], {str(page1.id): 2})
+        self.assertEqual(
+            [
+                (page["id"], page["content"], page["version"])
+                for page in results["conflicts"]
+            ],
+            [(page2.id, "C", 2)],
+        )
+        get_pages.assert_called_once_with(
+            self.book.id, [page1.id, page2.id], for_update=True
+        )
+        page1.refresh_from_db()
+        page2.refresh_from_db()
+        self.assertEqual((page1.content, page1.version), ("A2", 2))
+        self.assertEqual((page2.content, page2.version), ("C", 2))
+
+    def test_bulk_rejects_pages_from_other_books(self):
+        """Test that pages outside the book cannot be touched."""
+        other_book = create_book(self.user, title="Other Book")
+        other_page = DoccoonPage.objects.create(
+            book=other_book, page_number=1, content="Other"
+        )
+
+        response = self.client.post(
+            self.bulk_url,
+            {"update": [{"id": other_page.id, "content": "Hijacked"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        other_page.refresh_from_db()
+        self.assertEqual(other_page.content, "Other")
+
+    def test_bulk_requires_book_owner(self):
+        """Test that users cannot bulk save pages of another user's book."""
+        other_user = User.objects.create_user(
+            email="other@example.com",
+            password="OtherPass123!",
+        )
+        book = create_book(other_user, title="Other's Book")
+
+        response = self.client.post(
+            f"/api/books/{book.id}/pages/bulk/",
+            {"create": [{"content": "Intruder"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(DoccoonPage.objects.filter(book=book).exists())
+
+
+class PagePatchTests(TestCase):
+    """Tests for patching page content with text operations."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="Hello world\n\nSecond block"
+        )
+        self.page_url = f"/api/books/{self.book.id}/pages/{self.page.id}/"
+
+    def test_patch_applies_operations(self):
+        """Test that insert and delete operations are applied in order."""
+        response = self.client.patch(
+            self.page_url,
+            {
+                "base_hash": content_hash(self.page.content),
+                "operations": [
+                    {"op": "delete", "offset": 6, "length": 5},
+                    {"op": "insert", "offset": 6, "text": "there"},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.content, "Hello there\n\nSecond block")
+        self.assertEqual(
+            response.json()["results"]["content_hash"],
+            content_hash(self.page.content),
+        )
+        self.assertNotIn("content", response.json()["results"])
+
+    def test_patch_sanitizes_edited_region(self):
+        """Test that inserted HTML is sanitized."""
+        response = self.client.patch(
+            self.page_url,
+            {
+                "base_hash": content_hash(self.page.content),
+                "operations": [
+                    {"op": "insert", "offset": 11, "text": "<script>x</script>"}
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.page.refresh_from_db()
+        self.assertNotIn("<script>", self.page.content)
+        self.assertTrue(self.page.content.endswith("\n\nSecond block"))
+
+    def test_patch_into_tag_is_sanitized(self):
+        """Test that an edit splicing an attribute into a tag that spans
+        blocks is sanitized with the rest of the content."""
+        content = '<a title="x > y\n\nz" href="https://example.com">link</a>'
+        DoccoonPage.objects.filter(id=self.page.id).update(
+            content=content, content_hash=content_hash(content)
+        )
+        response = self.client.patch(
+            self.page_url,
+            {
+                "base_hash": content_hash(content),
+                "operations": [
+                    {
+                        "op": "insert",
+                        "offset": content.index("z") + 1,
+                        "text": '" onmouseover="alert(1)',
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.page.refresh_from_db()
+        self.assertNotIn("onmouseover", self.page.content)
+        self.assertTrue(self.page.content.endswith("</a>"))
+
+    def test_patch_locks_page(self):
+        """Test that the base hash is checked against the locked page row."""
+        with mock.patch(
+            "doccoon.views.page.get_page_for_update", wraps=get_page_for_update
+        ) as lock:
+            response = self.client.patch(
+                self.page_url,
+                {
+                    "base_hash": content_hash(self.page.content),
+                    "operations": [{"op": "insert", "offset": 0, "text": "X"}],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lock.assert_called_once_with(self.page.id)
+
+    def test_patch_stale_base_hash_conflicts(self):
+        """Test that a stale base hash is rejected without writing."""
+        response = self.client.patch(
+            self.page_url,
+            {
+                "base_hash": content_hash("something else"),
+                "operations": [{"op": "insert", "offset": 0, "text": "X"}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.page.refresh_from_db()
+        self.assertEqual(self.page.content, "Hello world\n\nSecond block")
+
+    def test_patch_out_of_range_offset(self):
+        """Test that operations outside the content are rejected."""
+        response = self.client.patch(
+            self.page_url,
+            {
+                "base_hash": content_hash(self.page.content),
+                "operations": [{"op": "delete", "offset": 20, "length": 50}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PageOrderTests(TestCase):
+    """Tests for gap-based page ordering and moves."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.pages_url = f"/api/books/{self.book.id}/pages/"
+        self.pages = [
+            DoccoonPage.objects.create(book=self.book, page_number=i, content=str(i))
+            for i in range(1, 6)
+        ]
+
+    def list_contents(self):
+        response = self.client.get(self.pages_url)
+        results = response.json()["results"]
+        self.assertEqual(
+            [page["page_number"] for page in results], list(range(1, len(results) + 1))
+        )
+        return [page["content"] for page in results]
+
+    def test_move_page_to_front(self):
+        """Test moving a single page to the front writes only that page."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f"{self.pages_url}move/",
+                {"first": self.pages[4].id, "after": None},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.list_contents(), ["5", "1", "2", "3", "4"])
+
+    def test_move_page_range(self):
+        """Test moving a contiguous range keeps its order."""
+        response = self.client.post(
+            f"{self.pages_url}move/",
+            {
+                "first": self.pages[0].id,
+                "last": self.pages[1].id,
+                "after": self.pages[3].id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.list_contents(), ["3", "4", "1", "2", "5"])
+
+    def test_move_into_own_range_rejected(self):
+        """Test that pages cannot be moved after a page inside the range."""
+        response = self.client.post(
+            f"{self.pages_url}move/",
+            {
+                "first": self.pages[0].id,
+                "last": self.pages[2].id,
+                "after": self.pages[1].id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_repeated_moves_regap_when_full(self):
+        """Test that moves keep working once the gap between pages runs out."""
+        for _ in range(12):
+            response = self.client.post(
+                f"{self.pages_url}move/",
+                {"first": self.pages[4].id, "after": self.pages[0].id},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.post(
+                f"{self.pages_url}move/",
+                {"first": self.pages[3].id, "after": self.pages[0].id},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.list_contents(), ["1", "4", "5", "2", "3"])
+
+    def test_insert_page_after(self):
+        """Test creating a page right after another one."""
+        response = self.client.post(
+            self.pages_url,
+            {"content": "new", "after": self.pages[1].id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.list_contents(), ["1", "2", "new", "3", "4", "5"])
+
+    def test_compact_page_order(self):
+        """Test that compaction stores the page numbers shown in listings."""
+        self.client.post(
+            f"{self.pages_url}move/",
+            {"first": self.pages[4].id, "after": None},
+            format="json",
+        )
+        compact_page_order(self.book.id)
+
+        numbers = {
+            page.content: page.page_number
+            for page in DoccoonPage.objects.filter(book=self.book)
+        }
+        self.assertEqual(numbers, {"5": 1, "1": 2, "2": 3, "3": 4, "4": 5})
+
+    def test_moves_share_one_compaction(self):
+        """Test that a burst of moves schedules a single compaction."""
+        with mock.patch(
+            "doccoon.tasks.pages.compact_page_order_task.apply_async"
+        ) as task:
+            for page in self.pages[1:3]:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(
+                        f"{self.pages_url}move/",
+                        {"first": page.id, "after": None},
+                        format="json",
+                    )
+            task.assert_called_once()
+            run_scheduled_page_compaction(self.book.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    f"{self.pages_url}move/",
+                    {"first": self.pages[4].id, "after": None},
+                    format="json",
+                )
+            self.assertEqual(task.call_count, 2)
+
+    def autosave(self, contents: list[str]):
+        """Bulk save every page numbered in the given order, as autosave does."""
+        pages = {page.content: page for page in self.pages}
+        return self.client.post(
+            f"{self.pages_url}bulk/",
+            {
+                "update": [
+                    {"id": pages[content].id, "content": content, "page_number": number}
+                    for number, content in enumerate(contents, start=1)
+                ]
+            },
+            format="json",
+        )
+
+    def test_autosave_in_order_writes_nothing(self):
+        """Test that numbers matching the current order leave pages untouched."""
+        self.client.post(
+            f"{self.pages_url}move/",
+            {"first": self.pages[4].id, "after": None},
+            format="json",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.autosave(["5", "1", "2", "3", "4"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(updates, [])
+
+    def test_autosave_reorder_moves_fewest_pages(self):
+        """Test that renumbering every page only repositions the moved one."""
+        positions = {page.id: page.position for page in self.pages}
+        response = self.autosave(["1", "4", "2", "3", "5"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.list_contents(), ["1", "4", "2", "3", "5"])
+
+        moved = [
+            page.content
+            for page in DoccoonPage.objects.filter(book=self.book)
+            if page.position != positions[page.id]
+        ]
+        self.assertEqual(moved, ["4"])
+
+
+class PageAllocationTests(TestCase):
+    """Tests for allocating page numbers and positions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.pages_url = f"/api/books/{self.book.id}/pages/"
+        self.page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content="1"
+        )
+
+    def test_counters_follow_pages_created_directly(self):
+        """Test that the book's counters cover pages created outside the API."""
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.last_page_number, 1)
+        self.assertEqual(self.book.last_page_position, self.page.position)
+
+    def test_allocate_page_slots(self):
+        """Test that allocations never hand out the same slot twice."""
+        first = allocate_page_slots(self.book.id, count=3)
+        second = allocate_page_slots(self.book.id)
+        self.assertEqual(first, (2, 2 * 1024))
+        self.assertEqual(second, (5, 5 * 1024))
+
+    def test_created_pages_get_distinct_positions(self):
+        """Test that pages created one after another never share a position."""
+        for content in ["2", "3", "4"]:
+            response = self.client.post(
+                self.pages_url, {"content": content}, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        pages = DoccoonPage.objects.filter(book=self.book).order_by("position")
+        self.assertEqual([p.page_number for p in pages], [1, 2, 3, 4])
+        self.assertEqual(len({p.position for p in pages}), 4)
+
+    def test_duplicate_active_position_rejected(self):
+        """Test that two active pages of a book cannot share a position."""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DoccoonPage.objects.create(
+                book=self.book, page_number=2, position=self.page.position
+            )
+
+        self.page.is_deleted = True
+        self.page.save()
+        DoccoonPage.objects.create(
+            book=self.book, page_number=1, position=self.page.position
+        )
+
+    def test_renumber_into_taken_slot(self):
+        """Test that a page renumbered onto another page's number takes its slot."""
+        page2 = DoccoonPage.objects.create(book=self.book, page_number=2, content="2")
+
+        response = self.client.put(
+            f"{self.pages_url}{page2.id}/", {"page_number": 1}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["page_number"], 1)
+
+        pages = get_pages_by_book(self.book.id)
+        self.assertEqual([p.content for p in pages], ["2", "1"])
+
+
+class BookStatsTests(TestCase):
+    """Tests for the page, image and size totals stored on books."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Test Book")
+        self.pages_url = f"/api/books/{self.book.id}/pages/"
+
+    def assertStats(self, page_count, image_count, book_size):
+        self.book.refresh_from_db()
+        self.assertEqual(
+            (self.book.page_count, self.book.image_count, self.book.book_size),
+            (page_count, image_count, book_size),
+        )
+
+    def test_stats_follow_page_changes(self):
+        """Test that creating, editing and deleting pages updates the totals."""
+        response = self.client.post(self.pages_url, {"content": "![a](x.png) é"})
+        page_id = response.json()["results"]["id"]
+        self.assertStats(1, 1, 14)
+
+        self.client.put(
+            f"{self.pages_url}{page_id}/", {"content": "![a](x.png) ![b](y.png)"}
+        )
+        self.assertStats(1, 2, 23)
+
+        page = DoccoonPage.objects.get(id=page_id)
+        self.client.patch(
+            f"{self.pages_url}{page_id}/",
+            {
+                "base_hash": page.content_hash,
+                "operations": [{"op": "delete", "offset": 11, "length": 12}],
+            },
+            format="json",
+        )
+        self.assertStats(1, 1, 11)
+
+        self.client.delete(f"{self.pages_url}{page_id}/")
+        self.assertStats(0, 0, 0)
+
+    def test_bulk_save_updates_stats(self):
+        """Test that bulk creates, updates and deletes update the totals."""
+        page1 = DoccoonPage.objects.create(book=self.book, page_number=1, content="A")
+        page2 = DoccoonPage.objects.create(
+            book=self.book, page_number=2, content="<img src=x>"
+        )
+        self.assertStats(2, 1, 12)
+
+        self.client.post(
+            f"{self.pages_url}bulk/",
+            {
+                "create": [{"content": "![c](c.png)"}],
+                "update": [{"id": page1.id, "content": "AAAA"}],
+                "delete": [page2.id, page2.id],
+            },
+            format="json",
+        )
+        self.assertStats(2, 1, 15)
+
+    def test_list_books_does_not_load_pages(self):
+        """Test that listing books reads the stored totals only."""
+        DoccoonPage.objects.create(book=self.book, page_number=1, content="![](a)")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/books/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any("doccoon_doccoonpage" in query["sql"] for query in queries)
+        )
+        book = response.json()["results"][0]
+        self.assertEqual(
+            (book["page_count"], book["image_count"], book["book_size"]), (1, 1, 6)
+        )
+
+    def test_reconcile_book_stats(self):
+        """Test that drifted totals are recomputed from the pages."""
+        DoccoonPage.objects.create(book=self.book, page_number=1, content="![](a)")
+        DoccoonPage.objects.filter(book=self.book).update(content="![](a) ![](b)")
+        doccoon.objects.filter(id=self.book.id).update(page_count=5)
+
+        self.assertEqual(recount_page_stats(), 1)
+        self.assertEqual(reconcile_book_stats(), 1)
+        self.assertStats(1, 2, 13)
+        self.assertEqual(reconcile_book_stats(), 0)
+
+
 class SoftDeleteTests(TestCase):
     """Tests to verify soft delete filtering works correctly."""
 
@@ -276,3 +1049,107 @@ class SoftDeleteTests(TestCase):
 
         response = self.client.get(f"/api/books/{book.id}/pages/{page.id}/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookCloneTests(TestCase):
+    """Tests for copying books on the server."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.book = create_book(self.user, title="Original")
+
+    def add_pages(self, count: int, start: int = 1) -> list[DoccoonPage]:
+        return [
+            DoccoonPage.objects.create(
+                book=self.book,
+                page_number=number,
+                content=f"![cover](cover.png) Page {number} about gardening",
+            )
+            for number in range(start, start + count)
+        ]
+
+    def clone(self, **data) -> doccoon:
+        response = self.client.post(f"/api/books/{self.book.id}/clone/", data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return doccoon.objects.get(id=response.json()["results"]["id"])
+
+    def contents(self, book: doccoon) -> list[str]:
+        pages = DoccoonPage.objects.filter(book=book, is_deleted=False)
+        return [page.content for page in pages.order_by("position")]
+
+    def test_clone_book(self):
+        """Test that a clone holds copies of the active pages, in order."""
+        pages = self.add_pages(3)
+        pages[2].position = 512
+        pages[2].save()
+        pages[1].is_deleted = True
+        pages[1].save()
+
+        clone = self.clone()
+        self.book.refresh_from_db()
+        self.assertEqual(clone.title, "Original (copy)")
+        self.assertEqual(clone.status, BOOK_STATUS.Draft)
+        self.assertEqual(self.contents(clone), self.contents(self.book))
+        self.assertEqual(len(self.contents(clone)), 2)
+        self.assertEqual(
+            (clone.page_count, clone.image_count, clone.book_size),
+            (2, 2, self.book.book_size),
+        )
+        self.assertEqual(reconcile_book_stats(clone.id), 0)
+
+        # Pages added to the clone go after the copied ones
+        response = self.client.post(f"/api/books/{clone.id}/pages/", {"content": "New"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.contents(clone)[-1], "New")
+        self.assertNotIn("New", self.contents(self.book))
+
+    def test_clone_is_searchable(self):
+        """Test that copied pages are in the search index."""
+        self.add_pages(2)
+        clone = self.clone(title="Copy")
+        self.assertEqual(clone.title, "Copy")
+        response = self.client.get("/api/search/", {"q": "gardening"})
+        books = {hit["book_id"] for hit in response.json()["results"]["pages"]}
+        self.assertEqual(books, {self.book.id, clone.id})
+
+    @override_settings(PAGE_BLOCK_THRESHOLD=4000, PAGE_BLOCK_SIZE=500)
+    def test_clone_chunked_pages(self):
+        """Test that the blocks of large pages are copied."""
+        content = "\n\n".join(f"Paragraph {number} " * 20 for number in range(40))
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=content
+        )
+        self.assertTrue(page.chunked)
+
+        clone = self.clone()
+        copy = DoccoonPage.objects.get(book=clone)
+        self.assertTrue(copy.chunked)
+        self.assertEqual(copy.content, content)
+        self.assertEqual(
+            PageBlock.objects.filter(page=copy).count(),
+            PageBlock.objects.filter(page=page).count(),
+        )
+
+    def test_clone_queries(self):
+        """Test that the queries made do not grow with the book."""
+        self.add_pages(3)
+        with CaptureQueriesContext(connection) as small:
+            self.clone()
+        self.add_pages(30, start=4)
+        with CaptureQueriesContext(connection) as large:
+            self.clone()
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_clone_other_users_book(self):
+        """Test that only the owner can clone a book."""
+        other = User.objects.create_user(
+            email="other@example.com", password="OtherPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.post(f"/api/books/{self.book.id}/clone/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
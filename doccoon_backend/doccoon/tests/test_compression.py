@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage
+from doccoon.models.user import User
+from doccoon.tests.test_books import create_book
+from doccoon.utils.compression import compress_text, decompress_text, is_compressed
+
+LONG_CONTENT = "<p>The quick brown fox jumps over the lazy dog.</p>" * 100
+
+
+def stored_content(page: DoccoonPage) -> bytes:
+    """Return the bytes stored for a page's content."""
+    return bytes(
+        DoccoonPage.objects.filter(id=page.id).values_list("content", flat=True)[0]
+    )
+
+
+class CompressionTests(TestCase):
+    """Tests for compressed page content and share snapshots."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.book = create_book(self.user)
+
+    def test_round_trip(self):
+        """Test that short text is stored plain and long text compressed."""
+        self.assertEqual(compress_text("short"), b"short")
+        stored = compress_text(LONG_CONTENT)
+        self.assertTrue(is_compressed(stored))
+        self.assertLess(len(stored), len(LONG_CONTENT) // 10)
+        self.assertEqual(decompress_text(stored), LONG_CONTENT)
+
+    @override_settings(CONTENT_COMPRESSION="none")
+    def test_compression_disabled(self):
+        """Test that no value is compressed when compression is off."""
+        self.assertEqual(compress_text(LONG_CONTENT), LONG_CONTENT.encode("utf-8"))
+
+    def test_page_content_stored_compressed(self):
+        """Test that page content is compressed in the database only."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=LONG_CONTENT
+        )
+        self.assertTrue(is_compressed(stored_content(page)))
+
+        page = DoccoonPage.objects.get(id=page.id)
+        self.assertIsInstance(page.__dict__["content"], bytes)
+        self.assertEqual(page.content, LONG_CONTENT)
+
+        response = self.client.get(f"/api/books/{self.book.id}/pages/{page.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["content"], LONG_CONTENT)
+
+    def test_unread_content_saved_as_stored(self):
+        """Test that saving a page without reading its content keeps it."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=LONG_CONTENT
+        )
+        stored = stored_content(page)
+
+        page = DoccoonPage.objects.get(id=page.id)
+        page.save()
+        self.assertEqual(stored_content(page), stored)
+        self.assertEqual(DoccoonPage.objects.get(id=page.id).content, LONG_CONTENT)
+
+    def test_compress_content_command(self):
+        """Test that uncompressed rows are compressed in place."""
+        with override_settings(CONTENT_COMPRESSION="none"):
+            page = DoccoonPage.objects.create(
+                book=self.book, page_number=1, content=LONG_CONTENT
+            )
+        self.assertFalse(is_compressed(stored_content(page)))
+
+        call_command("compress_content", batch_size=1, stdout=StringIO())
+        self.assertTrue(is_compressed(stored_content(page)))
+        self.assertEqual(DoccoonPage.objects.get(id=page.id).content, LONG_CONTENT)
+
+    def test_search_compressed_content(self):
+        """Test that compressed pages are still searchable."""
+        page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=LONG_CONTENT + "<p>zebra</p>"
+        )
+        response = self.client.get("/api/search/", {"q": "zebra"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pages = response.json()["results"]["pages"]
+        self.assertEqual([hit["id"] for hit in pages], [page.id])
+        self.assertIn("<mark>zebra</mark>", pages[0]["snippet"])
@@ -0,0 +1,184 @@
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage
+from doccoon.models.export import EXPORT_STATUS, BookExport
+from doccoon.models.user import User
+from doccoon.services.export import get_export_storage
+from doccoon.tests.test_books import create_book
+from doccoon.utils.export import PAGE_SEPARATOR
+from doccoon.utils.ranges import parse_byte_range
+
+
+class BookExportTests(TestCase):
+    """Tests for streamed book exports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.user.first_name, self.user.last_name = "ada", "lovelace"
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, title="Notes & Things")
+        self.pages = [
+            DoccoonPage.objects.create(
+                book=self.book,
+                page_number=number,
+                position=number * 1024,
+                content=f"# Chapter {number}\n\nLine one<br>\nLine two",
+            )
+            for number in (1, 2, 3)
+        ]
+        DoccoonPage.objects.create(
+            book=self.book, page_number=4, content="Deleted", is_deleted=True
+        )
+        self.url = f"/api/books/{self.book.id}/export/"
+
+    def export(self, export_format: str) -> bytes:
+        response = self.client.get(self.url, {"type": export_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_markdown_export(self):
+        """Test that a Markdown export holds the active pages in order."""
+        self.pages[0].position = 5000
+        self.pages[0].save()
+
+        content = self.export("markdown").decode("utf-8")
+        front_matter, body = content.split("---\n\n", 1)
+        self.assertIn('title: "Notes & Things"', front_matter)
+        pages = body.split(PAGE_SEPARATOR)
+        self.assertEqual(
+            pages, [self.pages[1].content, self.pages[2].content, self.pages[0].content]
+        )
+
+    def test_html_export(self):
+        """Test that an HTML export is a zip of linked pages."""
+        archive = zipfile.ZipFile(io.BytesIO(self.export("html")))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [
+                "index.html",
+                "pages/page-0001.html",
+                "pages/page-0002.html",
+                "pages/page-0003.html",
+                "style.css",
+            ],
+        )
+        index = archive.read("index.html").decode("utf-8")
+        self.assertIn("<h1>Notes &amp; Things</h1>", index)
+        self.assertIn('<a href="pages/page-0002.html">Chapter 2</a>', index)
+        last = archive.read("pages/page-0003.html").decode("utf-8")
+        self.assertIn("Previous", last)
+        self.assertNotIn("Next", last)
+
+    def test_epub_export(self):
+        """Test that an EPUB export is a well-formed package."""
+        archive = zipfile.ZipFile(io.BytesIO(self.export("epub")))
+        first = archive.infolist()[0]
+        self.assertEqual(first.filename, "mimetype")
+        self.assertEqual(first.compress_type, zipfile.ZIP_STORED)
+
+        package = ElementTree.fromstring(archive.read("OEBPS/content.opf"))
+        namespace = {"opf": "http://www.idpf.org/2007/opf"}
+        spine = package.findall("opf:spine/opf:itemref", namespace)
+        self.assertEqual(len(spine), 3)
+        self.assertIn(b"Ada Lovelace", archive.read("OEBPS/content.opf"))
+        for name in archive.namelist():
+            if name.endswith(".xhtml"):
+                ElementTree.fromstring(archive.read(name))
+
+    def test_invalid_format(self):
+        """Test that unknown formats are rejected."""
+        response = self.client.get(self.url, {"type": "pdf"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookExportFileTests(TestCase):
+    """Tests for export files built in the background."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.book = create_book(self.user)
+        for number in range(1, 4):
+            DoccoonPage.objects.create(
+                book=self.book, page_number=number, content=f"Page {number}"
+            )
+
+    def build(self) -> str:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/books/{self.book.id}/exports/", {"format": "markdown"}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        url = f"/api/books/{self.book.id}/exports/{response.json()['results']['id']}/"
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"]["status"], EXPORT_STATUS.Done)
+        return f"{url}download/"
+
+    def test_download(self):
+        """Test that a built export can be downloaded whole."""
+        response = self.client.get(self.build())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        content = b"".join(response.streaming_content)
+        self.assertTrue(content.endswith(b"Page 3"))
+
+    def test_resume_download(self):
+        """Test that downloads resume from a byte range."""
+        url = self.build()
+        whole = b"".join(self.client.get(url).streaming_content)
+
+        response = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(whole)}")
+        self.assertEqual(b"".join(response.streaming_content), whole[10:20])
+
+        response = self.client.get(url, HTTP_RANGE="bytes=-6")
+        self.assertEqual(b"".join(response.streaming_content), b"Page 3")
+
+        response = self.client.get(url, HTTP_RANGE=f"bytes={len(whole)}-")
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+        # A range of another version of the file gets the whole file
+        response = self.client.get(url, HTTP_RANGE="bytes=10-", HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_file_fails_export(self):
+        """Test that an export whose file is not in storage is marked failed."""
+        url = self.build()
+        export = BookExport.objects.get(book=self.book)
+        get_export_storage().delete(export.file_name)
+
+        with self.assertLogs("doccoon.services.export", "ERROR"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url.removesuffix("download/"))
+        self.assertEqual(response.json()["results"]["status"], EXPORT_STATUS.Failed)
+
+    def test_parse_byte_range(self):
+        """Test that single byte ranges are parsed within the content."""
+        self.assertEqual(parse_byte_range("bytes=0-99", 50), (0, 49))
+        self.assertEqual(parse_byte_range("bytes=10-", 50), (10, 49))
+        self.assertEqual(parse_byte_range("bytes=-100", 50), (0, 49))
+        self.assertIsNone(parse_byte_range("bytes=0-1,5-6", 50))
+        self.assertIsNone(parse_byte_range("", 50))
+        with self.assertRaises(ValueError):
+            parse_byte_range("bytes=50-", 50)
@@ -0,0 +1,199 @@
+import io
+import tarfile
+import zipfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.book_import import IMPORT_STATUS, BookImport
+from doccoon.models.user import User
+from doccoon.services.book_import import get_import_storage
+from doccoon.tests.test_books import create_book
+from doccoon.utils.export import PAGE_SEPARATOR, parse_front_matter
+
+
+def zip_upload(name: str, files: dict) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for file_name, content in files.items():
+            archive.writestr(file_name, content)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def tar_upload(name: str, files: dict) -> SimpleUploadedFile:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for file_name, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(file_name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class BookImportTests(TestCase):
+    """Tests for importing Markdown uploads as pages."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, upload, url="/api/books/imports/", **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {"file": upload, **data}, format="multipart"
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(
+            f"/api/books/imports/{response.json()['results']['id']}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["results"]
+
+    def contents(self, book_id: int) -> list[str]:
+        pages = DoccoonPage.objects.filter(book_id=book_id, is_deleted=False)
+        return [page.content for page in pages.order_by("position")]
+
+    def test_import_zip(self):
+        """Test that a zip becomes a new book with pages in name order."""
+        upload = zip_upload(
+            "My Notes.zip",
+            {
+                "notes/chapter-10.md": "Ten",
+                "notes/chapter-2.md": f"Two{PAGE_SEPARATOR}Two, continued",
+                "notes/chapter-1.markdown": "One <script>alert(1)</script>",
+                "notes/cover.png": b"\x89PNG",
+                "__MACOSX/notes/._chapter-1.md": "Resource fork",
+            },
+        )
+        result = self.upload(upload)
+        self.assertEqual(result["status"], IMPORT_STATUS.Done)
+        self.assertEqual(result["file_count"], 3)
+        self.assertEqual(result["page_count"], 4)
+        self.assertEqual(result["progress"], 100)
+
+        book = doccoon.objects.get(id=result["book"])
+        self.assertEqual(book.title, "My Notes")
+        self.assertEqual(book.author, self.user)
+        self.assertEqual(book.page_count, 4)
+        contents = self.contents(book.id)
+        self.assertEqual(contents[1:], ["Two", "Two, continued", "Ten"])
+        self.assertTrue(contents[0].startswith("One"))
+        self.assertNotIn("<script>", contents[0])
+        self.assertEqual(get_import_storage().listdir("")[1], [])
+
+    def test_import_tar_into_book(self):
+        """Test that a tar's pages are added after a book's own pages."""
+        book = create_book(self.user)
+        DoccoonPage.objects.create(book=book, page_number=1, content="Existing")
+        upload = tar_upload("pages.tar.gz", {"b.md": "B", "a.md": "A"})
+
+        result = self.upload(upload, url=f"/api/books/{book.id}/imports/")
+        self.assertEqual(result["status"], IMPORT_STATUS.Done)
+        self.assertEqual(result["book"], book.id)
+        self.assertEqual(self.contents(book.id), ["Existing", "A", "B"])
+        book.refresh_from_db()
+        self.assertEqual(book.page_count, 3)
+
+    def test_import_export(self):
+        """Test that a Markdown export imports as a copy of the book."""
+        book = create_book(self.user, title="Round Trip", year=2001)
+        for number in (1, 2, 3):
+            DoccoonPage.objects.create(
+                book=book, page_number=number, content=f"# Page {number}\n\nText"
+            )
+        response = self.client.get(f"/api/books/{book.id}/export/")
+        exported = b"".join(response.streaming_content)
+
+        result = self.upload(SimpleUploadedFile("round-trip.md", exported))
+        copy = doccoon.objects.get(id=result["book"])
+        self.assertEqual(
+            (copy.title, copy.description, copy.year),
+            ("Round Trip", book.description, 2001),
+        )
+        self.assertEqual(self.contents(copy.id), self.contents(book.id))
+
+    def test_import_in_batches(self):
+        """Test that pages are inserted a batch at a time."""
+        files = {f"page-{number}.md": f"Page {number}" for number in range(450)}
+        with (
+            mock.patch("doccoon.services.book_import.IMPORT_BATCH_SIZE", 200),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            result = self.upload(zip_upload("pages.zip", files))
+        self.assertEqual(result["page_count"], 450)
+        inserts = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "doccoon_doccoonpage"')
+        ]
+        self.assertEqual(len(inserts), 3)
+
+    def test_failed_import(self):
+        """Test that a failed import leaves the book as it was."""
+        book = create_book(self.user)
+        files = {f"page-{number}.md": f"Page {number}" for number in range(5)}
+        with (
+            mock.patch("doccoon.services.book_import.IMPORT_BATCH_SIZE", 2),
+            mock.patch("doccoon.services.book_import.IMPORT_MAX_PAGES", 4),
+        ):
+            result = self.upload(
+                zip_upload("pages.zip", files), url=f"/api/books/{book.id}/imports/"
+            )
+        self.assertEqual(result["status"], IMPORT_STATUS.Failed)
+        self.assertIn("4 pages", result["error"])
+        self.assertEqual(self.contents(book.id), [])
+        book.refresh_from_db()
+        self.assertEqual(book.page_count, 0)
+
+        result = self.upload(SimpleUploadedFile("notes.pdf", b"%PDF-1.4"))
+        self.assertEqual(result["status"], IMPORT_STATUS.Failed)
+        self.assertIsNone(result["book"])
+        self.assertEqual(doccoon.objects.count(), 1)
+
+    def test_upload_not_shared_with_worker(self):
+        """Test that an upload the worker cannot read fails the import."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                "/api/books/imports/",
+                {"file": SimpleUploadedFile("notes.md", b"Notes")},
+                format="multipart",
+            )
+        book_import = BookImport.objects.get(id=response.json()["results"]["id"])
+        get_import_storage().delete(book_import.upload_name)
+        for callback in callbacks:
+            callback()
+
+        book_import.refresh_from_db()
+        self.assertEqual(book_import.status, IMPORT_STATUS.Failed)
+        self.assertIn("not available to the import worker", book_import.error)
+        self.assertIsNone(book_import.book)
+
+    def test_import_of_other_user(self):
+        """Test that imports are only visible to who started them."""
+        result = self.upload(SimpleUploadedFile("notes.md", b"Notes"))
+        other = User.objects.create_user(
+            email="other@example.com", password="OtherPass123!"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/api/books/imports/{result['id']}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_parse_front_matter(self):
+        """Test that front matter is split off as fields."""
+        fields, body = parse_front_matter(
+            '---\ntitle: "A: B"\nyear: 2020\nauthor: Ada\n---\n\nBody\n'
+        )
+        self.assertEqual(fields, {"title": "A: B", "year": 2020, "author": "Ada"})
+        self.assertEqual(body, "Body\n")
+        self.assertEqual(parse_front_matter("No front matter"), ({}, "No front matter"))
@@ -0,0 +1,115 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage, doccoon
+from doccoon.models.notification import Notification
+from doccoon.models.user import User
+from doccoon.tests.test_books import create_book
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for cursor pagination of books, pages and notifications."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def walk(self, url: str, key: str = "id") -> list:
+        """Follow next links from ``url`` and collect ``key`` of every row."""
+        values = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertNotIn("count", data)
+            values += [row[key] for row in data["results"]]
+            url = data["next"]
+        return values
+
+    def test_books_are_paged_newest_first(self):
+        """Test that books sharing a timestamp are neither skipped nor repeated."""
+        books = [create_book(self.user, title=f"Book {i}") for i in range(25)]
+        # Ties on created_at are broken by id
+        doccoon.objects.filter(id__in=[b.id for b in books[5:15]]).update(
+            created_at=books[5].created_at
+        )
+        expected = list(
+            doccoon.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+        self.assertEqual(self.walk("/api/books/?page_size=4"), expected)
+
+    def test_previous_link_returns_previous_window(self):
+        """Test that the previous link pages back to the same rows."""
+        for i in range(7):
+            create_book(self.user, title=f"Book {i}")
+
+        first = self.client.get("/api/books/?page_size=3").json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+
+    def test_deep_pages_do_not_count_or_offset(self):
+        """Test that a later window is a single seek query without a count."""
+        for i in range(6):
+            create_book(self.user, title=f"Book {i}")
+        second = self.client.get("/api/books/?page_size=3").json()["next"]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(second)
+        sql = [query["sql"].upper() for query in queries]
+        self.assertFalse(any("COUNT(" in query for query in sql))
+        self.assertFalse(any("OFFSET" in query for query in sql))
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected."""
+        response = self.client.get("/api/books/?cursor=bm90IGEgY3Vyc29y")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pages_are_paged_and_numbered_in_order(self):
+        """Test that page windows follow the book order and keep numbering."""
+        book = create_book(self.user)
+        for number in range(1, 8):
+            DoccoonPage.objects.create(
+                book=book, page_number=number, content=f"Page {number}"
+            )
+
+        numbers = self.walk(f"/api/books/{book.id}/pages/?page_size=3", "page_number")
+        self.assertEqual(numbers, list(range(1, 8)))
+        contents = self.walk(f"/api/books/{book.id}/pages/?page_size=3", "content")
+        self.assertEqual(contents, [f"Page {number}" for number in range(1, 8)])
+
+    def test_page_numbers_ignore_stale_cursor(self):
+        """Test that a window is numbered from the book, not from its cursor."""
+        book = create_book(self.user)
+        pages = [
+            DoccoonPage.objects.create(book=book, page_number=number, content="x")
+            for number in range(1, 8)
+        ]
+        url = f"/api/books/{book.id}/pages/?page_size=3"
+        second = self.client.get(url).json()["next"]
+        DoccoonPage.objects.filter(id=pages[0].id).update(is_deleted=True)
+
+        results = self.client.get(second).json()["results"]
+        self.assertEqual([row["id"] for row in results], [p.id for p in pages[3:6]])
+        self.assertEqual([row["page_number"] for row in results], [3, 4, 5])
+
+    def test_notifications_are_paged(self):
+        """Test that notifications are paged newest first."""
+        notifications = [
+            Notification.objects.create(user=self.user, title=f"N{i}", message="m")
+            for i in range(12)
+        ]
+
+        self.assertEqual(
+            self.walk("/api/notifications/"),
+            [n.id for n in reversed(notifications)],
+        )
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage
+from doccoon.models.revision import PageRevision
+from doccoon.models.user import User
+from doccoon.services.revision import REVISION_CHECKPOINT_INTERVAL
+from doccoon.tests.test_books import create_book
+
+SECTIONS = [f"Section {number}\n" + "Some text here.\n" * 20 for number in range(8)]
+
+
+def version_content(version: int) -> str:
+    """Return page content that edits one section per version."""
+    sections = list(SECTIONS)
+    sections[version % len(sections)] += f"Edited in version {version}.\n"
+    return "".join(sections)
+
+
+@mock.patch("doccoon.services.revision.REVISION_COALESCE_WINDOW", timedelta(0))
+class PageRevisionTests(TestCase):
+    """Tests for the page revision history."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user)
+        self.page = DoccoonPage.objects.create(
+            book=self.book, page_number=1, content=version_content(1)
+        )
+        self.page_url = f"/api/books/{self.book.id}/pages/{self.page.id}/"
+
+    def edit(self, versions: int) -> None:
+        """Save new content until the page reaches ``versions``."""
+        for version in range(2, versions + 1):
+            response = self.client.put(
+                self.page_url, {"content": version_content(version)}
+            )
+            self.assertEqual(response.json()["results"]["version"], version)
+
+    def get_revision(self, version: int) -> dict:
+        response = self.client.get(f"{self.page_url}revisions/{version}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["results"]
+
+    def test_list_revisions(self):
+        """Test that superseded versions are listed newest first."""
+        self.edit(4)
+        response = self.client.get(f"{self.page_url}revisions/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        versions = [item["version"] for item in response.json()["results"]]
+        self.assertEqual(versions, [3, 2, 1])
+
+    def test_revisions_are_rebuilt(self):
+        """Test that every version is rebuilt from checkpoints and deltas."""
+        versions = REVISION_CHECKPOINT_INTERVAL * 2 + 5
+        self.edit(versions)
+
+        revisions = PageRevision.objects.filter(page=self.page)
+        self.assertEqual(revisions.count(), versions - 1)
+        self.assertEqual(revisions.filter(is_checkpoint=True).count(), 2)
+        self.assertTrue(
+            all(
+                revision.chain_length <= REVISION_CHECKPOINT_INTERVAL
+                for revision in revisions
+            )
+        )
+        for version in range(1, versions):
+            self.assertEqual(
+                self.get_revision(version)["content"], version_content(version)
+            )
+
+        # Deltas take a small share of the space full copies would
+        stored = sum(
+            len(revision.content) + len(str(revision.delta or ""))
+            for revision in revisions
+        )
+        self.assertLess(stored, len(version_content(1)) * (versions - 1) / 4)
+
+    def test_autosaves_are_coalesced(self):
+        """Test that a burst of edits keeps its first and latest versions."""
+        with mock.patch(
+            "doccoon.services.revision.REVISION_COALESCE_WINDOW", timedelta(hours=1)
+        ):
+            self.edit(5)
+
+        versions = PageRevision.objects.filter(page=self.page).values_list(
+            "version", flat=True
+        )
+        self.assertEqual(list(versions), [4, 1])
+        self.assertEqual(self.get_revision(1)["content"], version_content(1))
+        self.assertEqual(self.get_revision(4)["content"], version_content(4))
+
+        # The latest superseded version is still a merge base
+        response = self.client.put(
+            self.page_url,
+            {"content": version_content(4) + "Tail\n"},
+            HTTP_IF_MATCH='"4"',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"]["content"], version_content(5) + "Tail\n"
+        )
+
+    def test_restore_revision(self):
+        """Test that restoring a version records the replaced content."""
+        self.edit(3)
+        response = self.client.post(f"{self.page_url}revisions/1/restore/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(results["content"], version_content(1))
+        self.assertEqual(results["version"], 4)
+        self.assertEqual(self.get_revision(3)["content"], version_content(3))
+
+    def test_revision_not_found(self):
+        """Test that unrecorded versions return 404."""
+        self.edit(2)
+        response = self.client.get(f"{self.page_url}revisions/2/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(f"{self.page_url}revisions/9/restore/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
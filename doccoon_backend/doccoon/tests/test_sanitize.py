@@ -0,0 +1,271 @@
+import importlib.util
+import random
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from doccoon.utils import sanitize
+
+CORPUS_DIR = Path(__file__).parent / "fixtures" / "sanitize"
+
+# Corpus samples the engines recover from differently, both outputs are safe
+KNOWN_DIVERGENCES = {
+    # Backtick-quoted attribute values are only understood by old IE
+    """<IMG SRC=`javascript:alert("RSnake says, 'XSS'")`>""",
+    # Character references without semicolons in attribute values
+    "<IMG SRC=&#x6A&#x61&#x76&#x61&#x73&#x63&#x72&#x69&#x70&#x74&#x3A&#x61&#x6C"
+    "&#x65&#x72&#x74&#x28&#x27&#x58&#x53&#x53&#x27&#x29>",
+    '<a href="javascript&colon;alert(1)">colon entity</a>',
+    # A tag left open at the end of the content
+    "<iframe src=https://xss.example/scriptlet.html <",
+    # SVG and MathML content is dropped whole by ammonia
+    "<svg><script>alert(1)</script></svg>",
+    "<math><mtext><table><mglyph><style><img src=x onerror=alert(1)>",
+    # A literal <table> in a code span, whose rows are recovered differently
+    "notes.md",
+}
+
+
+def load_corpus() -> dict[str, str]:
+    samples = {
+        line: line
+        for line in (CORPUS_DIR / "xss_payloads.txt").read_text().splitlines()
+        if line
+    }
+    for path in sorted(CORPUS_DIR.glob("*.md")):
+        samples[path.name] = path.read_text()
+    return samples
+
+
+class HTMLEvents(HTMLParser):
+    """Parses HTML into tags and text with character references resolved."""
+
+    def __init__(self, content: str):
+        super().__init__()
+        self.events = []
+        self.feed(content)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        self.events.append(("start", tag, tuple(sorted(attrs))))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.events.append(("end", tag))
+
+    def handle_data(self, data):
+        if self.events and self.events[-1][0] == "data":
+            data = self.events.pop()[1] + data
+        # Markdown treats any run of blank lines as one paragraph break
+        self.events.append(("data", re.sub(r"\n\s*\n\s*", "\n\n", data)))
+
+
+def make_markdown(paragraphs: int) -> str:
+    return "\n\n".join(
+        f"Paragraph {i} with <b>bold</b>, <script>alert({i})</script> and "
+        f'<a href="javascript:alert({i})" onclick="x()">a link</a>. ' * 4
+        for i in range(paragraphs)
+    )
+
+
+def make_tagged_markdown(seed: int) -> str:
+    """Long markdown with paragraphs broken by allowed, stripped and unclosed
+    tags in random places."""
+    rng = random.Random(seed)
+    tags = ["b", "p", "div", "li", "table", "br", "form", "section", "foo", "xmp"]
+    pieces = []
+    for _ in range(rng.randint(10, 40)):
+        if rng.random() < 0.5:
+            pieces.append("word " * rng.randint(50, 600))
+        else:
+            tag = rng.choice(tags)
+            pieces.append(
+                rng.choice([f"<{tag}>", f"</{tag}>", f"<{tag}>x</{tag}>", "<!-- c -->"])
+            )
+        pieces.append(rng.choice(["", "\n\n"]))
+    return "".join(pieces)
+
+
+class BlockSanitizeTests(TestCase):
+    """Tests for block-level memoized markdown sanitization."""
+
+    def setUp(self):
+        cache.clear()
+        sanitize.block_cache.clear()
+
+    def test_blocks_join_back_to_content(self):
+        """Test that splitting into blocks loses nothing."""
+        content = make_markdown(100)
+        blocks = sanitize.split_markdown_blocks(content)
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual("".join(blocks), content)
+
+    def test_matches_full_sanitization(self):
+        """Test that block output equals sanitizing the whole content."""
+        content = make_markdown(100)
+        self.assertEqual(
+            sanitize.sanitize_markdown(content), sanitize._clean_markdown(content)
+        )
+
+    def test_stripped_block_tag_matches_full_sanitization(self):
+        """Test that a stripped block-level tag after a block boundary is
+        replaced as it is when sanitizing the whole content."""
+        content = "<form>\n\n" + ("word " * 500 + "\n\n") * 6 + "\n\n<form>x"
+        self.assertGreater(len(content), sanitize.SANITIZE_CACHE_MIN_SIZE)
+        self.assertEqual(
+            sanitize.sanitize_markdown(content), sanitize._clean_markdown(content)
+        )
+
+    def test_random_tags_match_full_sanitization(self):
+        """Test block output against whole-content sanitization on random tags."""
+        for seed in range(100):
+            content = make_tagged_markdown(seed)
+            with self.subTest(seed=seed):
+                self.assertEqual(
+                    sanitize.sanitize_markdown(content),
+                    sanitize._clean_markdown(content),
+                )
+
+    def test_no_split_inside_elements(self):
+        """Test that blocks never end inside an element or after misnesting."""
+        inner = "\n\n".join(["text " * 500] * 4)
+        blocks = sanitize.split_markdown_blocks(f"<div>{inner}</div>")
+        self.assertEqual(len(blocks), 1)
+
+        content = f"<b><i>x</b></i>\n\n{inner}"
+        self.assertEqual(sanitize.split_markdown_blocks(content), [content])
+
+    def test_only_changed_blocks_are_sanitized(self):
+        """Test that a save re-sanitizes only the blocks that changed."""
+        content = make_markdown(100)
+        sanitize.sanitize_markdown(content)
+        edited = content.replace("Paragraph 50 ", "Paragraph fifty ", 1)
+
+        with patch.object(
+            sanitize, "_clean_markdown", wraps=sanitize._clean_markdown
+        ) as clean:
+            result = sanitize.sanitize_markdown(edited)
+        self.assertEqual(clean.call_count, 1)
+        self.assertEqual(result, sanitize._clean_markdown(edited))
+
+    def test_shared_cache_is_used(self):
+        """Test that blocks sanitized by another process are reused."""
+        content = make_markdown(100)
+        sanitize.sanitize_markdown(content)
+        sanitize.block_cache.clear()
+
+        with patch.object(sanitize, "_clean_markdown") as clean:
+            sanitize.sanitize_markdown(content)
+        clean.assert_not_called()
+
+    def test_local_cache_is_bounded(self):
+        """Test that the in-process cache evicts the least recently used blocks."""
+        blocks = sanitize.BlockCache(max_size=200)
+        blocks.set("a", "x" * 90)
+        blocks.set("b", "x" * 90)
+        blocks.get("a")
+        blocks.set("c", "x" * 90)
+        self.assertIsNone(blocks.get("b"))
+        self.assertIsNotNone(blocks.get("a"))
+        self.assertLessEqual(blocks.size, 200)
+
+
+class SanitizerEngineTests(TestCase):
+    """Tests for the pluggable sanitizer engines."""
+
+    def clean(self, engine, content):
+        return engine.clean(
+            content,
+            sanitize.ALLOWED_TAGS,
+            sanitize.ALLOWED_ATTRIBUTES,
+            sanitize.ALLOWED_PROTOCOLS,
+        )
+
+    def assert_safe(self, content):
+        for event in HTMLEvents(content).events:
+            if event[0] != "start":
+                continue
+            _, tag, attrs = event
+            self.assertIn(tag, sanitize.ALLOWED_TAGS)
+            allowed = sanitize.ALLOWED_ATTRIBUTES[
+                "*"
+            ] + sanitize.ALLOWED_ATTRIBUTES.get(tag, [])
+            for name, value in attrs:
+                self.assertIn(name, allowed)
+                # Browsers drop tabs and newlines from URLs before parsing them
+                url = re.sub(r"[\t\n\r]", "", value or "").strip()
+                scheme = re.match(r"([a-zA-Z][a-zA-Z0-9+.-]*):", url)
+                if name in ("href", "src") and scheme:
+                    self.assertIn(scheme[1].lower(), sanitize.ALLOWED_PROTOCOLS)
+
+    def test_engine_selected_in_settings(self):
+        """Test that SANITIZER_BACKEND picks the engine."""
+        with override_settings(
+            SANITIZER_BACKEND="doccoon.tests.test_sanitize.UpperSanitizer"
+        ):
+            self.assertEqual(sanitize.sanitize_markdown("<b>x</b>"), "<B>X</B>")
+            self.assertEqual(sanitize.sanitize_plain_text("text"), "TEXT")
+
+    def test_text_without_tags_skips_the_parser(self):
+        """Test that content without a "<" is only escaped."""
+        engine = sanitize.BleachSanitizer()
+        content = "Tom &amp; Jerry & friends > 3 &copy; &unknown;\r\n"
+        with patch.object(engine, "clean_html") as clean_html:
+            result = self.clean(engine, content)
+        clean_html.assert_not_called()
+        self.assertEqual(result, engine.clean_html(content, [], {}, []))
+
+    def test_bleach_matches_plain_bleach(self):
+        """Test that the bleach engine keeps the behavior of bleach.clean."""
+        engine = sanitize.BleachSanitizer()
+        for name, content in load_corpus().items():
+            with self.subTest(sample=name):
+                expected = sanitize.bleach.clean(
+                    content,
+                    tags=sanitize.ALLOWED_TAGS,
+                    attributes=sanitize.ALLOWED_ATTRIBUTES,
+                    protocols=sanitize.ALLOWED_PROTOCOLS,
+                    strip=True,
+                )
+                self.assertEqual(self.clean(engine, content), expected)
+
+    @skipUnless(importlib.util.find_spec("nh3"), "nh3 is not installed")
+    def test_engines_agree_on_corpus(self):
+        """Test that every engine gives equivalent, safe output on the corpus."""
+        bleach_engine = sanitize.BleachSanitizer()
+        nh3_engine = sanitize.Nh3Sanitizer()
+        for name, content in load_corpus().items():
+            with self.subTest(sample=name):
+                expected = self.clean(bleach_engine, content)
+                result = self.clean(nh3_engine, content)
+                self.assert_safe(expected)
+                self.assert_safe(result)
+                if name not in KNOWN_DIVERGENCES:
+                    self.assertEqual(
+                        HTMLEvents(result).events, HTMLEvents(expected).events
+                    )
+
+    @skipUnless(importlib.util.find_spec("nh3"), "nh3 is not installed")
+    def test_nh3_text_fast_path(self):
+        """Test that the nh3 fast path escapes text the way ammonia does."""
+        engine = sanitize.Nh3Sanitizer()
+        content = "Tom &amp; Jerry & friends > 3 &copy; &#60; &nbsp;\x00\r\n"
+        self.assertEqual(
+            engine.clean_text(content),
+            engine.clean_html(content, sanitize.ALLOWED_TAGS, {}, []),
+        )
+
+
+class UpperSanitizer(sanitize.SanitizerBackend):
+    def clean_html(self, content, tags, attributes, protocols):
+        return content.upper()
+
+    def clean_text(self, content):
+        return content.upper()
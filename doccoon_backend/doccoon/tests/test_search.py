@@ -0,0 +1,152 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import BOOK_STATUS, DoccoonPage
+from doccoon.models.user import User
+from doccoon.tests.test_books import create_book
+
+
+class SearchTests(TestCase):
+    """Tests for full-text search over books and pages."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(
+            self.user, title="Gardening Notes", description="Growing tomatoes"
+        )
+        self.page = DoccoonPage.objects.create(
+            book=self.book,
+            page_number=1,
+            content="Water the <b>seedlings</b> every morning before running.",
+        )
+
+    def search(self, query: str) -> dict:
+        response = self.client.get("/api/search/", {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["results"]
+
+    def test_search_pages_with_stemming(self):
+        """Test that page hits match word forms and carry page numbers."""
+        results = self.search("seedling runs")
+        self.assertEqual(len(results["pages"]), 1)
+        hit = results["pages"][0]
+        self.assertEqual(hit["id"], self.page.id)
+        self.assertEqual(hit["book_title"], "Gardening Notes")
+        self.assertEqual(hit["page_number"], 1)
+        # Content is escaped, only the highlights are markup
+        self.assertIn("&lt;b&gt;<mark>seedlings</mark>&lt;/b&gt;", hit["snippet"])
+
+    def test_search_books(self):
+        """Test that book titles and descriptions are searched."""
+        results = self.search("tomato")
+        self.assertEqual([book["id"] for book in results["books"]], [self.book.id])
+        self.assertIn("<mark>tomatoes</mark>", results["books"][0]["snippet"])
+        self.assertEqual(results["pages"], [])
+
+    def test_index_follows_page_changes(self):
+        """Test that edited and deleted pages are reindexed on save."""
+        self.page.content = "Prune the roses"
+        self.page.save()
+        self.assertEqual(self.search("seedlings")["pages"], [])
+        self.assertEqual(len(self.search("roses")["pages"]), 1)
+
+        self.page.is_deleted = True
+        self.page.save()
+        self.assertEqual(self.search("roses")["pages"], [])
+
+    def test_search_is_limited_to_own_active_books(self):
+        """Test that other users' and deleted books are not searched."""
+        other = User.objects.create_user(
+            email="other@example.com", password="TestPass123!"
+        )
+        book = create_book(other, title="Tomato Pests")
+        DoccoonPage.objects.create(book=book, page_number=1, content="seedlings")
+        create_book(self.user, title="Tomato Sauce", status=BOOK_STATUS.Deleted)
+
+        books = self.search("tomato")["books"]
+        self.assertEqual([book["id"] for book in books], [self.book.id])
+        pages = self.search("seedlings")["pages"]
+        self.assertEqual([page["id"] for page in pages], [self.page.id])
+
+    def test_query_syntax_is_literal(self):
+        """Test that search operators in the query cannot break the search."""
+        self.assertEqual(len(self.search('seedlings" OR (NEAR')["pages"]), 0)
+        self.assertEqual(self.search("*")["pages"], [])
+
+    def test_query_is_required(self):
+        response = self.client.get("/api/search/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteTests(TestCase):
+    """Tests for fuzzy book title autocomplete."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.books = {
+            title: create_book(self.user, title=title)
+            for title in [
+                "Gardening Notes",
+                "Garden Design",
+                "Rust in Action",
+                "Travel Journal",
+            ]
+        }
+
+    def suggest(self, query: str) -> list[str]:
+        response = self.client.get("/api/books/autocomplete/", {"q": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["title"] for book in response.json()["results"]]
+
+    def test_prefix_and_typo(self):
+        """Test that unfinished and misspelt words still match."""
+        self.assertEqual(self.suggest("garden"), ["Garden Design", "Gardening Notes"])
+        self.assertEqual(self.suggest("jurnal")[0], "Travel Journal")
+        self.assertEqual(self.suggest("xyz"), [])
+
+    def test_index_follows_title_changes(self):
+        """Test that renamed, new and deleted books are picked up."""
+        self.assertEqual(self.suggest("rust"), ["Rust in Action"])
+
+        book = self.books["Rust in Action"]
+        book.title = "Python in Action"
+        book.save()
+        create_book(self.user, title="Rusty Tools")
+        self.assertEqual(self.suggest("rust"), ["Rusty Tools"])
+
+        book.status = BOOK_STATUS.Deleted
+        book.save()
+        self.assertEqual(self.suggest("python"), [])
+
+    def test_does_not_load_pages(self):
+        """Test that suggestions never read page content."""
+        DoccoonPage.objects.create(
+            book=self.books["Travel Journal"], page_number=1, content="Day one"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.suggest("travel")
+        self.assertFalse(
+            any("doccoon_doccoonpage" in query["sql"] for query in queries)
+        )
+
+    def test_other_users_books_are_not_suggested(self):
+        other = User.objects.create_user(
+            email="other@example.com", password="TestPass123!"
+        )
+        create_book(other, title="Gardening Secrets")
+        self.assertNotIn("Gardening Secrets", self.suggest("gardening"))
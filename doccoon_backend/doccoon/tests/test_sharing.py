@@ -0,0 +1,333 @@
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import BOOK_STATUS, DoccoonPage
+from doccoon.models.content import ContentObject
+from doccoon.models.sharing import SharedBook
+from doccoon.models.user import User
+from doccoon.services import sharing
+from doccoon.services.sharing import (
+    collect_orphaned_content,
+    get_public_share_payload,
+    get_shared_page_by_token,
+    invalidate_public_share,
+)
+from doccoon.tests.test_books import create_book
+from doccoon.utils.render import renderer_available
+
+
+class ShareTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.book = create_book(self.user, status=BOOK_STATUS.Published)
+        self.pages = [
+            DoccoonPage.objects.create(
+                book=self.book, page_number=number, content=f"Page {number}"
+            )
+            for number in (1, 2, 3)
+        ]
+
+    def share_book(self, book=None) -> str:
+        book = book or self.book
+        response = self.client.post(f"/api/books/{book.id}/share/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()["results"]["share_token"]
+
+
+class ShareSnapshotTests(ShareTestCase):
+    """Tests for content-addressed share snapshots."""
+
+    def test_public_book_share(self):
+        """Test that a shared book shows its pages as they were shared."""
+        token = self.share_book()
+        self.pages[0].content = "Edited after sharing"
+        self.pages[0].save()
+
+        response = self.client.get(f"/api/shared/book/{token}/pages/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pages = response.json()["results"]["pages"]
+        self.assertEqual(
+            pages,
+            [
+                {"page_number": 1, "content": "Page 1", "html": None},
+                {"page_number": 2, "content": "Page 2", "html": None},
+                {"page_number": 3, "content": "Page 3", "html": None},
+            ],
+        )
+
+    def test_public_book_manifest(self):
+        """Test that a shared book lists its pages without their content."""
+        self.pages[1].content = "# Chapter\n\nText\n\n## Section"
+        self.pages[1].save()
+        token = self.share_book()
+
+        response = self.client.get(f"/api/shared/book/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(results["page_count"], 3)
+        self.assertEqual(
+            results["pages"][1],
+            {
+                "page_number": 2,
+                "size": len(self.pages[1].content),
+                "headings": [
+                    {"level": 1, "text": "Chapter"},
+                    {"level": 2, "text": "Section"},
+                ],
+            },
+        )
+        self.assertEqual(results["pages"][0]["headings"], [])
+
+    def test_public_book_page_window(self):
+        """Test that windows of a shared book's pages can be fetched."""
+        token = self.share_book()
+        url = f"/api/shared/book/{token}/pages/"
+
+        response = self.client.get(url, {"start": 2, "end": 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["page_count"], 3)
+        self.assertEqual(
+            response.json()["results"]["pages"],
+            [
+                {"page_number": 2, "content": "Page 2", "html": None},
+                {"page_number": 3, "content": "Page 3", "html": None},
+            ],
+        )
+
+        response = self.client.get(url, {"start": 3, "end": 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {"start": 1, "end": 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get("/api/shared/book/not-a-token/pages/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reshare_stores_only_changed_pages(self):
+        """Test that content is stored once across shares and books."""
+        self.share_book()
+        self.assertEqual(ContentObject.objects.count(), 3)
+
+        self.share_book()
+        self.assertEqual(ContentObject.objects.count(), 3)
+
+        other = create_book(self.user, status=BOOK_STATUS.Published)
+        DoccoonPage.objects.create(book=other, page_number=1, content="Page 2")
+        self.share_book(other)
+        self.assertEqual(ContentObject.objects.count(), 3)
+
+        self.pages[1].content = "Page 2, second edition"
+        self.pages[1].save()
+        self.share_book()
+        self.assertEqual(ContentObject.objects.count(), 4)
+
+    def test_public_page_share(self):
+        """Test that a shared page shows its content as it was shared."""
+        page = self.pages[1]
+        response = self.client.post(f"/api/books/{self.book.id}/pages/{page.id}/share/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.json()["results"]["share_token"]
+        self.assertEqual(ContentObject.objects.count(), 1)
+
+        response = self.client.get(f"/api/shared/page/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"]["content"], "Page 2")
+        # The live page's content is not loaded
+        shared = get_shared_page_by_token(token)
+        self.assertIn("content", shared.page.get_deferred_fields())
+
+    def test_collect_orphaned_content(self):
+        """Test that only content no share refers to is collected."""
+        self.share_book()
+        self.pages[0].content = "Edited"
+        self.pages[0].save()
+        self.share_book()
+
+        self.assertEqual(collect_orphaned_content(), 0)
+        self.assertEqual(collect_orphaned_content(min_age=timedelta(0)), 1)
+        self.assertEqual(ContentObject.objects.count(), 3)
+
+    def test_content_reshared_during_collection_is_kept(self):
+        """Test that old content shared again after the scan is not deleted."""
+        self.share_book()
+        SharedBook.objects.all().delete()
+        created = timezone.now() - timedelta(hours=2)
+        ContentObject.objects.update(created_at=created, last_used_at=created)
+
+        tokens = []
+        batches = sharing._batches
+
+        def share_after_scan(items):
+            # The first batch of collection runs once references are scanned
+            if tokens:
+                return batches(items)
+            tokens.append(None)
+            tokens[0] = self.share_book()
+            return batches(items)
+
+        with mock.patch.object(sharing, "_batches", side_effect=share_after_scan):
+            self.assertEqual(collect_orphaned_content(), 0)
+        self.assertEqual(ContentObject.objects.count(), 3)
+
+        response = self.client.get(f"/api/shared/book/{tokens[0]}/pages/")
+        self.assertEqual(response.json()["results"]["pages"][0]["content"], "Page 1")
+
+    def test_missing_content_shows_empty_page(self):
+        """Test that a share whose content is gone still loads."""
+        token = self.share_book()
+        ContentObject.objects.filter(content="Page 2").delete()
+
+        with self.assertLogs("doccoon.services.sharing", "ERROR"):
+            response = self.client.get(f"/api/shared/book/{token}/pages/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pages = response.json()["results"]["pages"]
+        self.assertEqual([page["content"] for page in pages], ["Page 1", "", "Page 3"])
+
+
+class SharePayloadCacheTests(ShareTestCase):
+    """Tests for cached public share payloads."""
+
+    def tearDown(self):
+        cache.clear()
+
+    def reshare_book(self) -> str:
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.share_book()
+
+    def test_cached_share_served_without_queries(self):
+        """Test that a viewed share is served from the cache."""
+        token = self.share_book()
+        first = self.client.get(f"/api/shared/book/{token}/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/api/shared/book/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, first.content)
+        self.assertEqual(
+            response.json()["message"], "Shared book retrieved successfully."
+        )
+
+    def test_reshare_and_revoke_invalidate(self):
+        """Test that refreshing or revoking a share drops its cached payload."""
+        token = self.share_book()
+        self.client.get(f"/api/shared/book/{token}/")
+
+        self.pages[0].content = "# Edited"
+        self.pages[0].save()
+        self.assertEqual(self.reshare_book(), token)
+        response = self.client.get(f"/api/shared/book/{token}/")
+        self.assertEqual(
+            response.json()["results"]["pages"][0]["headings"],
+            [{"level": 1, "text": "Edited"}],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/books/{self.book.id}/share/")
+        response = self.client.get(f"/api/shared/book/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_share_revoke(self):
+        """Test that a revoked page share stops being served."""
+        url = f"/api/books/{self.book.id}/pages/{self.pages[0].id}/share/"
+        token = self.client.post(url).json()["results"]["share_token"]
+        response = self.client.get(f"/api/shared/page/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(url)
+        response = self.client.get(f"/api/shared/page/{token}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_token(self):
+        """Test that unknown and malformed tokens are not found."""
+        for token in ("00000000-0000-0000-0000-000000000000", "not-a-token"):
+            response = self.client.get(f"/api/shared/book/{token}/")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stale_payload_does_not_replace_invalidation(self):
+        """Test that a payload built before an invalidation is not cached."""
+        token = "6f1c1c2e-2b7a-4f4e-9a57-5d1b6a3b8f10"
+
+        def build_stale():
+            # The share changes while the old payload is being built
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidate_public_share("book", token)
+            return b'{"stale": true}'
+
+        payload = get_public_share_payload("book", token, build_stale)
+        self.assertEqual(payload, b'{"stale": true}')
+        payload = get_public_share_payload("book", token, lambda: b'{"fresh": true}')
+        self.assertEqual(payload, b'{"fresh": true}')
+
+    def test_stale_payload_after_invalidations(self):
+        """Test that a payload built across a second invalidation is not
+        served in place of the newer data."""
+        token = "6f1c1c2e-2b7a-4f4e-9a57-5d1b6a3b8f10"
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_public_share("book", token)
+
+        def build_stale():
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidate_public_share("book", token)
+            return b'{"stale": true}'
+
+        get_public_share_payload("book", token, build_stale)
+        payload = get_public_share_payload("book", token, lambda: b'{"fresh": true}')
+        self.assertEqual(payload, b'{"fresh": true}')
+        payload = get_public_share_payload("book", token, lambda: b'{"other": true}')
+        self.assertEqual(payload, b'{"fresh": true}')
+
+
+@skipUnless(renderer_available(), "the render packages are not installed")
+@override_settings(SHARE_RENDER_HTML=True)
+class ShareRenderTests(ShareTestCase):
+    """Tests for shares pre-rendered to HTML."""
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_shared_pages_rendered(self):
+        """Test that shared content is rendered once, in the background."""
+        self.pages[0].content = "# Title\n\n```python\nx = 1\n```\n<script>x</script>"
+        self.pages[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            token = self.share_book()
+
+        response = self.client.get(f"/api/shared/book/{token}/pages/")
+        pages = response.json()["results"]["pages"]
+        html = pages[0]["html"]
+        self.assertIn("<h1>Title</h1>", html)
+        self.assertIn('<code class="hljs language-python">', html)
+        self.assertIn('<span class="hljs-number">1</span>', html)
+        self.assertNotIn("<script>", html)
+        self.assertEqual(pages[1]["html"], "<p>Page 2</p>\n")
+
+        # Resharing renders only content that changed
+        self.pages[1].content = "Page 2, second edition"
+        self.pages[1].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.share_book()
+        self.assertEqual(ContentObject.objects.exclude(html=None).count(), 4)
+
+    def test_shared_page_rendered(self):
+        """Test that a page share is served with its HTML once rendered."""
+        url = f"/api/books/{self.book.id}/pages/{self.pages[0].id}/share/"
+        token = self.client.post(url).json()["results"]["share_token"]
+        response = self.client.get(f"/api/shared/page/{token}/")
+        self.assertIsNone(response.json()["results"]["html"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        response = self.client.get(f"/api/shared/page/{token}/")
+        self.assertEqual(response.json()["results"]["html"], "<p>Page 1</p>\n")
@@ -0,0 +1,111 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from doccoon.models.book import DoccoonPage, PageBlock, doccoon
+from doccoon.models.notification import NOTIFICATION_TYPE, Notification
+from doccoon.models.user import User
+from doccoon.serializers.book import (
+    BookListSerializer,
+    GetBookWithPagesSerializer,
+    serialize_book,
+)
+from doccoon.serializers.notification import NotificationSerializer
+from doccoon.serializers.page import PageDetailSerializer
+from doccoon.serializers.values import ValuesSerializer
+from doccoon.services.book import get_book_by_id
+from doccoon.services.page import get_pages_by_book, number_pages
+from doccoon.tests.test_books import create_book
+
+# Long enough to be stored compressed
+LONG_CONTENT = "".join(f"Line {number} of a long page.\n" for number in range(200))
+
+
+@override_settings(PAGE_BLOCK_THRESHOLD=4000, PAGE_BLOCK_SIZE=500)
+class ValuesSerializerTests(TestCase):
+    """Tests that the values() fast paths match the ModelSerializers."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com",
+            password="TestPass123!",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.book = create_book(self.user, description="")
+        for number, content in enumerate(
+            ["Short", LONG_CONTENT, LONG_CONTENT * 3, ""], 1
+        ):
+            DoccoonPage.objects.create(
+                book=self.book, page_number=number, content=content
+            )
+
+    def results(self, url: str) -> list[dict]:
+        results = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results += response.json()["results"]
+            url = response.json()["next"]
+        return results
+
+    def test_book_list(self):
+        """Test that the book list matches BookListSerializer."""
+        for number in range(12):
+            create_book(self.user, title=f"Book {number}", year=2000 + number)
+        books = doccoon.objects.filter(author=self.user).order_by("-created_at", "-id")
+        expected = BookListSerializer(books, many=True).data
+        self.assertEqual(self.results("/api/books/"), expected)
+
+    def test_book_detail(self):
+        """Test that book detail matches GetBookWithPagesSerializer, chunked
+        and compressed pages included."""
+        self.assertTrue(PageBlock.objects.exists())
+        book = get_book_by_id(self.book.id)
+        expected = GetBookWithPagesSerializer(book).data
+        self.assertEqual(serialize_book(self.book), expected)
+
+        response = self.client.get(f"/api/books/{self.book.id}/")
+        self.assertEqual(response.json()["results"], expected)
+
+    def test_page_list(self):
+        """Test that every window of the page list matches PageDetailSerializer."""
+        pages = number_pages(get_pages_by_book(self.book.id))
+        expected = PageDetailSerializer(pages, many=True).data
+        results = self.results(f"/api/books/{self.book.id}/pages/?page_size=3")
+        self.assertEqual(results, expected)
+        self.assertEqual(results[2]["content"], LONG_CONTENT * 3)
+
+    def test_notifications(self):
+        """Test that the notification list matches NotificationSerializer."""
+        page = DoccoonPage.objects.filter(book=self.book).first()
+        Notification.objects.create(
+            user=self.user,
+            notification_type=NOTIFICATION_TYPE.PageShared,
+            title="Shared",
+            message="A page was shared",
+            related_book=self.book,
+            related_page=page,
+        )
+        Notification.objects.create(
+            user=self.user, title="Hello", message="Welcome", is_read=True
+        )
+        notifications = Notification.objects.filter(user=self.user).order_by(
+            "-created_at", "-id"
+        )
+        expected = NotificationSerializer(notifications, many=True).data
+        self.assertEqual(self.results("/api/notifications/"), expected)
+
+    def test_unsupported_fields(self):
+        """Test that fields not read from a column are refused."""
+
+        class BookTitleSerializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = doccoon
+                fields = ["id", "upper"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(BookTitleSerializer).columns
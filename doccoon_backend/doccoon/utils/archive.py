@@ -0,0 +1,131 @@
+"""
+Reading Markdown files out of uploaded archives.
+
+Zip and tar archives, compressed or not, are read one member at a time in
+the natural order of their names, so ``chapter-2.md`` comes before
+``chapter-10.md``. Any other upload is taken as a single Markdown file.
+"""
+
+import re
+import tarfile
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown", ".txt")
+
+# Tar members are spooled to disk past this many bytes
+SPOOL_MEMORY_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """Raised when an upload cannot be read as Markdown."""
+
+
+class MarkdownFile(NamedTuple):
+    name: str
+    read: Callable[[], str]
+
+
+def natural_key(name: str) -> list:
+    return [
+        int(part) if part.isdigit() else part.lower()
+        for part in re.split(r"(\d+)", name)
+    ]
+
+
+def is_markdown_file(name: str) -> bool:
+    """Whether an archive member holds Markdown, skipping hidden files and
+    the resource forks macOS adds to zips."""
+    parts = name.split("/")
+    if any(part.startswith(".") or part == "__MACOSX" for part in parts):
+        return False
+    return name.lower().endswith(MARKDOWN_EXTENSIONS)
+
+
+def decode_markdown(data: bytes) -> str:
+    text = data.decode("utf-8-sig", errors="replace")
+    return text.replace("\r\n", "\n")
+
+
+def _zip_files(archive: zipfile.ZipFile, max_size: int) -> list[MarkdownFile]:
+    members = [
+        info
+        for info in archive.infolist()
+        if not info.is_dir() and is_markdown_file(info.filename)
+    ]
+    # Members never decompress past their declared size
+    if sum(info.file_size for info in members) > max_size:
+        raise ArchiveError("The archive holds too much content.")
+    members.sort(key=lambda info: natural_key(info.filename))
+    return [
+        MarkdownFile(
+            info.filename, lambda info=info: decode_markdown(archive.read(info))
+        )
+        for info in members
+    ]
+
+
+def _tar_files(archive: tarfile.TarFile, spool, max_size: int) -> list[MarkdownFile]:
+    """Copy the Markdown members of a tar streamed in archive order to a spool,
+    so they can be read back sorted without decompressing twice."""
+    members = []
+    total = 0
+    for info in archive:
+        if not info.isfile() or not is_markdown_file(info.name):
+            continue
+        total += info.size
+        if total > max_size:
+            raise ArchiveError("The archive holds too much content.")
+        offset = spool.tell()
+        spool.write(archive.extractfile(info).read())
+        members.append((info.name, offset, info.size))
+
+    def reader(offset: int, size: int) -> Callable[[], str]:
+        def read() -> str:
+            spool.seek(offset)
+            return decode_markdown(spool.read(size))
+
+        return read
+
+    members.sort(key=lambda member: natural_key(member[0]))
+    return [MarkdownFile(name, reader(offset, size)) for name, offset, size in members]
+
+
+@contextmanager
+def open_markdown_files(file, name: str, max_size: int) -> Iterator[list[MarkdownFile]]:
+    """
+    Open an upload as a list of Markdown files, each read when asked for.
+
+    Args:
+        file: The upload, opened in binary mode and seekable
+        name: The upload's file name, used for a single Markdown file
+        max_size: Most bytes of Markdown read out of an archive
+
+    Raises ArchiveError if the upload is neither an archive nor Markdown.
+    """
+    if zipfile.is_zipfile(file):
+        file.seek(0)
+        try:
+            with zipfile.ZipFile(file) as archive:
+                yield _zip_files(archive, max_size)
+        except zipfile.BadZipFile as error:
+            raise ArchiveError(f"The zip archive is damaged: {error}") from error
+        return
+
+    file.seek(0)
+    if tarfile.is_tarfile(file):
+        file.seek(0)
+        try:
+            with tarfile.open(fileobj=file, mode="r|*") as archive:
+                with tempfile.SpooledTemporaryFile(SPOOL_MEMORY_SIZE) as spool:
+                    yield _tar_files(archive, spool, max_size)
+        except tarfile.TarError as error:
+            raise ArchiveError(f"The tar archive is damaged: {error}") from error
+        return
+
+    if not is_markdown_file(name):
+        raise ArchiveError("Upload a zip or tar archive, or a Markdown file.")
+    file.seek(0)
+    yield [MarkdownFile(name, lambda: decode_markdown(file.read()))]
@@ -0,0 +1,34 @@
+import zlib
+
+_CHECKSUM_RANGE = 2**32
+
+
+def split_blocks(text: str, block_size: int) -> list[str]:
+    """Split text into ordered blocks of roughly ``block_size`` characters.
+
+    Past half a block, a block ends after a line whose checksum falls under
+    a bound growing with the line's length, so boundaries depend on the
+    lines themselves rather than on offsets, and an edit only changes the
+    blocks around it. Blocks are at most two blocks long, longer lines are
+    cut. Joining the blocks gives back the text.
+    """
+    min_size, max_size = block_size // 2, block_size * 2
+    # On average a boundary every half block past the minimum
+    bound = _CHECKSUM_RANGE // max(block_size - min_size, 1)
+    blocks = []
+    current = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        while size + len(line) > max_size:
+            cut = max_size - size
+            current.append(line[:cut])
+            blocks.append("".join(current))
+            current, size, line = [], 0, line[cut:]
+        current.append(line)
+        size += len(line)
+        if size >= min_size and zlib.crc32(line.encode("utf-8")) < bound * len(line):
+            blocks.append("".join(current))
+            current, size = [], 0
+    if current:
+        blocks.append("".join(current))
+    return blocks
@@ -0,0 +1,62 @@
+import zlib
+from typing import Union
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from compression import zstd
+except ImportError:  # Python < 3.14
+    zstd = None
+
+# Compressed values start with a byte that never begins UTF-8 text, followed
+# by the codec, so stored plain text needs no header at all
+_MARKER = 0xFF
+_ZLIB = 0x01
+_ZSTD = 0x02
+
+
+def get_codec() -> str:
+    """Return the codec new values are written with, from settings."""
+    codec = settings.CONTENT_COMPRESSION
+    if codec == "auto":
+        return "zstd" if zstd else "zlib"
+    if codec == "zstd" and zstd is None:
+        raise ImproperlyConfigured("zstd compression needs Python 3.14 or later.")
+    if codec not in ("zstd", "zlib", "none"):
+        raise ImproperlyConfigured(f"Unknown content compression {codec!r}.")
+    return codec
+
+
+def compress_text(text: str) -> bytes:
+    """Encode text for storage, compressed when it is large enough to pay off."""
+    data = text.encode("utf-8")
+    codec = get_codec()
+    if codec == "none" or len(data) < settings.CONTENT_COMPRESSION_THRESHOLD:
+        return data
+    if codec == "zstd":
+        compressed = bytes([_MARKER, _ZSTD]) + zstd.compress(data)
+    else:
+        compressed = bytes([_MARKER, _ZLIB]) + zlib.compress(data, 6)
+    # Incompressible content, like already compressed payloads, stays as is
+    return compressed if len(compressed) < len(data) else data
+
+
+def decompress_text(data: Union[bytes, memoryview, str, None]) -> str:
+    """Decode a value written by compress_text, or plain text stored before."""
+    if data is None or isinstance(data, str):
+        return data
+    data = bytes(data)
+    if not data or data[0] != _MARKER:
+        return data.decode("utf-8")
+    if data[1] == _ZSTD:
+        if zstd is None:
+            raise ImproperlyConfigured("zstd compression needs Python 3.14 or later.")
+        return zstd.decompress(data[2:]).decode("utf-8")
+    if data[1] == _ZLIB:
+        return zlib.decompress(data[2:]).decode("utf-8")
+    raise ValueError(f"Unknown compression codec {data[1]:#x}.")
+
+
+def is_compressed(data: Union[bytes, memoryview, str, None]) -> bool:
+    return isinstance(data, (bytes, memoryview)) and data[:1] == bytes([_MARKER])
@@ -0,0 +1,49 @@
+"""
+Line-based deltas between two versions of page content.
+
+A delta is a list of ``[start, end, text]`` edits, each replacing lines
+``start`` to ``end`` of the source with ``text``, in source order. Deltas
+are plain lists so they can be stored as JSON.
+"""
+
+from difflib import SequenceMatcher
+
+
+def make_delta(source: str, target: str) -> list[list]:
+    """Return the edits turning ``source`` into ``target``."""
+    source_lines = source.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+
+    # Edits are usually small, match the unchanged ends cheaply first
+    prefix = 0
+    limit = min(len(source_lines), len(target_lines))
+    while prefix < limit and source_lines[prefix] == target_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and source_lines[-1 - suffix] == target_lines[-1 - suffix]
+    ):
+        suffix += 1
+
+    source_middle = source_lines[prefix : len(source_lines) - suffix]
+    target_middle = target_lines[prefix : len(target_lines) - suffix]
+    matcher = SequenceMatcher(None, source_middle, target_middle, autojunk=False)
+    return [
+        [prefix + i1, prefix + i2, "".join(target_middle[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(source: str, delta: list[list]) -> str:
+    """Apply edits made by make_delta to ``source``."""
+    lines = source.splitlines(keepends=True)
+    result = []
+    position = 0
+    for start, end, text in delta:
+        result.extend(lines[position:start])
+        result.append(text)
+        position = end
+    result.extend(lines[position:])
+    return "".join(result)
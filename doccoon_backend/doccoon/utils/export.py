@@ -0,0 +1,345 @@
+"""
+Book export formats, written as a stream of byte chunks.
+
+Writers take the book and an iterable of ``(page_number, content)`` pairs
+and yield the export piece by piece, holding at most one page in memory.
+"""
+
+import html
+import io
+import json
+import zipfile
+from datetime import timezone
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, Optional
+
+from doccoon.utils.render import render_markdown, renderer_available
+from doccoon.utils.stats import page_headings
+
+# Ends each page but the last in Markdown exports, and splits pages again
+# on import
+PAGE_SEPARATOR = "\n\n<!-- page -->\n\n"
+
+Pages = Iterable[tuple[int, str]]
+
+
+def markdown_front_matter(book) -> str:
+    # JSON strings are valid YAML scalars
+    lines = [
+        "---",
+        f"title: {json.dumps(book.title)}",
+        f"description: {json.dumps(book.description)}",
+        f"year: {book.year}",
+        "---",
+    ]
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_front_matter(text: str) -> tuple[dict, str]:
+    """Split front matter like markdown_front_matter writes off Markdown,
+    returning its fields and the rest of the text."""
+    if not text.startswith("---\n"):
+        return {}, text
+    end = text.find("\n---\n", 3)
+    if end == -1:
+        return {}, text
+
+    fields = {}
+    for line in text[4:end].splitlines():
+        key, colon, value = line.partition(":")
+        if not colon:
+            continue
+        value = value.strip()
+        try:
+            value = json.loads(value)
+        except ValueError:
+            # A plain YAML scalar
+            pass
+        fields[key.strip()] = value
+    return fields, text[end + 5 :].removeprefix("\n")
+
+
+def write_markdown(book, pages: Pages) -> Iterator[bytes]:
+    """A single Markdown file, with the book's details as front matter."""
+    yield markdown_front_matter(book).encode("utf-8")
+    for index, (_, content) in enumerate(pages):
+        if index:
+            yield PAGE_SEPARATOR.encode("utf-8")
+        yield content.encode("utf-8")
+
+
+class _ZipSink(io.RawIOBase):
+    """Collects what a zip file writes until it is taken."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """A zip archive written entry by entry, each call returning the bytes
+    added to the archive. The sink is not seekable, so entry sizes follow
+    their data instead of preceding it."""
+
+    def __init__(self):
+        self._sink = _ZipSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", zipfile.ZIP_DEFLATED)
+
+    def write(self, name: str, data, compress: bool = True) -> bytes:
+        compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip.writestr(name, data, compress_type=compress_type)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.take()
+
+
+def page_html(content: str) -> str:
+    """Render a page for HTML exports, as preformatted text without the
+    render packages."""
+    if renderer_available():
+        return render_markdown(content)
+    return f"<pre>{html.escape(content)}</pre>"
+
+
+def page_title(number: int, content: str) -> str:
+    headings = page_headings(content)
+    return headings[0]["text"] if headings else f"Page {number}"
+
+
+def page_file_name(number: int, ext: str) -> str:
+    return f"pages/page-{number:04d}.{ext}"
+
+
+EXPORT_STYLE = """body { max-width: 46em; margin: 2em auto; padding: 0 1em;
+  font-family: Georgia, serif; line-height: 1.6; }
+pre { overflow-x: auto; padding: 1em; background: #f6f8fa; }
+code { font-family: monospace; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #ccc; padding: 0.3em 0.6em; }
+nav.pages { display: flex; justify-content: space-between; margin-top: 3em; }
+"""
+
+HTML_DOCUMENT = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{root}style.css">
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def _with_following(pages: Pages) -> Iterator[tuple[int, str, Optional[int]]]:
+    """Pair each page with the number of the page after it, None for the last."""
+    pending = None
+    for number, content in pages:
+        if pending is not None:
+            yield (*pending, number)
+        pending = (number, content)
+    if pending is not None:
+        yield (*pending, None)
+
+
+def write_html_bundle(book, pages: Pages) -> Iterator[bytes]:
+    """A zip of static HTML pages, with a table of contents in index.html."""
+    archive = ZipStream()
+    title = html.escape(book.title)
+    yield archive.write("style.css", EXPORT_STYLE)
+
+    contents = []
+    previous = None
+    for number, content, following in _with_following(pages):
+        contents.append((number, page_title(number, content)))
+        links = ['<a href="../index.html">Contents</a>']
+        if previous is not None:
+            links.insert(0, f'<a href="page-{previous:04d}.html">Previous</a>')
+        if following is not None:
+            links.append(f'<a href="page-{following:04d}.html">Next</a>')
+        body = f'{page_html(content)}\n<nav class="pages">{" ".join(links)}</nav>'
+        document = HTML_DOCUMENT.format(title=title, root="../", body=body)
+        yield archive.write(page_file_name(number, "html"), document)
+        previous = number
+
+    items = "\n".join(
+        f'<li><a href="{page_file_name(number, "html")}">'
+        f"{html.escape(label)}</a></li>"
+        for number, label in contents
+    )
+    body = (
+        f"<h1>{title}</h1>\n<p>{html.escape(book.description)}</p>\n"
+        f"<ol>\n{items}\n</ol>"
+    )
+    yield archive.write(
+        "index.html", HTML_DOCUMENT.format(title=title, root="", body=body)
+    )
+    yield archive.close()
+
+
+# Elements with no content, closed in place in XHTML
+VOID_ELEMENTS = {"br", "col", "hr", "img", "input", "wbr"}
+
+
+class _XhtmlWriter(HTMLParser):
+    """Re-serializes HTML as well-formed XHTML."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+
+    def _attributes(self, attrs) -> str:
+        return "".join(
+            f' {name}="{html.escape(name if value is None else value)}"'
+            for name, value in attrs
+        )
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            self.parts.append(f"<{tag}{self._attributes(attrs)}/>")
+        else:
+            self.parts.append(f"<{tag}{self._attributes(attrs)}>")
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.parts.append(f"<{tag}{self._attributes(attrs)}/>")
+
+    def handle_endtag(self, tag):
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.parts.append(html.escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        while self.open_tags:
+            self.parts.append(f"</{self.open_tags.pop()}>")
+        return "".join(self.parts)
+
+
+def to_xhtml(fragment: str) -> str:
+    writer = _XhtmlWriter()
+    writer.feed(fragment)
+    return writer.result()
+
+
+XHTML_DOCUMENT = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml"
+      xmlns:epub="http://www.idpf.org/2007/ops" lang="en">
+<head>
+<meta charset="utf-8"/>
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="{root}style.css"/>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+EPUB_CONTAINER = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+<rootfiles>
+<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+</rootfiles>
+</container>
+"""
+
+EPUB_PACKAGE = """<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0"
+         unique-identifier="book-id" xml:lang="en">
+<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:identifier id="book-id">{identifier}</dc:identifier>
+<dc:title>{title}</dc:title>
+<dc:creator>{author}</dc:creator>
+<dc:language>en</dc:language>
+<dc:description>{description}</dc:description>
+<meta property="dcterms:modified">{modified}</meta>
+</metadata>
+<manifest>
+<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+<item id="style" href="style.css" media-type="text/css"/>
+{items}
+</manifest>
+<spine>
+{spine}
+</spine>
+</package>
+"""
+
+
+def write_epub(book, pages: Pages) -> Iterator[bytes]:
+    """An EPUB 3 book with one chapter per page."""
+    archive = ZipStream()
+    # The mimetype comes first and uncompressed, so readers can sniff it
+    yield archive.write("mimetype", "application/epub+zip", compress=False)
+    yield archive.write("META-INF/container.xml", EPUB_CONTAINER)
+    yield archive.write("OEBPS/style.css", EXPORT_STYLE)
+
+    title = html.escape(book.title)
+    contents = []
+    for number, content in pages:
+        contents.append((number, page_title(number, content)))
+        body = to_xhtml(page_html(content))
+        document = XHTML_DOCUMENT.format(title=title, root="../", body=body)
+        yield archive.write(f"OEBPS/{page_file_name(number, 'xhtml')}", document)
+
+    items = "\n".join(
+        f'<li><a href="{page_file_name(number, "xhtml")}">'
+        f"{html.escape(label)}</a></li>"
+        for number, label in contents
+    )
+    nav = (
+        f'<nav epub:type="toc" id="toc">\n<h1>{title}</h1>\n'
+        f"<ol>\n{items}\n</ol>\n</nav>"
+    )
+    yield archive.write(
+        "OEBPS/nav.xhtml", XHTML_DOCUMENT.format(title=title, root="", body=nav)
+    )
+
+    manifest = "\n".join(
+        f'<item id="page-{number}" href="{page_file_name(number, "xhtml")}" '
+        'media-type="application/xhtml+xml"/>'
+        for number, _ in contents
+    )
+    spine = "\n".join(f'<itemref idref="page-{number}"/>' for number, _ in contents)
+    modified = book.modified_at.astimezone(timezone.utc)
+    package = EPUB_PACKAGE.format(
+        identifier=f"urn:doccoon:book:{book.id}",
+        title=title,
+        author=html.escape(book.author.full_name.strip()),
+        description=html.escape(book.description),
+        modified=modified.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        items=manifest,
+        spine=spine,
+    )
+    yield archive.write("OEBPS/content.opf", package)
+    yield archive.close()
@@ -0,0 +1,6 @@
+import hashlib
+
+
+def content_hash(content: str) -> str:
+    """Return the hex SHA-256 digest of a page's content."""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
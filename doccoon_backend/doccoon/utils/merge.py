@@ -0,0 +1,59 @@
+"""
+Line-based three-way merge for page content.
+"""
+
+from difflib import SequenceMatcher
+from typing import Optional
+
+
+def _changes(base: list[str], other: list[str]) -> list[tuple[int, int, list[str]]]:
+    """Return the (base_start, base_end, replacement) hunks turning base into other."""
+    matcher = SequenceMatcher(None, base, other, autojunk=False)
+    return [
+        (i1, i2, other[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _overlaps(a: tuple[int, int, list[str]], b: tuple[int, int, list[str]]) -> bool:
+    # Two insertions at the same point, or ranges sharing base lines
+    if a[0] == a[1] or b[0] == b[1]:
+        return a[0] <= b[1] and b[0] <= a[1]
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def three_way_merge(base: str, ours: str, theirs: str) -> Optional[str]:
+    """
+    Merge two edits of the same base text.
+
+    Returns the merged text, or None when both sides changed the same lines
+    in different ways.
+    """
+    if ours == theirs or theirs == base:
+        return ours
+    if ours == base:
+        return theirs
+
+    base_lines = base.splitlines(keepends=True)
+    ours_changes = _changes(base_lines, ours.splitlines(keepends=True))
+    theirs_changes = _changes(base_lines, theirs.splitlines(keepends=True))
+
+    hunks = []
+    for change in theirs_changes:
+        clashing = [c for c in ours_changes if _overlaps(c, change)]
+        if any(c != change for c in clashing):
+            return None
+        if not clashing:
+            hunks.append(change)
+    hunks.extend(ours_changes)
+    hunks.sort(key=lambda hunk: (hunk[0], hunk[1]))
+
+    merged = []
+    position = 0
+    for start, end, replacement in hunks:
+        merged.extend(base_lines[position:start])
+        merged.extend(replacement)
+        position = end
+    merged.extend(base_lines[position:])
+    return "".join(merged)
@@ -0,0 +1,43 @@
+"""
+Text operations for patching page content in place.
+
+Offsets are counted in Unicode code points and every operation is applied
+to the result of the previous one.
+"""
+
+
+def apply_operations(content: str, operations: list[dict]) -> tuple[str, int, int]:
+    """
+    Apply insert/delete operations to content.
+
+    Returns the patched content together with the [start, end) range of the
+    result that was touched by the operations. Raises ValueError if an
+    operation falls outside the content.
+    """
+    unchanged_prefix = len(content)
+    unchanged_suffix = len(content)
+
+    for operation in operations:
+        offset = operation["offset"]
+        if offset > len(content):
+            raise ValueError(f"Offset {offset} is past the end of the content.")
+
+        if operation["op"] == "insert":
+            text = operation["text"]
+            content = content[:offset] + text + content[offset:]
+            edit_end = offset + len(text)
+        else:
+            length = operation["length"]
+            if offset + length > len(content):
+                raise ValueError(
+                    f"Cannot delete {length} characters at offset {offset}."
+                )
+            content = content[:offset] + content[offset + length :]
+            edit_end = offset
+
+        unchanged_prefix = min(unchanged_prefix, offset)
+        unchanged_suffix = min(unchanged_suffix, len(content) - edit_end)
+
+    start = min(unchanged_prefix, len(content))
+    end = max(start, len(content) - unchanged_suffix)
+    return content, start, end
@@ -0,0 +1,34 @@
+import re
+from typing import Optional
+
+_BYTE_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def parse_byte_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """Parse a single range of an HTTP Range header.
+
+    Returns:
+        The first and last byte of the range within ``size``, or None when
+        the header is missing, malformed or asks for several ranges, which
+        are answered with the whole content.
+
+    Raises:
+        ValueError: When the range starts past the end of the content.
+    """
+    match = _BYTE_RANGE_RE.fullmatch((header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        # The last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise ValueError("Range starts past the end of the content")
+    if end < start:
+        return None
+    return start, end
@@ -0,0 +1,156 @@
+"""
+Server-side rendering of page markdown to sanitized HTML.
+
+Output follows the viewer's own rendering: GFM tables, strikethrough and
+task lists, line breaks kept, code highlighted with highlight.js class names
+so the viewer's themes apply, and math left as placeholders for KaTeX.
+
+Requires the optional markdown-it-py, mdit-py-plugins and Pygments packages.
+"""
+
+import html
+import importlib.util
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+
+from doccoon.utils.sanitize import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_PROTOCOLS,
+    ALLOWED_TAGS,
+    get_sanitizer,
+)
+
+# Changes whenever the output does, so stored HTML is rendered again
+RENDER_VERSION = "1"
+
+RENDER_ALLOWED_TAGS = ALLOWED_TAGS + ["input"]
+RENDER_ALLOWED_ATTRIBUTES = {
+    **ALLOWED_ATTRIBUTES,
+    "div": ["data-math", "data-display"],
+    "input": ["type", "checked", "disabled"],
+    "span": ["data-math", "data-display"],
+}
+
+# highlight.js classes of Pygments token types, the closest ancestor of a
+# token type applies
+TOKEN_CLASSES = {
+    "Comment": "hljs-comment",
+    "Comment.Preproc": "hljs-meta",
+    "Generic.Deleted": "hljs-deletion",
+    "Generic.Emph": "hljs-emphasis",
+    "Generic.Heading": "hljs-section",
+    "Generic.Inserted": "hljs-addition",
+    "Generic.Strong": "hljs-strong",
+    "Generic.Subheading": "hljs-section",
+    "Keyword": "hljs-keyword",
+    "Keyword.Constant": "hljs-literal",
+    "Keyword.Type": "hljs-type",
+    "Literal": "hljs-literal",
+    "Literal.Number": "hljs-number",
+    "Literal.String": "hljs-string",
+    "Literal.String.Regex": "hljs-regexp",
+    "Name.Attribute": "hljs-attr",
+    "Name.Builtin": "hljs-built_in",
+    "Name.Class": "hljs-title class_",
+    "Name.Decorator": "hljs-meta",
+    "Name.Function": "hljs-title function_",
+    "Name.Tag": "hljs-name",
+    "Name.Variable": "hljs-variable",
+    "Operator.Word": "hljs-keyword",
+}
+
+REQUIRED_PACKAGES = ("markdown_it", "mdit_py_plugins", "pygments")
+
+
+def renderer_available() -> bool:
+    """Whether the packages rendering needs are installed."""
+    return all(importlib.util.find_spec(name) for name in REQUIRED_PACKAGES)
+
+
+def _token_class(token_type) -> str:
+    while token_type:
+        css_class = TOKEN_CLASSES.get(str(token_type).removeprefix("Token."))
+        if css_class:
+            return css_class
+        token_type = token_type.parent
+    return ""
+
+
+def _span(css_class: str, values: list[str]) -> str:
+    text = html.escape("".join(values), quote=False)
+    return f'<span class="{css_class}">{text}</span>' if css_class else text
+
+
+def _highlight(code: str, language: str, attrs) -> str:
+    from pygments import lex
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+
+    if not language or language == "mermaid":
+        # Left for the viewer, mermaid diagrams are drawn by the browser
+        return ""
+    try:
+        lexer = get_lexer_by_name(language)
+    except ClassNotFound:
+        return ""
+
+    # Runs of tokens of the same class share a span
+    parts = []
+    css_class, values = "", []
+    for token_type, value in lex(code, lexer):
+        token_class = _token_class(token_type)
+        if token_class != css_class:
+            parts.append(_span(css_class, values))
+            css_class, values = token_class, []
+        values.append(value)
+    parts.append(_span(css_class, values))
+    language = html.escape(language)
+    return (
+        f'<pre><code class="hljs language-{language}">{"".join(parts)}</code></pre>\n'
+    )
+
+
+def _math(tag: str, display: bool):
+    def render(self, tokens, idx, options, env):
+        math = html.escape(tokens[idx].content.strip())
+        return (
+            f'<{tag} class="math-placeholder" data-math="{math}" '
+            f'data-display="{str(display).lower()}"></{tag}>'
+        )
+
+    return render
+
+
+@lru_cache(maxsize=1)
+def _markdown():
+    try:
+        from markdown_it import MarkdownIt
+        from mdit_py_plugins.dollarmath import dollarmath_plugin
+        from mdit_py_plugins.tasklists import tasklists_plugin
+    except ImportError as error:
+        raise ImproperlyConfigured(
+            "Rendering markdown to HTML requires the markdown-it-py, "
+            "mdit-py-plugins and Pygments packages."
+        ) from error
+
+    md = MarkdownIt(
+        "commonmark", {"html": True, "breaks": True, "highlight": _highlight}
+    ).enable(["table", "strikethrough"])
+    md.use(tasklists_plugin, enabled=False)
+    md.use(dollarmath_plugin, double_inline=True)
+    md.add_render_rule("math_inline", _math("span", display=False))
+    md.add_render_rule("math_inline_double", _math("span", display=True))
+    md.add_render_rule("math_block", _math("div", display=True))
+    md.add_render_rule("math_block_label", _math("div", display=True))
+    return md
+
+
+def render_markdown(content: str) -> str:
+    """Render markdown to sanitized HTML."""
+    if not content:
+        return ""
+    rendered = _markdown().render(content)
+    return get_sanitizer().clean(
+        rendered, RENDER_ALLOWED_TAGS, RENDER_ALLOWED_ATTRIBUTES, ALLOWED_PROTOCOLS
+    )
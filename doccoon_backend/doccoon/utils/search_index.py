@@ -0,0 +1,51 @@
+from typing import Iterable
+
+from django.db import connection
+
+# Statements writing page text into the full-text index. Page content is
+# stored compressed, so the database cannot index it by itself
+_POSTGRESQL_INDEX = """
+    UPDATE doccoon_doccoonpage AS page
+    SET search_vector = to_tsvector('pg_catalog.english', item.content)
+    FROM unnest(%s::bigint[], %s::text[]) AS item(id, content)
+    WHERE page.id = item.id
+"""
+_POSTGRESQL_COPY = """
+    UPDATE doccoon_doccoonpage AS page
+    SET search_vector = source.search_vector
+    FROM unnest(%s::bigint[], %s::bigint[]) AS item(id, source_id)
+    JOIN doccoon_doccoonpage AS source ON source.id = item.source_id
+    WHERE page.id = item.id
+"""
+_SQLITE_DELETE = "DELETE FROM doccoon_page_search WHERE rowid = %s"
+_SQLITE_INSERT = "INSERT INTO doccoon_page_search(rowid, content) VALUES (%s, %s)"
+
+
+def index_page_content(pages: Iterable[tuple[int, str]]) -> None:
+    """Update the full-text index for (page id, content) pairs."""
+    pages = list(pages)
+    if not pages:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            ids, contents = zip(*pages)
+            cursor.execute(_POSTGRESQL_INDEX, [list(ids), list(contents)])
+        elif connection.vendor == "sqlite":
+            cursor.executemany(_SQLITE_DELETE, [(page_id,) for page_id, _ in pages])
+            cursor.executemany(_SQLITE_INSERT, pages)
+
+
+def copy_page_index(pages: list[tuple[int, int]]) -> bool:
+    """Give copies of pages the index entries of their sources, from
+    (page id, source page id) pairs.
+
+    Returns False if the database cannot copy entries, and the copies must
+    be indexed from their content instead.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    if pages:
+        ids, source_ids = zip(*pages)
+        with connection.cursor() as cursor:
+            cursor.execute(_POSTGRESQL_COPY, [list(ids), list(source_ids)])
+    return True
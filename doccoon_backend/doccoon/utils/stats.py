@@ -0,0 +1,41 @@
+import re
+
+IMAGE_PATTERN = re.compile(r"!\[.*?\]\(.*?\)|<img\s[^>]*>")
+
+
+def count_images(content: str) -> int:
+    """Return the number of markdown and HTML images in a page's content."""
+    return len(IMAGE_PATTERN.findall(content or ""))
+
+
+def content_size(content: str) -> int:
+    """Return the size of a page's content in UTF-8 bytes."""
+    return len((content or "").encode("utf-8"))
+
+
+HEADING_PATTERN = re.compile(r"^ {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$")
+FENCE_PATTERN = re.compile(r"^ {0,3}(```|~~~)")
+
+
+def page_headings(content: str) -> list[dict]:
+    """Return the markdown headings of a page's content, in order.
+
+    Each heading is a ``{"level", "text"}`` dict. Lines in fenced code
+    blocks are skipped.
+    """
+    headings = []
+    fence = None
+    for line in (content or "").splitlines():
+        match = FENCE_PATTERN.match(line)
+        if match:
+            if fence is None:
+                fence = match.group(1)
+            elif match.group(1) == fence:
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        match = HEADING_PATTERN.match(line)
+        if match and match.group(2):
+            headings.append({"level": len(match.group(1)), "text": match.group(2)})
+    return headings
@@ -0,0 +1,55 @@
+import heapq
+import re
+from collections import defaultdict
+from typing import Iterable
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the trigrams of each word in ``text``, padded like pg_trgm."""
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        word = f"  {word} "
+        grams.update(word[i : i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """An in-memory inverted index from trigrams to the texts containing them.
+
+    Scores approximate pg_trgm's word similarity: the share of the query's
+    trigrams found in a text, so a prefix or a misspelt word still matches.
+    """
+
+    def __init__(self, items: Iterable[tuple[int, str]]):
+        self.postings = defaultdict(list)
+        self.sizes = {}
+        self.texts = {}
+        for key, text in items:
+            self.texts[key] = text
+            grams = trigrams(text)
+            self.sizes[key] = len(grams)
+            for gram in grams:
+                self.postings[gram].append(key)
+
+    def search(
+        self, query: str, limit: int, min_similarity: float
+    ) -> list[tuple[int, float]]:
+        """Return up to ``limit`` (key, similarity) pairs, best first."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for key in self.postings.get(gram, ()):
+                shared[key] += 1
+        scores = (
+            # Among equal matches, prefer texts with fewer other trigrams
+            (count / len(grams), count / self.sizes[key], key)
+            for key, count in shared.items()
+            if count / len(grams) >= min_similarity
+        )
+        return [
+            (key, similarity) for similarity, _, key in heapq.nlargest(limit, scores)
+        ]
@@ -0,0 +1,33 @@
+from django.http import FileResponse
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+
+from doccoon.api.response import CustomResponse
+from doccoon.services.blob import BLOB_CONTENT_TYPES, open_blob
+
+# Blobs are addressed by their content, so they never change
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@swagger_auto_schema(tags=["Blobs"])
+class BlobApiView(GenericAPIView):
+    """Serve an image extracted from page content.
+
+    Public, so images keep loading in shared books. Blobs can only be found
+    through the SHA-256 digest of their content.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request: Request, digest: str, ext: str):
+        content_type = BLOB_CONTENT_TYPES.get(ext)
+        blob = open_blob(digest, ext) if content_type else None
+        if not blob:
+            return CustomResponse.not_found(message="Blob not found")
+
+        response = FileResponse(blob, content_type=content_type)
+        response["Cache-Control"] = BLOB_CACHE_CONTROL
+        response["ETag"] = f'"{digest}"'
+        return response
@@ -3,16 +3,20 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.request import Request
 
-from doccoon.api.permissions import UserIsAuthenticated
+from doccoon.api.permissions import IsBookOwner, UserIsAuthenticated
 from doccoon.api.response import CustomResponse
 from doccoon.api.throttling import BookOperationThrottle
 from doccoon.models.book import BOOK_STATUS, doccoon
 from doccoon.serializers.book import (
+    BookCloneSerializer,
     BookListSerializer,
     BookSerializer,
-    GetBookWithPagesSerializer,
+    book_list_values,
+    serialize_book,
+    stream_book_pages,
 )
-from doccoon.services.book import get_book_by_id
+from doccoon.services.book import can_stream_book, clone_book, get_book_by_id
+from doccoon.services.sharing import invalidate_book_shares
 from doccoon.services.user import get_user_by_id
 
 # ======================================================
@@ -35,7 +39,6 @@ class BookListCreateApiView(ListAPIView):
         # Use request.user directly instead of extra DB lookup
         return (
             doccoon.objects.select_related("author")
-            .prefetch_related("doccoonpage_set")
             .filter(
                 author_id=self.request.user.id,
                 status__in=[BOOK_STATUS.Draft, BOOK_STATUS.Published],
@@ -44,6 +47,12 @@ class BookListCreateApiView(ListAPIView):
             .order_by("-created_at")
         )
 
+    def list(self, request: Request) -> CustomResponse:
+        # Rows are read with values() and skip building model instances
+        queryset = self.get_queryset().values(*book_list_values.columns)
+        books = self.paginate_queryset(queryset)
+        return self.get_paginated_response(book_list_values.many(books))
+
     def post(self, request: Request) -> CustomResponse:
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
@@ -77,13 +86,22 @@ class BookDetailApiView(GenericAPIView):
     throttle_classes = [BookOperationThrottle]
 
     def get(self, request: Request, book_id: int) -> CustomResponse:
-        book = get_book_by_id(book_id)
+        book = get_book_by_id(book_id, include_pages=False)
         if not book:
             return CustomResponse.not_found(message="Book not found")
 
-        serializer = GetBookWithPagesSerializer(book)
+        if can_stream_book(book):
+            # Large books are sent as their pages are read, instead of
+            # being built and rendered whole in memory
+            return CustomResponse.stream_success(
+                data=BookSerializer(book).data,
+                items_key="pages",
+                items=stream_book_pages(book),
+                message="Book retrieved successfully.",
+            )
+
         return CustomResponse.success(
-            data=serializer.data,
+            data=serialize_book(book),
             message="Book retrieved successfully.",
         )
 
@@ -95,6 +113,7 @@ class BookDetailApiView(GenericAPIView):
         serializer = BookSerializer(book, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        invalidate_book_shares(book)
 
         return CustomResponse.success(
             data=serializer.data,
@@ -109,6 +128,7 @@ class BookDetailApiView(GenericAPIView):
         book.status = BOOK_STATUS.Deleted
         book.deleted_at = timezone.now()
         book.save()
+        invalidate_book_shares(book)
 
         return CustomResponse.success(
             message="Book deleted successfully.",
@@ -142,6 +162,7 @@ class BookPublishApiView(GenericAPIView):
         if book.status == BOOK_STATUS.Published:
             book.status = BOOK_STATUS.Draft
             book.save()
+            invalidate_book_shares(book)
             return CustomResponse.success(
                 data=BookSerializer(book).data,
                 message="Book unpublished successfully.",
@@ -149,7 +170,43 @@ class BookPublishApiView(GenericAPIView):
 
         book.status = BOOK_STATUS.Published
         book.save()
+        invalidate_book_shares(book)
         return CustomResponse.success(
             data=BookSerializer(book).data,
             message="Book published successfully.",
         )
+
+
+# ======================================================
+# Books: Clone
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Books"])
+class BookCloneApiView(GenericAPIView):
+    """
+    Copy a book and its pages as a new draft, in a single request.
+    """
+
+    serializer_class = BookCloneSerializer
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [BookOperationThrottle]
+
+    def post(self, request: Request, book_id: int) -> CustomResponse:
+        book = get_book_by_id(book_id, include_pages=False)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        clone = clone_book(book, request.user, serializer.validated_data.get("title"))
+        return CustomResponse.success(
+            data=BookSerializer(clone).data,
+            message="Book cloned successfully.",
+            status_code=201,
+        )
@@ -0,0 +1,100 @@
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.generics import GenericAPIView
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.request import Request
+
+from doccoon.api.permissions import IsBookOwner, UserIsAuthenticated
+from doccoon.api.response import CustomResponse
+from doccoon.api.throttling import BookOperationThrottle
+from doccoon.serializers.book_import import (
+    BookImportCreateSerializer,
+    BookImportSerializer,
+)
+from doccoon.services.book import get_book_by_id_simple
+from doccoon.services.book_import import create_book_import, get_book_import
+
+# ======================================================
+# Import: Upload
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Import"])
+class BookImportCreateApiView(GenericAPIView):
+    """
+    Import a zip or tar of Markdown files, or a single Markdown file with
+    page separators, as a new book. The pages are created in the background.
+    """
+
+    serializer_class = BookImportCreateSerializer
+    permission_classes = [UserIsAuthenticated]
+    throttle_classes = [BookOperationThrottle]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request: Request) -> CustomResponse:
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        details = dict(serializer.validated_data)
+        book_import = create_book_import(request.user, details.pop("file"), **details)
+        return CustomResponse.success(
+            data=BookImportSerializer(book_import).data,
+            message="Import started successfully.",
+            status_code=202,
+        )
+
+
+@swagger_auto_schema(tags=["Import"])
+class BookPagesImportApiView(GenericAPIView):
+    """Import Markdown files as pages at the end of an existing book."""
+
+    serializer_class = BookImportCreateSerializer
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [BookOperationThrottle]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request: Request, book_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        book_import = create_book_import(
+            request.user, serializer.validated_data["file"], book=book
+        )
+        return CustomResponse.success(
+            data=BookImportSerializer(book_import).data,
+            message="Import started successfully.",
+            status_code=202,
+        )
+
+
+# ======================================================
+# Import: Progress
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Import"])
+class BookImportDetailApiView(GenericAPIView):
+    """Check on the progress of an import."""
+
+    permission_classes = [UserIsAuthenticated]
+
+    def get(self, request: Request, import_id: int) -> CustomResponse:
+        book_import = get_book_import(request.user, import_id)
+        if not book_import:
+            return CustomResponse.not_found(message="Import not found")
+
+        return CustomResponse.success(
+            data=BookImportSerializer(book_import).data,
+            message="Import retrieved successfully.",
+        )
@@ -0,0 +1,161 @@
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+
+from doccoon.api.permissions import IsBookOwner, UserIsAuthenticated
+from doccoon.api.response import CustomResponse
+from doccoon.api.throttling import BookOperationThrottle
+from doccoon.serializers.export import BookExportSerializer, ExportQuerySerializer
+from doccoon.services.book import get_book_by_id, get_book_by_id_simple
+from doccoon.services.export import (
+    EXPORT_FORMATS,
+    can_stream_export,
+    create_book_export,
+    export_book,
+    export_file_name,
+    get_book_export,
+    open_export_file,
+    read_file_range,
+)
+from doccoon.utils.ranges import parse_byte_range
+
+# ======================================================
+# Export: Stream
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Export"])
+class BookExportApiView(GenericAPIView):
+    """Download a book as Markdown, an HTML bundle or an EPUB, built while
+    it is sent."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [BookOperationThrottle]
+
+    @swagger_auto_schema(query_serializer=ExportQuerySerializer)
+    def get(self, request: Request, book_id: int):
+        serializer = ExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        book = get_book_by_id(book_id, include_pages=False)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+        if not can_stream_export(book):
+            return CustomResponse.bad_request(
+                message="This book is too large to download directly. "
+                "Request an export file instead."
+            )
+
+        export_format = serializer.validated_data["type"]
+        response = StreamingHttpResponse(
+            export_book(book, export_format),
+            content_type=EXPORT_FORMATS[export_format].content_type,
+        )
+        file_name = export_file_name(book, export_format)
+        response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+        return response
+
+
+# ======================================================
+# Export: Files built in the background
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Export"])
+class BookExportCreateApiView(GenericAPIView):
+    """Request an export file of a book, built in the background."""
+
+    serializer_class = BookExportSerializer
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [BookOperationThrottle]
+
+    def post(self, request: Request, book_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = BookExportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        export = create_book_export(
+            book, request.user, serializer.validated_data["format"]
+        )
+        return CustomResponse.success(
+            data=BookExportSerializer(export).data,
+            message="Export requested successfully.",
+            status_code=202,
+        )
+
+
+@swagger_auto_schema(tags=["Export"])
+class BookExportDetailApiView(GenericAPIView):
+    """Check on an export file of a book."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [BookOperationThrottle]
+
+    def get(self, request: Request, book_id: int, export_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        export = get_book_export(book, export_id) if book else None
+        if not export:
+            return CustomResponse.not_found(message="Export not found")
+
+        return CustomResponse.success(
+            data=BookExportSerializer(export).data,
+            message="Export retrieved successfully.",
+        )
+
+
+@swagger_auto_schema(tags=["Export"])
+class BookExportDownloadApiView(GenericAPIView):
+    """Download a built export file. Supports byte ranges, so interrupted
+    downloads can resume."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+
+    def get(self, request: Request, book_id: int, export_id: int):
+        book = get_book_by_id(book_id, include_pages=False)
+        export = get_book_export(book, export_id) if book else None
+        file = open_export_file(export) if export else None
+        if not file:
+            return CustomResponse.not_found(message="Export file not found")
+
+        content_type = EXPORT_FORMATS[export.format].content_type
+        disposition = f'attachment; filename="{export_file_name(book, export.format)}"'
+        etag = f'"export-{export.id}-{export.size}"'
+
+        # A range is only served from the file the client started with
+        byte_range = None
+        if request.headers.get("If-Range", etag) == etag:
+            try:
+                byte_range = parse_byte_range(request.headers.get("Range"), export.size)
+            except ValueError:
+                file.close()
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{export.size}"
+                return response
+
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                read_file_range(file, start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{export.size}"
+            response["Content-Length"] = str(end - start + 1)
+        response["Content-Disposition"] = disposition
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        return response
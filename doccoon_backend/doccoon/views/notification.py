@@ -6,7 +6,10 @@ from rest_framework.request import Request
 
 from doccoon.api.permissions import UserIsAuthenticated
 from doccoon.api.response import CustomResponse
-from doccoon.serializers.notification import NotificationSerializer
+from doccoon.serializers.notification import (
+    NotificationSerializer,
+    notification_values,
+)
 from doccoon.services.notification import (
     get_notification_by_id,
     get_user_notifications,
@@ -27,6 +30,11 @@ class NotificationListApiView(ListAPIView):
     def get_queryset(self):
         return get_user_notifications(self.request.user)
 
+    def list(self, request: Request) -> CustomResponse:
+        queryset = self.get_queryset().values(*notification_values.columns)
+        notifications = self.paginate_queryset(queryset)
+        return self.get_paginated_response(notification_values.many(notifications))
+
 
 # ======================================================
 # Notifications: Mark Read / Delete
@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.generics import GenericAPIView, ListAPIView
@@ -7,16 +8,33 @@ from doccoon.api.permissions import IsBookOwner, UserIsAuthenticated
 from doccoon.api.response import CustomResponse
 from doccoon.api.throttling import PageOperationThrottle
 from doccoon.serializers.page import (
+    BulkPageSerializer,
     CreatePageSerializer,
+    MovePagesSerializer,
     PageDetailSerializer,
+    PagePatchResultSerializer,
+    PatchPageSerializer,
     UpdatePageSerializer,
+    page_detail_values,
+    serialize_page_rows,
 )
-from doccoon.services.book import get_book_by_id
+from doccoon.services.book import get_book_by_id, get_book_by_id_simple
 from doccoon.services.page import (
-    get_next_page_number,
+    PageConflictError,
+    allocate_page_slots,
+    bulk_save_pages,
     get_page_by_id,
+    get_page_for_update,
+    get_page_number,
     get_pages_by_book,
+    get_pages_by_ids,
+    get_position_after,
+    lock_book,
+    move_pages,
+    patch_page_content,
+    schedule_page_compaction,
 )
+from doccoon.services.sharing import invalidate_page_shares
 
 # ======================================================
 # Pages: List & Create
@@ -30,22 +48,26 @@ class PageListCreateApiView(ListAPIView):
     serializer_class = PageDetailSerializer
     permission_classes = [UserIsAuthenticated, IsBookOwner]
     throttle_classes = [PageOperationThrottle]
+    keyset_ordering = ("position", "id")
 
     def get_queryset(self):
         book_id = self.kwargs["book_id"]
         return get_pages_by_book(book_id)
 
     def list(self, request: Request, book_id: int) -> CustomResponse:
-        book = get_book_by_id(book_id)
+        book = get_book_by_id_simple(book_id)
         if not book:
             return CustomResponse.not_found(message="Book not found")
 
-        queryset = self.get_queryset()
-        serializer = PageDetailSerializer(queryset, many=True)
-        return CustomResponse.success(
-            data=serializer.data,
-            message="Pages retrieved successfully.",
+        queryset = self.get_queryset().values(
+            *page_detail_values.columns, "position", "chunked"
         )
+        rows = self.paginate_queryset(queryset)
+        # Number the window from the pages before it, the cursor's own count
+        # may be stale or forged
+        start = get_page_number(book_id, rows[0]["position"]) if rows else 1
+        pages = serialize_page_rows(rows, page_detail_values, start=start)
+        return self.get_paginated_response(list(pages))
 
     def post(self, request: Request, book_id: int) -> CustomResponse:
         book = get_book_by_id(book_id)
@@ -59,8 +81,24 @@ class PageListCreateApiView(ListAPIView):
                 data=serializer.errors,
             )
 
-        page_number = get_next_page_number(book_id)
-        page = serializer.save(book=book, page_number=page_number)
+        after_id = serializer.validated_data.pop("after", None)
+        if after_id is None:
+            page_number, position = allocate_page_slots(book_id)
+            page = serializer.save(
+                book=book, page_number=page_number, position=position
+            )
+        else:
+            after = get_page_by_id(after_id)
+            if not after or after.book_id != book_id:
+                return CustomResponse.not_found(message="Page not found")
+            with transaction.atomic():
+                lock_book(book_id)
+                after.refresh_from_db(fields=["page_number", "position"])
+                position = get_position_after(book_id, after)
+                page = serializer.save(
+                    book=book, page_number=after.page_number + 1, position=position
+                )
+                schedule_page_compaction(book_id)
 
         return CustomResponse.success(
             data=PageDetailSerializer(page).data,
@@ -90,30 +128,87 @@ class PageDetailApiView(GenericAPIView):
         if not page or page.book_id != book_id:
             return CustomResponse.not_found(message="Page not found")
 
-        return CustomResponse.success(
+        response = CustomResponse.success(
             data=PageDetailSerializer(page).data,
             message="Page retrieved successfully.",
         )
+        response["ETag"] = f'"{page.version}"'
+        return response
 
     def put(self, request: Request, book_id: int, page_id: int) -> CustomResponse:
-        book = get_book_by_id(book_id)
+        book = get_book_by_id_simple(book_id)
         if not book:
             return CustomResponse.not_found(message="Book not found")
 
-        page = get_page_by_id(page_id)
-        if not page or page.book_id != book_id:
-            return CustomResponse.not_found(message="Page not found")
+        data = request.data
+        if_match = request.headers.get("If-Match")
+        if if_match:
+            # ETags are the quoted page version, e.g. "3" or W/"3"
+            data = data.copy()
+            data["base_version"] = if_match.removeprefix("W/").strip('"')
+
+        with transaction.atomic():
+            page = get_page_for_update(page_id)
+            if not page or page.book_id != book_id:
+                return CustomResponse.not_found(message="Page not found")
 
-        serializer = UpdatePageSerializer(page, data=request.data, partial=True)
+            serializer = UpdatePageSerializer(page, data=data, partial=True)
+            if not serializer.is_valid():
+                return CustomResponse.bad_request(
+                    message="Invalid data",
+                    data=serializer.errors,
+                )
+            try:
+                serializer.save()
+            except PageConflictError as e:
+                return CustomResponse.conflict(
+                    message=str(e),
+                    data=PageDetailSerializer(page).data,
+                )
+
+        response = CustomResponse.success(
+            data={**PageDetailSerializer(page).data, "written": serializer.written},
+            message=(
+                "Page updated successfully."
+                if serializer.written
+                else "Page is already up to date."
+            ),
+        )
+        response["ETag"] = f'"{page.version}"'
+        return response
+
+    def patch(self, request: Request, book_id: int, page_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = PatchPageSerializer(data=request.data)
         if not serializer.is_valid():
             return CustomResponse.bad_request(
                 message="Invalid data",
                 data=serializer.errors,
             )
-        serializer.save()
+
+        # The base hash is checked against the locked row, so concurrent
+        # patches of the same version cannot both apply
+        with transaction.atomic():
+            page = get_page_for_update(page_id)
+            if not page or page.book_id != book_id:
+                return CustomResponse.not_found(message="Page not found")
+
+            if serializer.validated_data["base_hash"] != page.content_hash:
+                return CustomResponse.conflict(
+                    message="Page content has changed since the base version.",
+                    data=PagePatchResultSerializer(page).data,
+                )
+
+            try:
+                patch_page_content(page, serializer.validated_data["operations"])
+            except ValueError as e:
+                return CustomResponse.bad_request(message=str(e))
 
         return CustomResponse.success(
-            data=PageDetailSerializer(page).data,
+            data=PagePatchResultSerializer(page).data,
             message="Page updated successfully.",
         )
 
@@ -129,7 +224,104 @@ class PageDetailApiView(GenericAPIView):
         page.is_deleted = True
         page.deleted_at = timezone.now()
         page.save()
+        invalidate_page_shares([page.id])
 
         return CustomResponse.success(
             message="Page deleted successfully.",
         )
+
+
+# ======================================================
+# Pages: Bulk Create / Update / Delete
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Pages"])
+class PageBulkApiView(GenericAPIView):
+    """Create, update and delete many pages of a book in a single request."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [PageOperationThrottle]
+
+    def post(self, request: Request, book_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = BulkPageSerializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        creates = serializer.validated_data["create"]
+        updates = serializer.validated_data["update"]
+        deletes = serializer.validated_data["delete"]
+
+        page_ids = [item["id"] for item in updates] + deletes
+        with transaction.atomic():
+            pages = get_pages_by_ids(book_id, page_ids, for_update=True)
+            missing = sorted(set(page_ids) - pages.keys())
+            if missing:
+                return CustomResponse.bad_request(
+                    message="Some pages were not found in this book",
+                    data={"missing": missing},
+                )
+
+            result = bulk_save_pages(book, creates, updates, deletes, pages)
+        # Clients replace their edits to conflicting pages with the saved ones
+        result["conflicts"] = PageDetailSerializer(
+            [pages[page_id] for page_id in result["conflicts"]], many=True
+        ).data
+        if deletes:
+            invalidate_page_shares(deletes)
+        return CustomResponse.success(
+            data=result,
+            message="Pages saved successfully.",
+        )
+
+
+# ======================================================
+# Pages: Move
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Pages"])
+class PageMoveApiView(GenericAPIView):
+    """Move a page, or a range of pages, to another place in the book."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [PageOperationThrottle]
+
+    def post(self, request: Request, book_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        serializer = MovePagesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        first_id = serializer.validated_data["first"]
+        last_id = serializer.validated_data.get("last", first_id)
+        after_id = serializer.validated_data["after"]
+        page_ids = [first_id, last_id] + ([after_id] if after_id is not None else [])
+        pages = get_pages_by_ids(book_id, page_ids)
+        if set(page_ids) - pages.keys():
+            return CustomResponse.not_found(message="Page not found")
+
+        try:
+            move_pages(
+                book_id,
+                pages[first_id],
+                pages[last_id],
+                pages[after_id] if after_id is not None else None,
+            )
+        except ValueError as e:
+            return CustomResponse.bad_request(message=str(e))
+
+        return CustomResponse.success(message="Pages moved successfully.")
@@ -0,0 +1,127 @@
+from django.db import transaction
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.generics import GenericAPIView, ListAPIView
+from rest_framework.request import Request
+
+from doccoon.api.permissions import IsBookOwner, UserIsAuthenticated
+from doccoon.api.response import CustomResponse
+from doccoon.api.throttling import PageOperationThrottle
+from doccoon.serializers.page import PageDetailSerializer
+from doccoon.serializers.revision import (
+    PageRevisionContentSerializer,
+    PageRevisionSerializer,
+)
+from doccoon.services.book import get_book_by_id_simple
+from doccoon.services.page import (
+    get_page_by_id,
+    get_page_for_update,
+    restore_page_revision,
+)
+from doccoon.services.revision import (
+    get_page_revision,
+    get_page_revisions,
+    get_revision_content,
+)
+
+# ======================================================
+# Page Revisions: List
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Pages"])
+class PageRevisionListApiView(ListAPIView):
+    """List the recorded versions of a page, newest first."""
+
+    serializer_class = PageRevisionSerializer
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [PageOperationThrottle]
+    keyset_ordering = ("-version", "-id")
+
+    def list(self, request: Request, book_id: int, page_id: int) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        page = get_page_by_id(page_id)
+        if not page or page.book_id != book_id:
+            return CustomResponse.not_found(message="Page not found")
+
+        revisions = self.paginate_queryset(get_page_revisions(page))
+        serializer = PageRevisionSerializer(revisions, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+# ======================================================
+# Page Revisions: Retrieve & Restore
+# ======================================================
+
+
+@swagger_auto_schema(tags=["Pages"])
+class PageRevisionDetailApiView(GenericAPIView):
+    """Retrieve the content of a page at a recorded version."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [PageOperationThrottle]
+
+    def get(
+        self, request: Request, book_id: int, page_id: int, version: int
+    ) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        page = get_page_by_id(page_id)
+        if not page or page.book_id != book_id:
+            return CustomResponse.not_found(message="Page not found")
+
+        revision = get_page_revision(page, version)
+        if not revision:
+            return CustomResponse.not_found(message="Revision not found")
+
+        content = get_revision_content(page, version)
+        serializer = PageRevisionContentSerializer(
+            {
+                "version": revision.version,
+                "content": content,
+                "created_at": revision.created_at,
+            }
+        )
+        return CustomResponse.success(
+            data=serializer.data,
+            message="Revision retrieved successfully.",
+        )
+
+
+@swagger_auto_schema(tags=["Pages"])
+class PageRevisionRestoreApiView(GenericAPIView):
+    """Replace the content of a page with a recorded version."""
+
+    permission_classes = [UserIsAuthenticated, IsBookOwner]
+    throttle_classes = [PageOperationThrottle]
+
+    def post(
+        self, request: Request, book_id: int, page_id: int, version: int
+    ) -> CustomResponse:
+        book = get_book_by_id_simple(book_id)
+        if not book:
+            return CustomResponse.not_found(message="Book not found")
+
+        with transaction.atomic():
+            page = get_page_for_update(page_id)
+            if not page or page.book_id != book_id:
+                return CustomResponse.not_found(message="Page not found")
+
+            written = restore_page_revision(page, version)
+            if written is None:
+                return CustomResponse.not_found(message="Revision not found")
+
+        response = CustomResponse.success(
+            data={**PageDetailSerializer(page).data, "written": written},
+            message=(
+                "Page restored successfully."
+                if written
+                else "Page already has this content."
+            ),
+        )
+        response["ETag"] = f'"{page.version}"'
+        return response
@@ -0,0 +1,68 @@
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+
+from doccoon.api.permissions import UserIsAuthenticated
+from doccoon.api.response import CustomResponse
+from doccoon.api.throttling import SearchThrottle
+from doccoon.serializers.search import (
+    AutocompleteQuerySerializer,
+    SearchQuerySerializer,
+    SearchResultSerializer,
+    TitleSuggestionSerializer,
+)
+from doccoon.services.search import autocomplete_book_titles, search_user_content
+
+
+@swagger_auto_schema(tags=["Search"])
+class SearchApiView(GenericAPIView):
+    """Search the titles, descriptions and pages of the user's books."""
+
+    permission_classes = [UserIsAuthenticated]
+    throttle_classes = [SearchThrottle]
+
+    @swagger_auto_schema(query_serializer=SearchQuerySerializer)
+    def get(self, request: Request) -> CustomResponse:
+        serializer = SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        results = search_user_content(
+            request.user,
+            serializer.validated_data["q"],
+            limit=serializer.validated_data["limit"],
+        )
+        return CustomResponse.success(
+            data=SearchResultSerializer(results).data,
+            message="Search completed successfully.",
+        )
+
+
+@swagger_auto_schema(tags=["Search"])
+class BookAutocompleteApiView(GenericAPIView):
+    """Suggest the user's books from a partial or misspelt title."""
+
+    permission_classes = [UserIsAuthenticated]
+    throttle_classes = [SearchThrottle]
+
+    @swagger_auto_schema(query_serializer=AutocompleteQuerySerializer)
+    def get(self, request: Request) -> CustomResponse:
+        serializer = AutocompleteQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
+        suggestions = autocomplete_book_titles(
+            request.user,
+            serializer.validated_data["q"],
+            limit=serializer.validated_data["limit"],
+        )
+        return CustomResponse.success(
+            data=TitleSuggestionSerializer(suggestions, many=True).data,
+            message="Suggestions retrieved successfully.",
+        )
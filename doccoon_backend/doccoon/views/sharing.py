@@ -8,6 +8,7 @@ from doccoon.api.throttling import BurstAnonThrottle, SharingThrottle
 from doccoon.models.book import BOOK_STATUS
 from doccoon.models.notification import NOTIFICATION_TYPE
 from doccoon.serializers.sharing import (
+    PublicBookPagesQuerySerializer,
     PublicBookSerializer,
     PublicPageSerializer,
     SharedBookSerializer,
@@ -19,8 +20,10 @@ from doccoon.services.page import get_page_by_id
 from doccoon.services.sharing import (
     get_or_create_book_share,
     get_or_create_page_share,
+    get_public_share_payload,
     get_shared_book_by_token,
     get_shared_page_by_token,
+    get_snapshot_pages,
     revoke_book_share,
     revoke_page_share,
 )
@@ -146,15 +149,55 @@ class PublicSharedBookApiView(GenericAPIView):
     throttle_classes = [BurstAnonThrottle]
 
     def get(self, request: Request, share_token: str) -> CustomResponse:
+        def build():
+            shared = get_shared_book_by_token(share_token)
+            if not shared:
+                return None
+            return CustomResponse.render_success(
+                data=PublicBookSerializer(shared).data,
+                message="Shared book retrieved successfully.",
+            )
+
+        payload = get_public_share_payload("book", share_token, build)
+        if payload is None:
+            return CustomResponse.not_found(
+                message="Shared book not found or link has been revoked"
+            )
+
+        return CustomResponse.rendered(payload)
+
+
+@swagger_auto_schema(tags=["Sharing"])
+class PublicSharedBookPagesApiView(GenericAPIView):
+    """View a window of pages of a shared book, with their content."""
+
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [BurstAnonThrottle]
+
+    @swagger_auto_schema(query_serializer=PublicBookPagesQuerySerializer)
+    def get(self, request: Request, share_token: str) -> CustomResponse:
+        serializer = PublicBookPagesQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return CustomResponse.bad_request(
+                message="Invalid data",
+                data=serializer.errors,
+            )
+
         shared = get_shared_book_by_token(share_token)
         if not shared:
             return CustomResponse.not_found(
                 message="Shared book not found or link has been revoked"
             )
 
+        start = serializer.validated_data["start"]
+        end = serializer.validated_data["end"]
         return CustomResponse.success(
-            data=PublicBookSerializer(shared).data,
-            message="Shared book retrieved successfully.",
+            data={
+                "page_count": len(shared.manifest),
+                "pages": get_snapshot_pages(shared, start, end),
+            },
+            message="Shared book pages retrieved successfully.",
         )
 
 
@@ -167,13 +210,19 @@ class PublicSharedPageApiView(GenericAPIView):
     throttle_classes = [BurstAnonThrottle]
 
     def get(self, request: Request, share_token: str) -> CustomResponse:
-        shared = get_shared_page_by_token(share_token)
-        if not shared:
+        def build():
+            shared = get_shared_page_by_token(share_token)
+            if not shared:
+                return None
+            return CustomResponse.render_success(
+                data=PublicPageSerializer(shared).data,
+                message="Shared page retrieved successfully.",
+            )
+
+        payload = get_public_share_payload("page", share_token, build)
+        if payload is None:
             return CustomResponse.not_found(
                 message="Shared page not found or link has been revoked"
             )
 
-        return CustomResponse.success(
-            data=PublicPageSerializer(shared).data,
-            message="Shared page retrieved successfully.",
-        )
+        return CustomResponse.rendered(payload)
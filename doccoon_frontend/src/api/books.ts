@@ -16,6 +16,7 @@ export interface UpdateBookPayload {
 export interface BookPage {
   id: number;
   content: string;
+  version: number;
   page_number: number;
 }
 
@@ -60,6 +61,16 @@ export async function deleteBook(bookId: number): Promise<boolean> {
   return true;
 }
 
+export async function cloneBook(
+  bookId: number,
+  title?: string,
+): Promise<BookInfo | null> {
+  const response = await api.post<BookInfo>(`/books/${bookId}/clone/`, {
+    title,
+  });
+  return response.results ?? null;
+}
+
 export async function togglePublishBook(
   bookId: number,
 ): Promise<BookInfo | null> {
@@ -20,7 +20,6 @@ export interface ApiResponse<T> {
 }
 
 export interface PaginatedResponse<T> {
-  count: number;
   next: string | null;
   previous: string | null;
   results: T[];
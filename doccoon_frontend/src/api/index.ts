@@ -23,6 +23,7 @@ export {
   createBook,
   updateBook,
   deleteBook,
+  cloneBook,
   togglePublishBook,
 } from "./books";
 export type {
@@ -34,8 +35,14 @@ export type {
 } from "./books";
 
 // Pages
-export { createPage, updatePage, deletePage } from "./pages";
-export type { PageData, CreatePagePayload, UpdatePagePayload } from "./pages";
+export { createPage, updatePage, deletePage, bulkSavePages } from "./pages";
+export type {
+  PageData,
+  CreatePagePayload,
+  UpdatePagePayload,
+  BulkPagesPayload,
+  BulkPagesResult,
+} from "./pages";
 
 // Sharing
 export {
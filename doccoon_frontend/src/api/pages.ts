@@ -3,6 +3,7 @@ import { api } from "@/api/client";
 export interface PageData {
   id: number;
   content: string;
+  version: number;
   page_number: number;
   created_at: string;
   modified_at: string;
@@ -47,3 +48,41 @@ export async function deletePage(
   await api.del(`/books/${bookId}/pages/${pageId}/`);
   return true;
 }
+
+export interface BulkCreatePagePayload {
+  content: string;
+  page_number?: number;
+}
+
+export interface BulkUpdatePagePayload extends UpdatePagePayload {
+  id: number;
+  // Version the content was edited from, merged with newer edits on save
+  base_version?: number;
+}
+
+export interface BulkPagesPayload {
+  create?: BulkCreatePagePayload[];
+  update?: BulkUpdatePagePayload[];
+  delete?: number[];
+}
+
+export interface BulkPagesResult {
+  created: number[];
+  updated: number[];
+  deleted: number[];
+  // Version of each created and updated page, keyed by id
+  versions: Record<string, number>;
+  // Saved content of pages whose edits could not be merged
+  conflicts: PageData[];
+}
+
+export async function bulkSavePages(
+  bookId: number,
+  payload: BulkPagesPayload,
+): Promise<BulkPagesResult | null> {
+  const response = await api.post<BulkPagesResult>(
+    `/books/${bookId}/pages/bulk/`,
+    payload,
+  );
+  return response.results ?? null;
+}
@@ -10,6 +10,8 @@ export interface ShareResponse {
 export interface SharedPageData {
   id: number;
   content: string;
+  // Rendered by the server when enabled, null until rendered
+  html: string | null;
   page_number: number;
   book_title: string;
   book_is_public: boolean;
@@ -17,13 +19,25 @@ export interface SharedPageData {
   modified_at: string;
 }
 
+export interface SharedBookPageInfo {
+  page_number: number;
+  size: number;
+  headings: { level: number; text: string }[];
+}
+
 export interface SharedBookData {
   id: number;
   title: string;
   description: string;
   year: number;
   status: string;
-  pages: { id: number; content: string; page_number: number }[];
+  page_count: number;
+  pages: SharedBookPageInfo[];
+}
+
+export interface SharedBookPages {
+  page_count: number;
+  pages: { page_number: number; content: string; html: string | null }[];
 }
 
 export async function sharePage(
@@ -69,3 +83,14 @@ export async function getSharedBook(
   const response = await api.get<SharedBookData>(`/shared/book/${token}/`);
   return response.results ?? null;
 }
+
+export async function getSharedBookPages(
+  token: string,
+  start: number,
+  end: number,
+): Promise<SharedBookPages | null> {
+  const response = await api.get<SharedBookPages>(
+    `/shared/book/${token}/pages/?start=${start}&end=${end}`,
+  );
+  return response.results ?? null;
+}
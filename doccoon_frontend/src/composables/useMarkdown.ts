@@ -143,6 +143,37 @@ export function useMarkdown(isDarkTheme: Ref<boolean> | ComputedRef<boolean>) {
     renderMathPlaceholders(targetElement);
   }
 
+  // Show HTML pre-rendered by the server, only diagrams, math and copy
+  // buttons are left to add
+  async function renderHtml(html: string, targetElement: HTMLElement) {
+    targetElement.innerHTML = html;
+
+    const mermaidBlocks = targetElement.querySelectorAll(
+      "pre > code.language-mermaid",
+    );
+    for (let i = 0; i < mermaidBlocks.length; i++) {
+      const block = mermaidBlocks[i] as HTMLElement;
+      const container = document.createElement("div");
+      container.className = "mermaid-diagram";
+      try {
+        const { svg } = await mermaid.render(
+          `mermaid-svg-${Date.now()}-${i}`,
+          block.textContent || "",
+        );
+        container.innerHTML = svg;
+      } catch (error) {
+        container.innerHTML = `<pre style="color: red;">Mermaid Error: ${escapeHtml((error as Error).message)}</pre>`;
+      }
+      block.parentElement?.replaceWith(container);
+    }
+
+    targetElement.querySelectorAll("pre code").forEach((block) => {
+      addCopyButton(block as HTMLElement);
+    });
+
+    renderMathPlaceholders(targetElement);
+  }
+
   function renderMathPlaceholders(element: HTMLElement) {
     try {
       const placeholders = element.querySelectorAll(".math-placeholder");
@@ -219,6 +250,7 @@ export function useMarkdown(isDarkTheme: Ref<boolean> | ComputedRef<boolean>) {
 
   return {
     renderMarkdown,
+    renderHtml,
     updateMermaidTheme,
   };
 }
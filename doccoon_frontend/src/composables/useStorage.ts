@@ -1,8 +1,8 @@
 import { ref, watch, type Ref } from "vue";
-import type { Book } from "@/types";
+import type { Book, Spread } from "@/types";
 import { logger } from "@/utils/logger";
 import { isAuthenticated } from "@/api/auth";
-import { createPage, updatePage } from "@/api/pages";
+import { bulkSavePages, type BulkPagesPayload } from "@/api/pages";
 import {
   AUTO_SAVE_DEBOUNCE_MS,
   SAVE_STATUS_RESET_DELAY_MS,
@@ -14,56 +14,115 @@ let isSavingInProgress = false;
 /**
  * Save pages to the backend for a given book.
  * Each spread maps to 2 pages (left, right).
- * Backfills page IDs on spreads when new pages are created.
+ * All pages are sent in a single bulk request; page IDs are backfilled
+ * on spreads for pages that were created.
+ * Returns the number of pages whose edits conflicted with newer ones; those
+ * pages are replaced with the content saved on the server.
  */
-async function saveToBackend(book: Book): Promise<boolean> {
-  if (!book.id) return false;
+async function saveToBackend(book: Book): Promise<number> {
+  if (!book.id) return 0;
 
   const bookId = book.id;
   isSavingInProgress = true;
 
   try {
-    for (let i = 0; i < book.spreads.length; i++) {
-      const spread = book.spreads[i];
-      if (!spread) continue;
-
-      const leftPageNum = i * 2 + 1;
-      const rightPageNum = i * 2 + 2;
-
-      // Save left page
-      if (spread.leftPageId) {
-        await updatePage(bookId, spread.leftPageId, {
+    const payload: Required<BulkPagesPayload> = {
+      create: [],
+      update: [],
+      delete: [],
+    };
+    // Spread side for each entry in payload.create, in the same order
+    const pending: { spread: Spread; side: "left" | "right" }[] = [];
+
+    book.spreads.forEach((spread, i) => {
+      if (!spread) return;
+
+      const sides = [
+        {
+          side: "left" as const,
+          id: spread.leftPageId,
+          version: spread.leftVersion,
           content: spread.left,
-          page_number: leftPageNum,
-        });
-      } else {
-        const created = await createPage(bookId, { content: spread.left });
-        if (created) {
-          spread.leftPageId = created.id;
-        }
-      }
-
-      // Save right page
-      if (spread.rightPageId) {
-        await updatePage(bookId, spread.rightPageId, {
+        },
+        {
+          side: "right" as const,
+          id: spread.rightPageId,
+          version: spread.rightVersion,
           content: spread.right,
-          page_number: rightPageNum,
-        });
+        },
+      ];
+      sides.forEach(({ side, id, version, content }, offset) => {
+        const pageNumber = i * 2 + offset + 1;
+        if (id) {
+          // The server merges edits made since base_version, or refuses them
+          payload.update.push({
+            id,
+            content,
+            page_number: pageNumber,
+            base_version: version,
+          });
+        } else {
+          payload.create.push({ content, page_number: pageNumber });
+          pending.push({ spread, side });
+        }
+      });
+    });
+
+    const result = await bulkSavePages(bookId, payload);
+    result?.created.forEach((pageId, index) => {
+      const target = pending[index];
+      if (!target) return;
+      if (target.side === "left") {
+        target.spread.leftPageId = pageId;
       } else {
-        const created = await createPage(bookId, { content: spread.right });
-        if (created) {
-          spread.rightPageId = created.id;
+        target.spread.rightPageId = pageId;
+      }
+    });
+    if (result) {
+      // Later saves are edits from the versions just written
+      book.spreads.forEach((spread) => {
+        if (!spread) return;
+        if (spread.leftPageId && result.versions[spread.leftPageId]) {
+          spread.leftVersion = result.versions[spread.leftPageId];
+        }
+        if (spread.rightPageId && result.versions[spread.rightPageId]) {
+          spread.rightVersion = result.versions[spread.rightPageId];
         }
+      });
+      // Edits that could not be merged are dropped for the saved content, so
+      // later saves start from the current version instead of failing again
+      result.conflicts.forEach((page) => {
+        book.spreads.forEach((spread) => {
+          if (!spread) return;
+          if (spread.leftPageId === page.id) {
+            spread.left = page.content;
+            spread.leftVersion = page.version;
+          } else if (spread.rightPageId === page.id) {
+            spread.right = page.content;
+            spread.rightVersion = page.version;
+          }
+        });
+      });
+      if (result.conflicts.length) {
+        logger.warn(
+          "Edits to pages changed elsewhere were replaced:",
+          result.conflicts.map((page) => page.id),
+        );
       }
     }
 
-    return true;
+    return result?.conflicts.length ?? 0;
   } finally {
     isSavingInProgress = false;
   }
 }
 
-export type SaveStatus = "Loaded" | "Saving..." | "Saved" | "Error";
+export type SaveStatus =
+  | "Loaded"
+  | "Saving..."
+  | "Saved"
+  | "Conflict"
+  | "Error";
 
 export function useStorage(
   book: Ref<Book>,
@@ -101,8 +160,8 @@ export function useStorage(
 
     saveTimeout = window.setTimeout(async () => {
       try {
-        await saveToBackend(book.value);
-        saveStatus.value = "Saved";
+        const conflicts = await saveToBackend(book.value);
+        saveStatus.value = conflicts ? "Conflict" : "Saved";
       } catch (error) {
         logger.error("Failed to save to backend:", error);
         saveStatus.value = "Error";
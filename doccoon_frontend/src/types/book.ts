@@ -5,6 +5,8 @@ export interface Spread {
   rightWidth: string;
   leftPageId?: number;
   rightPageId?: number;
+  leftVersion?: number;
+  rightVersion?: number;
 }
 
 export interface Book {